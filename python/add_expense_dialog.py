@@ -1,9 +1,10 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Any
-from PySide6.QtCore import QFile, QDate
+from typing import Any, Callable
+from PySide6.QtCore import QDate, QFile, QStringListModel, Qt
 from PySide6.QtUiTools import QUiLoader
 from PySide6.QtWidgets import (
+    QCompleter,
     QDateEdit,
     QDialog,
     QDoubleSpinBox,
@@ -13,13 +14,23 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QWidget,
 )
+from money import to_amount
 
 
 
 class AddEditDialog(QDialog):
-    """Wraps shared/ui/add_expense_dialog.ui and exposes validated payload."""
+    """Wraps shared/ui/add_expense_dialog.ui and exposes validated payload.
 
-    def __init__(self, parent=None, expense: dict[str, Any] | None = None) -> None:
+    With ``suggest(field, prefix)`` the category and description fields offer
+    past values as the user types, in the order the callback returns them.
+    """
+
+    def __init__(
+        self,
+        parent=None,
+        expense: dict[str, Any] | None = None,
+        suggest: Callable[[str, str], list[str]] | None = None,
+    ) -> None:
         super().__init__(parent)
         ui_path = Path(__file__).resolve().parent.parent / "shared" / "ui" / "add_expense_dialog.ui"
         loader = QUiLoader()
@@ -63,10 +74,35 @@ class AddEditDialog(QDialog):
         if expense is not None:
             y, m, d = expense["date"].split("-")
             self.dateEdit.setDate(QDate(int(y), int(m), int(d)))
-            self.amountSpinBox.setValue(float(expense["amount"]))
+            self.amountSpinBox.setValue(to_amount(expense["amount"]))
             self.categoryLineEdit.setText(expense["category"])
             self.descriptionLineEdit.setText(expense["description"])
 
+        self.suggest = suggest
+        if suggest is not None:
+            self.attach_completer(self.categoryLineEdit, "category")
+            self.attach_completer(self.descriptionLineEdit, "description")
+
+    def attach_completer(self, line_edit: QLineEdit, field_name: str) -> None:
+        # The index already filtered and ranked the values, so the popup shows them as given.
+        model = QStringListModel(self)
+        completer = QCompleter(model, self)
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        line_edit.setCompleter(completer)
+
+        def refresh(text: str) -> None:
+            values = self.suggest(field_name, text) if text.strip() else []
+            if values == [text]:
+                values = []  # nothing left to complete
+            model.setStringList(values)
+            if values:
+                completer.complete()
+            else:
+                completer.popup().hide()
+
+        line_edit.textEdited.connect(refresh)
+
     def on_save(self) -> None:
         # Core validation remains in ExpenseManager; this is early UI feedback.
         if not self.categoryLineEdit.text().strip():
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import threading
+from typing import Any, Callable
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class BackgroundSaver(QObject):
+    """Write-behind persistence: coalesces change bursts and writes off the GUI thread.
+
+    ``mark_dirty`` is cheap and may be called on every mutation. After
+    ``quiet_ms`` without further changes the GUI thread takes one snapshot
+    (``snapshot()`` must return a dict of independent parts, e.g. one entry per
+    file or shard) and a worker thread passes it to ``write``. Snapshots that
+    arrive while a write is running are merged, so at most one write is queued.
+    """
+
+    saveFailed = Signal(str)
+    saveFinished = Signal(object)
+
+    def __init__(
+        self,
+        snapshot: Callable[[], dict[Any, Any]],
+        write: Callable[[dict[Any, Any]], None],
+        *,
+        quiet_ms: int = 400,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self._snapshot = snapshot
+        self._write = write
+        self._dirty = False
+        self._pending: dict[Any, Any] = {}
+        self._writing = False
+        # Set after a failed write so the worker waits for a new change or flush.
+        self._paused = False
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(quiet_ms)
+        self._timer.timeout.connect(self.submit_snapshot)
+
+        self._worker = threading.Thread(target=self._run, name="expense-saver", daemon=True)
+        self._worker.start()
+
+    def mark_dirty(self) -> None:
+        """Note a change; restarts the quiet-period timer."""
+        self._dirty = True
+        self._timer.start()
+
+    def is_busy(self) -> bool:
+        """True while local changes are waiting for, or in the middle of, a write."""
+        with self._condition:
+            return self._dirty or self._writing or bool(self._pending)
+
+    def submit_snapshot(self) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+        snapshot = self._snapshot()
+        with self._condition:
+            self._pending.update(snapshot)
+            self._paused = False
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or (self._pending and not self._paused))
+                if not self._pending or self._paused:
+                    return  # closed
+                snapshot, self._pending = self._pending, {}
+                self._writing = True
+            error: Exception | None = None
+            try:
+                self._write(snapshot)
+            except Exception as exc:  # surfaced to the UI, never fatal to the worker
+                error = exc
+            with self._condition:
+                if error is not None:
+                    # Keep the failed parts for the next attempt; newer snapshots win.
+                    self._pending = {**snapshot, **self._pending}
+                    self._paused = True
+                self._writing = False
+                self._condition.notify_all()
+            if error is not None:
+                self.saveFailed.emit(str(error))
+            else:
+                self.saveFinished.emit(snapshot)
+
+    def flush(self, timeout: float | None = 10.0) -> bool:
+        """Write outstanding changes now and wait for the worker.
+
+        Returns False if the data could not be written or the wait timed out.
+        """
+        self._timer.stop()
+        self.submit_snapshot()
+        with self._condition:
+            self._paused = False
+            self._condition.notify_all()
+            self._condition.wait_for(
+                lambda: not self._writing and (not self._pending or self._paused),
+                timeout,
+            )
+            return not self._writing and not self._pending
+
+    def close(self, timeout: float | None = 10.0) -> bool:
+        ok = self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
+        return ok
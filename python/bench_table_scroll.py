@@ -0,0 +1,92 @@
+"""Scroll benchmark for ExpenseTableModel on a large view.
+
+Usage (from the python folder):  python bench_table_scroll.py [rows] [frames]
+
+Pages through an offscreen QTableView and repaints synchronously after each
+step, reporting frames per second with the display-value cache and with the
+previous per-paint formatting.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication, QHeaderView, QTableView
+from table_model import ExpenseTableModel
+
+
+class UncachedExpenseTableModel(ExpenseTableModel):
+    """Formats every cell on every call, like the model did before caching."""
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            expense = self._expenses[index.row()]
+            column = index.column()
+            if column == 0:
+                return datetime.strptime(expense["date"], "%Y-%m-%d").strftime("%d %b %Y")
+            if column == 1:
+                return f"${expense['amount'] / 100:.2f}"
+        return super().data(index, role)
+
+
+def make_rows(count: int) -> list[dict]:
+    random.seed(7)
+    categories = ["Food", "Gas", "Rent", "Utilities", "Shopping", "Travel"]
+    return [
+        {
+            "id": idx,
+            "user": "bench",
+            "date": f"20{random.randint(20, 26)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+            "category": random.choice(categories),
+            "description": f"Expense {idx}",
+            "amount": random.randint(100, 50_000),  # cents, as ExpenseManager stores them
+        }
+        for idx in range(count)
+    ]
+
+
+def measure(view: QTableView, frames: int) -> float:
+    bar = view.verticalScrollBar()
+    step = max(bar.pageStep(), 1)
+    bar.setValue(0)
+    start = time.perf_counter()
+    for frame in range(frames):
+        bar.setValue((frame * step) % max(bar.maximum(), 1))
+        view.viewport().repaint()
+    return frames / (time.perf_counter() - start)
+
+
+def main() -> int:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    app = QApplication(sys.argv)
+    expenses = make_rows(rows)
+
+    for label, model_cls in (("uncached", UncachedExpenseTableModel), ("cached", ExpenseTableModel)):
+        model = model_cls([])
+        model.set_expenses(list(expenses))
+        view = QTableView()
+        view.setModel(model)
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        view.resize(1000, 800)
+        view.show()
+        app.processEvents()
+        if label == "cached":
+            view.verticalScrollBar().valueChanged.connect(
+                lambda _value, v=view, m=model: m.prefetch_rows(v.rowAt(0), v.rowAt(v.viewport().height() - 1))
+            )
+        # First pass fills caches; second pass is what a user scrolling back sees.
+        first = measure(view, frames)
+        second = measure(view, frames)
+        print(f"{label:>8}: {first:7.1f} fps first pass, {second:7.1f} fps repeat pass ({rows} rows)")
+        view.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+from __future__ import annotations
+import heapq
+import math
+import sys
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Iterable
+from memory_usage import MemoryEstimate, combine, deep_size, estimate_mapping
+
+# Sorts after any character, so bisecting "prefix + END" finds the end of the prefix range.
+PREFIX_END = chr(sys.maxunicode)
+
+
+def fold(value: str) -> str:
+    """Matching form of a value: case-folded with whitespace collapsed."""
+    return " ".join(value.split()).casefold()
+
+
+class CompletionIndex:
+    """Ranked prefix completion over the past values of one field, per user.
+
+    Each user's distinct values are kept sorted, so a prefix is a bisected range
+    of the list. Ranking uses an exponentially decayed use count stored in log
+    form (log2(weight) + last_day / half_life), so scores of values last used on
+    different days stay comparable without being recomputed as time passes.
+
+    Every prefix matching more than ``scan_limit`` values keeps an exact list of
+    its best values (between ``top_size`` and twice that), so a query never
+    scans more than ``scan_limit`` rows. A changed value is re-placed in those
+    lists only where it provably belongs; a list is rebuilt by a range scan
+    when removals shrink it below ``top_size``, which happens on the (rare)
+    delete rather than while the user is typing.
+    """
+
+    def __init__(self, *, half_life_days: float = 90.0, top_size: int = 16, scan_limit: int = 256) -> None:
+        self.half_life_days = half_life_days
+        self.top_size = top_size
+        self.scan_limit = scan_limit
+        # (user, folded value) -> [display text, use count, decayed weight, last day, score]
+        self._entries: dict[tuple[str, str], list] = {}
+        self._sorted: dict[str, list[str]] = {}
+        # (user, folded prefix) -> best folded values under that prefix, best first
+        self._top: dict[tuple[str, str], list[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._sorted.clear()
+        self._top.clear()
+
+    def score(self, weight: float, day: int) -> float:
+        return math.log2(weight) + day / self.half_life_days
+
+    def rank(self, user: str, key: str) -> tuple[float, str]:
+        # Sorts best first: highest score, then alphabetical.
+        return -self._entries[(user, key)][4], key
+
+    def record_use(self, user: str, key: str, value: str, day: int, uses: int = 1) -> bool:
+        """Count ``uses`` uses of a value on ``day``; returns True when the value is new."""
+        entry = self._entries.get((user, key))
+        if entry is None:
+            self._entries[(user, key)] = [value.strip(), uses, float(uses), day, self.score(float(uses), day)]
+            return True
+        entry[1] += uses
+        if day >= entry[3]:
+            # The most recently used spelling is the one offered.
+            entry[0] = value.strip()
+            entry[2] = entry[2] * 0.5 ** ((day - entry[3]) / self.half_life_days) + uses
+            entry[3] = day
+        else:
+            entry[2] += uses * 0.5 ** ((entry[3] - day) / self.half_life_days)
+        entry[4] = self.score(entry[2], entry[3])
+        return False
+
+    def add(self, user: str, value: str, iso_date: str) -> None:
+        key = fold(value)
+        if not key:
+            return
+        if self.record_use(user, key, value, date.fromisoformat(iso_date).toordinal()):
+            insort(self._sorted.setdefault(user, []), key)
+        self.replace_in_tops(user, key)
+
+    def replace_in_tops(self, user: str, key: str) -> None:
+        """Re-place a value whose score changed in every best-value list of its prefixes."""
+        values = self._sorted.get(user, [])
+        exists = (user, key) in self._entries
+        for length in range(len(key) + 1):
+            prefix = key[:length]
+            top = self._top.get((user, prefix))
+            if top is None:
+                continue
+            if key in top:
+                top.remove(key)
+            # The list is exact for its length, so the value may only join it when
+            # it beats the last entry or nothing else is left outside the list.
+            complete = len(top) + exists >= self.range_size(values, prefix)
+            if exists and (complete or not top or self.rank(user, key) < self.rank(user, top[-1])):
+                insort(top, key, key=lambda candidate: self.rank(user, candidate))
+                del top[2 * self.top_size :]
+            if len(top) < self.top_size and not complete:
+                self._top[(user, prefix)] = self.best_in_range(user, prefix, 2 * self.top_size)
+
+    def best_in_range(self, user: str, prefix: str, count: int) -> list[str]:
+        values = self._sorted.get(user, [])
+        low = bisect_left(values, prefix)
+        high = bisect_left(values, prefix + PREFIX_END, low)
+        return heapq.nsmallest(count, values[low:high], key=lambda key: self.rank(user, key))
+
+    def add_many(self, items: Iterable[tuple[str, str, str]]) -> None:
+        """Bulk add of (user, value, iso_date) for loads; sorts and ranks once at the end."""
+        self.add_counts((user, value, 1, iso_date) for user, value, iso_date in items)
+
+    def add_counts(self, items: Iterable[tuple[str, str, int, str]]) -> None:
+        """Bulk add of (user, value, uses, iso_date), e.g. pre-counted archive uses."""
+        days: dict[str, int] = {}
+        touched: set[str] = set()
+        for user, value, uses, iso_date in items:
+            key = fold(value)
+            if not key:
+                continue
+            day = days.get(iso_date)
+            if day is None:
+                day = days[iso_date] = date.fromisoformat(iso_date).toordinal()
+            if self.record_use(user, key, value, day, uses):
+                self._sorted.setdefault(user, []).append(key)
+            touched.add(user)
+        for user in touched:
+            self._sorted[user].sort()
+            self.warm(user)
+
+    def range_size(self, values: list[str], prefix: str) -> int:
+        low = bisect_left(values, prefix)
+        return bisect_left(values, prefix + PREFIX_END, low) - low
+
+    def warm(self, user: str) -> None:
+        """Rebuild the best-value list of every large prefix in one pass over the values."""
+        for top_key in [top_key for top_key in self._top if top_key[0] == user]:
+            del self._top[top_key]
+        values = self._sorted.get(user, [])
+        entries = self._entries
+        large: dict[str, bool] = {}
+        heaps: dict[str, list[tuple[float, int, str]]] = {}
+        size = 2 * self.top_size
+        for position, key in enumerate(values):
+            # Heap tops are the worst kept value: lowest score, then latest alphabetically.
+            item = (entries[(user, key)][4], -position, key)
+            for length in range(len(key) + 1):
+                prefix = key[:length]
+                is_large = large.get(prefix)
+                if is_large is None:
+                    is_large = large[prefix] = self.range_size(values, prefix) > self.scan_limit
+                if not is_large:
+                    break  # longer prefixes only match fewer values
+                heap = heaps.setdefault(prefix, [])
+                if len(heap) < size:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        for prefix, heap in heaps.items():
+            self._top[(user, prefix)] = [key for _score, _position, key in sorted(heap, reverse=True)]
+
+    def remove(self, user: str, value: str, iso_date: str) -> None:
+        """Undo one add; the decayed weight is reduced by that use's share."""
+        key = fold(value)
+        entry = self._entries.get((user, key))
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._entries[(user, key)]
+            values = self._sorted[user]
+            del values[bisect_left(values, key)]
+        else:
+            day = date.fromisoformat(iso_date).toordinal()
+            share = 0.5 ** (max(entry[3] - day, 0) / self.half_life_days)
+            entry[2] = max(entry[2] - share, 0.5**20)
+            entry[4] = self.score(entry[2], entry[3])
+        self.replace_in_tops(user, key)
+
+    def complete(self, user: str, prefix: str, limit: int = 10) -> list[str]:
+        """Best ``limit`` past values of ``user`` starting with ``prefix``, best first."""
+        folded = fold(prefix)
+        if prefix[-1:].isspace() and folded:
+            folded += " "
+        top = self._top.get((user, folded)) if limit <= self.top_size else None
+        if top is None:
+            top = self.best_in_range(user, folded, max(limit, 2 * self.top_size))
+            values = self._sorted.get(user, [])
+            if limit <= self.top_size and self.range_size(values, folded) > self.scan_limit:
+                self._top[(user, folded)] = top
+        return [self._entries[(user, key)][0] for key in top[:limit]]
+
+    def memory_usage(self) -> MemoryEstimate:
+        return combine(
+            (
+                estimate_mapping(self._entries, deep_size),
+                estimate_mapping(self._sorted, deep_size),
+                estimate_mapping(self._top, deep_size),
+            ),
+            len(self._entries),
+        )
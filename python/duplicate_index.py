@@ -0,0 +1,169 @@
+from __future__ import annotations
+from datetime import date
+from functools import lru_cache
+from typing import Any, Iterable
+from memory_usage import MemoryEstimate, combine, deep_size, estimate_mapping
+
+DuplicateKey = tuple[str, str, int, str, str]
+
+
+def duplicate_key(expense: dict[str, Any]) -> DuplicateKey:
+    """Normalized identity of an expense: user, date, cents, category, description."""
+    return (
+        expense["user"],
+        expense["date"],
+        expense["amount"],
+        expense["category"].strip().lower(),
+        " ".join(expense["description"].lower().split()),
+    )
+
+
+@lru_cache(maxsize=4096)
+def day_number(iso_date: str) -> int:
+    return date.fromisoformat(iso_date).toordinal()
+
+
+class DuplicateIndex:
+    """Hash index for spotting repeated expenses in O(1) per row.
+
+    Exact duplicates share a duplicate_key. Near-duplicates are rows of the same
+    user and amount within ``fuzzy_days`` of each other; they are found by probing
+    one day bucket per day of the window, never by comparing rows pairwise.
+    """
+
+    def __init__(self) -> None:
+        # Dicts used as insertion-ordered sets, so older rows are reported first.
+        self._exact: dict[DuplicateKey, dict[Any, None]] = {}
+        self._by_amount: dict[tuple[str, int], dict[int, dict[Any, None]]] = {}
+        self._keys: dict[Any, DuplicateKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self) -> None:
+        self._exact.clear()
+        self._by_amount.clear()
+        self._keys.clear()
+
+    def add(self, doc_id: Any, expense: dict[str, Any]) -> None:
+        if doc_id in self._keys:
+            self.remove(doc_id)
+        key = duplicate_key(expense)
+        self._keys[doc_id] = key
+        self._exact.setdefault(key, {})[doc_id] = None
+        days = self._by_amount.setdefault((key[0], key[2]), {})
+        days.setdefault(day_number(key[1]), {})[doc_id] = None
+
+    def add_many(self, docs: Iterable[tuple[Any, dict[str, Any]]]) -> None:
+        """Bulk add for loads: normalizes each distinct text and date only once."""
+        exact, by_amount, keys = self._exact, self._by_amount, self._keys
+        categories: dict[str, str] = {}
+        descriptions: dict[str, str] = {}
+        days: dict[str, int] = {}
+        for doc_id, expense in docs:
+            if doc_id in keys:
+                self.add(doc_id, expense)
+                continue
+            category = expense["category"]
+            normalized_category = categories.get(category)
+            if normalized_category is None:
+                normalized_category = categories[category] = category.strip().lower()
+            description = expense["description"]
+            normalized_description = descriptions.get(description)
+            if normalized_description is None:
+                normalized_description = descriptions[description] = " ".join(description.lower().split())
+            iso_date = expense["date"]
+            day = days.get(iso_date)
+            if day is None:
+                day = days[iso_date] = day_number(iso_date)
+            user = expense["user"]
+            cents = expense["amount"]
+            key = (user, iso_date, cents, normalized_category, normalized_description)
+            keys[doc_id] = key
+            ids = exact.get(key)
+            if ids is None:
+                exact[key] = {doc_id: None}
+            else:
+                ids[doc_id] = None
+            amount_days = by_amount.get((user, cents))
+            if amount_days is None:
+                by_amount[(user, cents)] = {day: {doc_id: None}}
+            else:
+                ids = amount_days.get(day)
+                if ids is None:
+                    amount_days[day] = {doc_id: None}
+                else:
+                    ids[doc_id] = None
+
+    def remove(self, doc_id: Any) -> None:
+        key = self._keys.pop(doc_id, None)
+        if key is None:
+            return
+        ids = self._exact[key]
+        del ids[doc_id]
+        if not ids:
+            del self._exact[key]
+        amount_key = (key[0], key[2])
+        days = self._by_amount[amount_key]
+        day = day_number(key[1])
+        ids = days[day]
+        del ids[doc_id]
+        if not ids:
+            del days[day]
+            if not days:
+                del self._by_amount[amount_key]
+
+    def update(self, doc_id: Any, expense: dict[str, Any]) -> None:
+        self.add(doc_id, expense)
+
+    def memory_usage(self) -> MemoryEstimate:
+        return combine(
+            (
+                estimate_mapping(self._keys, deep_size),
+                estimate_mapping(self._exact, deep_size),
+                estimate_mapping(self._by_amount, deep_size),
+            ),
+            len(self._keys),
+        )
+
+    def matches(self, expense: dict[str, Any], *, fuzzy_days: int = 0) -> list[Any]:
+        """Ids of indexed rows duplicating ``expense``: exact matches first, then near ones."""
+        key = duplicate_key(expense)
+        found = dict(self._exact.get(key, {}))
+        if fuzzy_days > 0:
+            days = self._by_amount.get((key[0], key[2]))
+            if days:
+                day = day_number(key[1])
+                for offset in sorted(range(-fuzzy_days, fuzzy_days + 1), key=abs):
+                    found.update(days.get(day + offset, {}))
+        found.pop(expense.get("id"), None)
+        return list(found)
+
+    def groups(self, *, fuzzy_days: int = 0) -> list[list[Any]]:
+        """Every set of rows that duplicate each other, in one pass over the buckets.
+
+        With ``fuzzy_days`` rows chain into one group while consecutive dates are at
+        most that many days apart.
+        """
+        if fuzzy_days <= 0:
+            return [list(ids) for ids in self._exact.values() if len(ids) > 1]
+        found: list[list[Any]] = []
+        for days in self._by_amount.values():
+            if len(days) == 1:
+                ids = next(iter(days.values()))
+                if len(ids) > 1:
+                    found.append(list(ids))
+                continue
+            group: list[Any] = []
+            previous: int | None = None
+            for day in sorted(days):
+                if previous is not None and day - previous > fuzzy_days:
+                    if len(group) > 1:
+                        found.append(group)
+                    group = []
+                group.extend(days[day])
+                previous = day
+            if len(group) > 1:
+                found.append(group)
+        return found
+
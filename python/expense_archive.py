@@ -0,0 +1,365 @@
+from __future__ import annotations
+import json
+import lzma
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable
+from file_io import file_fingerprint, file_lock
+from memory_usage import MemoryEstimate, combine, estimate_rows
+from money import export_records, import_records
+from rollup_file import RollupTotals, tally
+
+MAGIC = b"EXPARC1\n"
+FOOTER = struct.Struct("<QQ8s")
+FOOTER_MAGIC = b"EXPIDX1\n"
+# Free-text fields whose per-user value counts each block keeps in a compressed
+# summary next to its rows (see count_uses), so the JSON index holds no free text.
+USE_FIELDS = ("category", "description")
+CODECS = {
+    "zlib": (lambda raw: zlib.compress(raw, 6), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def count_uses(rows: Iterable[dict[str, Any]]) -> dict[str, dict[str, dict[str, list]]]:
+    """user -> field -> value -> [rows, latest ISO date] over USE_FIELDS."""
+    uses: dict[str, dict[str, dict[str, list]]] = {}
+    for expense in rows:
+        fields = uses.setdefault(expense["user"], {})
+        for field in USE_FIELDS:
+            cell = fields.setdefault(field, {}).setdefault(expense[field], [0, expense["date"]])
+            cell[0] += 1
+            if expense["date"] > cell[1]:
+                cell[1] = expense["date"]
+    return uses
+
+
+def day_cents(
+    rows: Iterable[dict[str, Any]], totals: dict[str, dict[str, Any]]
+) -> dict[str, list[list[int]]]:
+    """user -> [[position of the folded category in totals[user], day of month, cents], ...]."""
+    positions = {
+        user: {category: position for position, category in enumerate(categories)}
+        for user, categories in totals.items()
+    }
+    cells: dict[tuple[str, int, int], int] = {}
+    for expense in rows:
+        key = (expense["user"], positions[expense["user"]][expense["category"].strip().lower()], int(expense["date"][8:10]))
+        cells[key] = cells.get(key, 0) + expense["amount"]
+    days: dict[str, list[list[int]]] = {}
+    for (user, position, day), cents in sorted(cells.items()):
+        days.setdefault(user, []).append([position, day, cents])
+    return days
+
+
+def lists(block: dict[str, Any], user: str | None, category: str | None) -> bool:
+    """Whether a block index entry has rows of ``user`` and folded ``category`` (empty: any)."""
+    users = block["users"]
+    if user and user not in users:
+        return False
+    if not category:
+        return True
+    names = users[user] if user else [name for values in users.values() for name in values]
+    return any(name.strip().lower() == category for name in names)
+
+
+class ExpenseArchive:
+    """Compressed, read-mostly storage for closed months of expense history.
+
+    Layout: a magic header, one independently compressed JSON block per month,
+    then a JSON block index and a fixed-size footer pointing at it. A range read
+    decompresses only the blocks of the months it overlaps that list its user.
+    """
+
+    def __init__(self, path: str | Path, *, codec: str = "zlib", cache_rows: int = 200_000) -> None:
+        if codec not in CODECS:
+            raise ValueError(f"Unknown archive codec: {codec}")
+        self.path = Path(path)
+        self.codec = codec
+        self._index: dict[str, dict[str, Any]] | None = None
+        self._fingerprint: tuple[int, int] | None = None
+        # Recently decompressed months in LRU order, bounded by their total rows
+        # (the newest block is always kept); rows keep their identity while cached.
+        self._cache: OrderedDict[tuple[str, int], list[dict[str, Any]]] = OrderedDict()
+        self._cache_rows = cache_rows
+        self._cached_rows = 0
+
+    def index(self) -> dict[str, dict[str, Any]]:
+        """Block metadata by "YYYY-MM": offset, length, codec, count, users -> categories
+        and (blocks written since totals were added) user -> folded category -> [cents, count]
+        and user -> [category position, day, cents] (see day_cents) and the offset, length
+        and crc32 of a compressed value-use summary (see count_uses).
+
+        Re-read when another instance has rewritten the file since the last look.
+        """
+        fingerprint = file_fingerprint(self.path)
+        if self._index is None or fingerprint != self._fingerprint:
+            self._index = self._read_index()
+            self._fingerprint = fingerprint
+            self.clear_cache()
+        return self._index
+
+    def _read_index(self) -> dict[str, dict[str, Any]]:
+        with file_lock(self.path, exclusive=False):
+            return self._load_index()
+
+    def _load_index(self) -> dict[str, dict[str, Any]]:
+        # Callers hold the archive lock.
+        if not self.path.exists():
+            return {}
+        with self.path.open("rb") as handle:
+            if handle.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not an expense archive: {self.path}")
+            handle.seek(-FOOTER.size, os.SEEK_END)
+            offset, length, magic = FOOTER.unpack(handle.read(FOOTER.size))
+            if magic != FOOTER_MAGIC:
+                raise ValueError(f"Archive index is missing or truncated: {self.path}")
+            handle.seek(offset)
+            data = json.loads(handle.read(length))
+        return {block["month"]: block for block in data["blocks"]}
+
+    def memory_usage(self) -> MemoryEstimate:
+        """Estimated bytes of the decompressed blocks currently cached."""
+        return combine(
+            (estimate_rows(rows) for rows in self._cache.values()),
+            sum(len(rows) for rows in self._cache.values()),
+        )
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+        self._cached_rows = 0
+
+    def months(self) -> list[str]:
+        return sorted(self.index())
+
+    def categories(self, *, user: str | None = None) -> set[str]:
+        values: set[str] = set()
+        for block in self.index().values():
+            for block_user, categories in block["users"].items():
+                if not user or block_user == user:
+                    values.update(categories)
+        return values
+
+    def user_categories(self) -> set[tuple[str, str]]:
+        """Every (user, category) pair with rows in some block."""
+        return {
+            (user, category)
+            for block in self.index().values()
+            for user, categories in block["users"].items()
+            for category in categories
+        }
+
+    def totals(self) -> RollupTotals:
+        """Cents and row counts per (user, month, folded category) of every block.
+
+        Read from the block index; only blocks written before it carried totals
+        are decompressed.
+        """
+        totals: RollupTotals = {}
+        legacy: list[str] = []
+        for month, block in self.index().items():
+            if "totals" not in block:
+                legacy.append(month)
+                continue
+            for user, categories in block["totals"].items():
+                for category, (cents, count) in categories.items():
+                    totals[(user, month, category)] = [cents, count]
+        return tally(self.read_months(legacy), totals) if legacy else totals
+
+    def day_totals(self) -> list[tuple[str, str, str, int]]:
+        """(user, folded category, ISO date, cents) of every day with archived rows.
+
+        Read from the block index; older blocks without day totals are decompressed.
+        """
+        found: list[tuple[str, str, str, int]] = []
+        legacy: list[str] = []
+        for month, block in self.index().items():
+            if "daily" not in block:
+                legacy.append(month)
+                continue
+            for user, cells in block["daily"].items():
+                categories = list(block["totals"][user])
+                for position, day, cents in cells:
+                    found.append((user, categories[position], f"{month}-{day:02d}", cents))
+        days: dict[tuple[str, str, str], int] = {}
+        for month in legacy:
+            for expense in self.read_months([month]):
+                key = (expense["user"], expense["category"].strip().lower(), expense["date"])
+                days[key] = days.get(key, 0) + expense["amount"]
+        found.extend((user, category, day, cents) for (user, category, day), cents in days.items())
+        return found
+
+    def value_uses(self, field: str) -> list[tuple[str, str, int, str]]:
+        """(user, value, uses, latest ISO date) of one USE_FIELDS field, per block.
+
+        Read from each block's summary; older blocks without one are decompressed.
+        """
+        found: list[tuple[str, str, int, str]] = []
+        blocks = []
+        index = self.index()
+        summarized = [block for block in index.values() if "summary" in block]
+        if summarized:
+            with file_lock(self.path, exclusive=False):
+                with self.path.open("rb") as handle:
+                    blocks.extend(self._read_summary(handle, block) for block in summarized)
+        legacy = [month for month, block in index.items() if "summary" not in block]
+        # Counted per month, so each month's uses keep their own latest date.
+        blocks.extend(count_uses(self.read_months([month])) for month in legacy)
+        for uses in blocks:
+            for user, fields in uses.items():
+                for value, (count, last) in fields.get(field, {}).items():
+                    found.append((user, value, count, last))
+        return found
+
+    @staticmethod
+    def _read_summary(handle, block: dict[str, Any]) -> dict[str, Any]:
+        summary = block["summary"]
+        handle.seek(summary["offset"])
+        raw = handle.read(summary["length"])
+        if zlib.crc32(raw) != summary["crc32"]:
+            raise ValueError(f"Archive summary {block['month']} is corrupt")
+        return json.loads(CODECS[block["codec"]][1](raw))
+
+    def signature(self) -> str:
+        """Changes whenever any block is added, dropped or rewritten."""
+        blocks = sorted((month, block["crc32"], block["count"]) for month, block in self.index().items())
+        return f"crc32:{zlib.crc32(json.dumps(blocks).encode('utf-8')):08x}"
+
+    def read_months(self, months: Iterable[str]) -> list[dict[str, Any]]:
+        """Rows of the given months, decompressing each requested block at most once."""
+        index = self.index()
+        wanted = sorted(month for month in set(months) if month in index)
+        rows: list[dict[str, Any]] = []
+        if not wanted:
+            return rows
+        with file_lock(self.path, exclusive=False):
+            with self.path.open("rb") as handle:
+                for month in wanted:
+                    rows.extend(self._read_block(handle, index[month]))
+        return rows
+
+    def _read_block(self, handle, block: dict[str, Any]) -> list[dict[str, Any]]:
+        cache_key = (block["month"], block["offset"])
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            return cached
+        handle.seek(block["offset"])
+        raw = handle.read(block["length"])
+        if zlib.crc32(raw) != block["crc32"]:
+            raise ValueError(f"Archive block {block['month']} is corrupt")
+        rows = import_records(json.loads(CODECS[block["codec"]][1](raw)))
+        self._cache[cache_key] = rows
+        self._cached_rows += len(rows)
+        while self._cached_rows > self._cache_rows and len(self._cache) > 1:
+            self._cached_rows -= len(self._cache.popitem(last=False)[1])
+        return rows
+
+    def read_range(
+        self,
+        from_date: str | None = None,
+        to_date: str | None = None,
+        *,
+        user: str | None = None,
+        category: str | None = None,
+        months: Iterable[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Rows within an inclusive ISO date range, optionally of one user and folded category.
+
+        Only blocks that overlap the range (and ``months``, when given) and whose
+        index lists the user and category are decompressed.
+        """
+        allowed = set(months) if months is not None else None
+        wanted = [
+            month
+            for month, block in self.index().items()
+            if (not from_date or month >= from_date[:7])
+            and (not to_date or month <= to_date[:7])
+            and (allowed is None or month in allowed)
+            and lists(block, user, category)
+        ]
+        return [
+            expense
+            for expense in self.read_months(wanted)
+            if (not from_date or expense["date"] >= from_date)
+            and (not to_date or expense["date"] <= to_date)
+            and (not user or expense["user"] == user)
+        ]
+
+    def write_months(self, rows_by_month: dict[str, list[dict[str, Any]]]) -> None:
+        """Add, merge or (with an empty list) drop month blocks.
+
+        Rows are merged into an existing month by id, so re-archiving a month after
+        an interrupted save does not duplicate it. Untouched blocks are copied as
+        compressed bytes, and the new file is swapped in atomically.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path, exclusive=True):
+            self._index = self._load_index()
+            self.clear_cache()
+            index = self._index
+            temp_path = self.path.with_name(self.path.name + ".tmp")
+            blocks: list[dict[str, Any]] = []
+            source = self.path.open("rb") if self.path.exists() else None
+            try:
+                with temp_path.open("wb") as out:
+                    out.write(MAGIC)
+                    for month in sorted(set(index) | set(rows_by_month)):
+                        if month not in rows_by_month:
+                            block = dict(index[month])
+                            source.seek(block["offset"])
+                            raw = source.read(block["length"])
+                            summary_raw = None
+                            if "summary" in block:
+                                source.seek(block["summary"]["offset"])
+                                summary_raw = source.read(block["summary"]["length"])
+                        else:
+                            merged: dict[Any, dict[str, Any]] = {}
+                            if month in index and rows_by_month[month]:
+                                for expense in self._read_block(source, index[month]):
+                                    merged[expense["id"]] = expense
+                            for expense in rows_by_month[month]:
+                                merged[expense["id"]] = expense
+                            if not merged:
+                                continue
+                            rows = sorted(merged.values(), key=lambda expense: expense["date"])
+                            raw = CODECS[self.codec][0](json.dumps(export_records(rows), separators=(",", ":")).encode("utf-8"))
+                            users: dict[str, set[str]] = {}
+                            for expense in rows:
+                                users.setdefault(expense["user"], set()).add(expense["category"])
+                            totals: dict[str, dict[str, list[int]]] = {}
+                            for (user, _month, category), cell in sorted(tally(rows).items()):
+                                totals.setdefault(user, {})[category] = cell
+                            block = {
+                                "month": month,
+                                "codec": self.codec,
+                                "count": len(rows),
+                                "users": {user: sorted(values) for user, values in sorted(users.items())},
+                                "totals": totals,
+                                "daily": day_cents(rows, totals),
+                            }
+                            summary_raw = CODECS[self.codec][0](
+                                json.dumps(count_uses(rows), separators=(",", ":")).encode("utf-8")
+                            )
+                        block["offset"] = out.tell()
+                        block["length"] = len(raw)
+                        block["crc32"] = zlib.crc32(raw)
+                        out.write(raw)
+                        if summary_raw is not None:
+                            block["summary"] = {"offset": out.tell(), "length": len(summary_raw), "crc32": zlib.crc32(summary_raw)}
+                            out.write(summary_raw)
+                        blocks.append(block)
+                    index_offset = out.tell()
+                    index_raw = json.dumps({"version": 1, "blocks": blocks}).encode("utf-8")
+                    out.write(index_raw)
+                    out.write(FOOTER.pack(index_offset, len(index_raw), FOOTER_MAGIC))
+            finally:
+                if source is not None:
+                    source.close()
+            os.replace(temp_path, self.path)
+            self._index = {block["month"]: block for block in blocks}
+            self._fingerprint = file_fingerprint(self.path)
+            self.clear_cache()
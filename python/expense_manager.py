@@ -1,10 +1,98 @@
 from __future__ import annotations
+import calendar
 import json
-from collections import defaultdict
-from datetime import date, datetime
+import os
+import re
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, Sequence
+import expense_stats
+from completion_index import CompletionIndex
+from duplicate_index import DuplicateIndex
+from expense_archive import ExpenseArchive
+from file_io import (
+    file_fingerprint,
+    file_lock,
+    read_checksummed_json,
+    read_snapshot_checksum,
+    write_checksummed_json,
+    write_json_atomic,
+)
+from memory_usage import MemoryEstimate, combine, estimate_mapping, estimate_rows
+from money import export_records, import_records, parse_cents, to_amount
+from name_registry import NameRegistry
+from partition_store import PartitionKey, PartitionStore, partition_key
+from recurring import SpendingForecast, forecast
+from rollup_file import RollupSnapshot, RollupTotals, merge_totals, read_rollup_file, tally, write_rollup_file
+from search_index import SearchIndex
+from spending_rollups import SpendingRollups
+from undo_log import Delta, Operation, UndoLog
 
+# Strict zero-padded form; anything else goes through the lenient strptime path.
+ISO_DATE_PATTERN = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+# Free-text fields offered as autocomplete suggestions; see suggest_values.
+COMPLETION_FIELDS = ("category", "description")
+# Percentages of a monthly budget that raise an alert when spending crosses them.
+BUDGET_THRESHOLDS = (80, 100)
+# memory_usage() entries freed by drop_caches (plus every "<field>_completions").
+CACHE_USAGE_KEYS = ("duplicate_index", "archive_cache", "archive_search_index", "forecast_history")
+# After a budget crossing, usage must fall below this share of the budget to count again.
+MEMORY_BUDGET_REARM = 0.9
+
+@dataclass
+class ExpenseChanges:
+    """Record-level diff produced by ExpenseManager.sync_from_json."""
+
+    added: list[dict[str, Any]] = field(default_factory=list)
+    updated: list[tuple[dict[str, Any], dict[str, Any]]] = field(default_factory=list)
+    removed: list[dict[str, Any]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+@dataclass
+class FileLoadReport:
+    """Outcome of merging one file in ExpenseManager.merge_files."""
+
+    path: Path
+    added: int = 0
+    # Rows whose id and content were already present, e.g. shared history.
+    skipped: int = 0
+    # Rows whose id clashed with a different row and got a fresh one.
+    reassigned: int = 0
+    error: str | None = None
+
+
+@dataclass
+class BudgetStatus:
+    """One user's spending in a month against their budget for a category."""
+
+    user: str
+    # Folded (stripped, lower-case) category name.
+    category: str
+    month: str
+    limit: int
+    spent: int
+    # The BUDGET_THRESHOLDS step an add or edit just crossed; None in plain reports.
+    crossed: int | None = None
+
+    @property
+    def percent(self) -> float:
+        return self.spent * 100 / self.limit if self.limit else 0.0
+
+
+def read_ledger_file(path: str) -> tuple[list[dict[str, Any]], str | None]:
+    """Process-pool entry point: read and validate one file, returning rows or an error."""
+    try:
+        return ExpenseManager().read_expenses_file(Path(path)), None
+    except (OSError, ValueError) as exc:
+        return [], str(exc)
 
 
 class ExpenseManager:
@@ -13,6 +101,354 @@ class ExpenseManager:
     def __init__(self) -> None:
         # Canonical in-memory store. UI modules treat this as source of truth.
         self.expenses: list[dict[str, Any]] = []
+        # Stable record ids let two app instances diff the shared file cheaply.
+        self._by_id: dict[Any, dict[str, Any]] = {}
+        # Word/prefix index over description and category for search-as-you-type.
+        self.search_index = SearchIndex()
+        # Exact and same-amount-nearby-date lookups for duplicate warnings; built on
+        # first use (see duplicate_lookup) so plain loads do not pay for it.
+        self.duplicate_index: DuplicateIndex | None = None
+        # Ranked prefix indexes per COMPLETION_FIELDS entry, also built on first use,
+        # seeded with the archive's use counts as of completion_signature.
+        self.completion_indexes: dict[str, CompletionIndex] | None = None
+        self.completion_signature: str | None = None
+        # Per-user day/week/month spending totals, also built on first use and seeded
+        # with the archive's day totals as of rollup_signature. They are small, so
+        # unlike the indexes above drop_caches keeps them.
+        self.rollups: SpendingRollups | None = None
+        self.rollup_signature: str | None = None
+        # spending_forecast results per (user, day) with the archive signature they
+        # saw; a tracked change drops only its user's entries and the everyone entries.
+        self.forecasts: dict[tuple[str | None, date], tuple[str | None, SpendingForecast]] = {}
+        # Bumped whenever forecasts are dropped, so a forecast computed elsewhere from
+        # older rows is not stored; see forecast_input.
+        self.forecast_generation = 0
+        # Archived rows per forecast user (None for everyone) with the archive signature
+        # they were read at, so live edits do not decompress the history again.
+        self.forecast_history: dict[str | None, tuple[str, list[dict[str, Any]]]] = {}
+        # Monthly budget in cents per (user, folded category); see set_budget.
+        self.budgets: dict[tuple[str, str], int] = {}
+        # Called with a BudgetStatus when an add or edit crosses a BUDGET_THRESHOLDS step.
+        self.budget_listeners: list[Callable[[BudgetStatus], None]] = []
+        # Users, and folded categories per user ("" for everyone), counted per row plus
+        # pins for names that only unloaded shards or the archive hold; see refresh_name_pins.
+        self.user_names = NameRegistry()
+        self.category_names: dict[str, NameRegistry] = {"": NameRegistry()}
+        # Stand-in for users without categories (e.g. a name being typed); never changes.
+        self.no_categories = NameRegistry()
+        self.name_pins: set[tuple[str, str | None]] = set()
+        # Users added by hand before they have any expenses; pinned like shard users.
+        self.manual_users: set[str] = set()
+        # Inverse-able deltas of local edits, for undo/redo; see undo and batch.
+        self.history = UndoLog()
+        # Fingerprint of the last file this instance wrote or read.
+        self.last_fingerprint: tuple[int, int] | None = None
+        # Payload checksum of the JSON file last written, or read and verified.
+        self.data_checksum: str | None = None
+        # Sidecar of per user/month/category totals written with every JSON save;
+        # see write_rollup_sidecar. archive_rollup is the archive's share with its
+        # signature, swapped (never mutated) on archive changes so the save thread can read it.
+        self.rollup_path: Path | None = None
+        self.archive_rollup: tuple[str, RollupTotals] | None = None
+        # Optional per-user/month shard storage; see attach_store.
+        self.store: PartitionStore | None = None
+        self.max_loaded_rows = 0
+        # Loaded shards in LRU order (oldest first), mapped to their manifest revision.
+        self.loaded_partitions: OrderedDict[PartitionKey, int | None] = OrderedDict()
+        self.dirty_partitions: set[PartitionKey] = set()
+        # Shards handed to the saver, with the rows being written. They stay loaded
+        # until partitions_saved, so an eviction cannot reload the old file meanwhile.
+        self.saving_partitions: dict[PartitionKey, tuple[dict[str, Any], ...]] = {}
+        # Optional compressed store for closed months; see attach_archive.
+        self.archive: ExpenseArchive | None = None
+        # Search index over archived rows keyed by (month, id), with the archive
+        # signature it was built from; built on the first archive search.
+        self.archive_search: tuple[str, SearchIndex] | None = None
+        # Soft cap in bytes for memory_usage(); see enforce_memory_budget.
+        self.memory_budget: int | None = None
+        # Set on crossing the budget, cleared once usage is back under MEMORY_BUDGET_REARM.
+        self.over_memory_budget = False
+        # Called after every local mutation, e.g. to schedule a background save.
+        self.change_listeners: list[Callable[[], None]] = []
+
+    def memory_usage(self) -> dict[str, MemoryEstimate]:
+        """Estimated bytes held by the ledger and each index, with per-row overhead."""
+        usage = {
+            "expenses": estimate_rows(self.expenses),
+            "id_index": estimate_mapping(self._by_id),
+            "search_index": self.search_index.memory_usage(),
+        }
+        if self.duplicate_index is not None:
+            usage["duplicate_index"] = self.duplicate_index.memory_usage()
+        if self.completion_indexes is not None:
+            for name, index in self.completion_indexes.items():
+                usage[f"{name}_completions"] = index.memory_usage()
+        if self.rollups is not None:
+            usage["rollups"] = self.rollups.memory_usage()
+        if self.archive is not None:
+            usage["archive_cache"] = self.archive.memory_usage()
+        if self.archive_search is not None:
+            usage["archive_search_index"] = self.archive_search[1].memory_usage()
+        if self.forecast_history:
+            histories = [rows for _signature, rows in self.forecast_history.values()]
+            usage["forecast_history"] = combine(map(estimate_rows, histories), sum(map(len, histories)))
+        if self.history.can_undo() or self.history.can_redo():
+            usage["undo_history"] = self.history.memory_usage()
+        return usage
+
+    def drop_caches(self) -> None:
+        """Free structures that are rebuilt on demand: lookup indexes, archive blocks and history."""
+        self.duplicate_index = None
+        self.completion_indexes = None
+        self.archive_search = None
+        self.forecast_history.clear()
+        if self.archive is not None:
+            self.archive.clear_cache()
+
+    def enforce_memory_budget(self, extra_bytes: int = 0) -> int | None:
+        """Handle a crossing of the budget by usage plus ``extra_bytes`` (e.g. UI views).
+
+        Caches are dropped only when they are what pushes usage over; a ledger
+        that is over budget on its own keeps them, as they would just be rebuilt.
+        Returns the estimated total once per crossing, else None.
+        """
+        if self.memory_budget is None:
+            return None
+        usage = self.memory_usage()
+        total = extra_bytes + sum(estimate.bytes for estimate in usage.values())
+        if self.over_memory_budget:
+            if total < self.memory_budget * MEMORY_BUDGET_REARM:
+                self.over_memory_budget = False
+            return None
+        if total <= self.memory_budget:
+            return None
+        self.over_memory_budget = True
+        cached = sum(
+            estimate.bytes
+            for key, estimate in usage.items()
+            if key in CACHE_USAGE_KEYS or key.endswith("_completions")
+        )
+        if cached and total - cached <= self.memory_budget:
+            self.drop_caches()
+        return total
+
+    def add_change_listener(self, callback: Callable[[], None]) -> None:
+        self.change_listeners.append(callback)
+
+    def notify_changed(self) -> None:
+        for callback in list(self.change_listeners):
+            callback()
+
+    def add_budget_listener(self, callback: Callable[[BudgetStatus], None]) -> None:
+        self.budget_listeners.append(callback)
+
+    def new_expense_id(self) -> str:
+        # Random ids avoid collisions between instances adding rows concurrently.
+        return uuid.uuid4().hex
+
+    def with_id(self, expense: dict[str, Any], expense_id: Any = None) -> dict[str, Any]:
+        if expense_id is None or isinstance(expense_id, bool) or expense_id in self._by_id:
+            expense_id = self.new_expense_id()
+        return {"id": expense_id, **expense}
+
+    def claim_ids(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Give freshly read records (with "id" first) a unique id in place.
+
+        Legacy files have no ids and merged files may reuse ours; both get fresh ones.
+        """
+        seen: set[Any] = set()
+        by_id = self._by_id
+        for expense in records:
+            expense_id = expense["id"]
+            if expense_id is None or isinstance(expense_id, bool) or expense_id in by_id or expense_id in seen:
+                expense_id = expense["id"] = self.new_expense_id()
+            seen.add(expense_id)
+        return records
+
+    def category_registry(self, user: str) -> NameRegistry:
+        registry = self.category_names.get(user)
+        if registry is None:
+            registry = self.category_names[user] = NameRegistry()
+        return registry
+
+    def add_names(self, user: str, category: str | None, count: int = 1) -> None:
+        """Count ``count`` references to a user and, unless None, one of their folded categories."""
+        if category is None:
+            self.user_names.add(user, count)
+            return
+        self.category_registry(user).add(category, count)
+        self.category_names[""].add(category, count)
+
+    def remove_names(self, user: str, category: str | None, count: int = 1) -> None:
+        if category is None:
+            self.user_names.remove(user, count)
+            return
+        self.category_registry(user).remove(category, count)
+        self.category_names[""].remove(category, count)
+
+    def track_expense(self, expense: dict[str, Any]) -> None:
+        """Register a record that just entered self.expenses with every index."""
+        self.drop_forecasts(expense["user"])
+        self._by_id[expense["id"]] = expense
+        self.add_names(expense["user"], None)
+        self.add_names(expense["user"], expense_stats.category_key(expense))
+        self.search_index.add(expense["id"], self.search_text(expense))
+        if self.duplicate_index is not None:
+            self.duplicate_index.add(expense["id"], expense)
+        if self.completion_indexes is not None:
+            for name, index in self.completion_indexes.items():
+                index.add(expense["user"], expense[name], expense["date"])
+        if self.rollups is not None:
+            self.rollups.add(expense)
+
+    def track_expenses(self, expenses: list[dict[str, Any]]) -> None:
+        """Bulk form of track_expense for loads."""
+        self.drop_forecasts(*{expense["user"] for expense in expenses})
+        by_id = self._by_id
+        for expense in expenses:
+            by_id[expense["id"]] = expense
+        pairs = Counter((expense["user"], expense["category"]) for expense in expenses)
+        for (user, category), count in pairs.items():
+            self.add_names(user, None, count)
+            self.add_names(user, category.strip().lower(), count)
+        self.search_index.add_many((expense["id"], self.search_text(expense)) for expense in expenses)
+        if self.duplicate_index is not None:
+            self.duplicate_index.add_many((expense["id"], expense) for expense in expenses)
+        if self.completion_indexes is not None:
+            for name, index in self.completion_indexes.items():
+                index.add_many((expense["user"], expense[name], expense["date"]) for expense in expenses)
+        if self.rollups is not None:
+            self.rollups.add_many(expenses)
+
+    def untrack_expense(self, expense: dict[str, Any]) -> None:
+        """Drop a record that just left self.expenses from every index."""
+        self.drop_forecasts(expense["user"])
+        self._by_id.pop(expense["id"], None)
+        self.remove_names(expense["user"], None)
+        self.remove_names(expense["user"], expense_stats.category_key(expense))
+        self.search_index.remove(expense["id"])
+        if self.duplicate_index is not None:
+            self.duplicate_index.remove(expense["id"])
+        if self.completion_indexes is not None:
+            for name, index in self.completion_indexes.items():
+                index.remove(expense["user"], expense[name], expense["date"])
+        if self.rollups is not None:
+            self.rollups.remove(expense)
+
+    def retrack_expense(self, old: dict[str, Any], new: dict[str, Any]) -> None:
+        """Move index entries from an edited record's old version to its new one."""
+        self.drop_forecasts(old["user"], new["user"])
+        self._by_id[new["id"]] = new
+        if old["user"] != new["user"] or old["category"] != new["category"]:
+            self.add_names(new["user"], None)
+            self.add_names(new["user"], expense_stats.category_key(new))
+            self.remove_names(old["user"], None)
+            self.remove_names(old["user"], expense_stats.category_key(old))
+        self.search_index.update(new["id"], self.search_text(new))
+        if self.duplicate_index is not None:
+            self.duplicate_index.update(new["id"], new)
+        if self.completion_indexes is not None:
+            for name, index in self.completion_indexes.items():
+                index.remove(old["user"], old[name], old["date"])
+                index.add(new["user"], new[name], new["date"])
+        if self.rollups is not None:
+            self.rollups.remove(old)
+            self.rollups.add(new)
+
+    def drop_forecasts(self, *users: str) -> None:
+        """Forget cached forecasts of ``users`` and of everyone."""
+        self.forecast_generation += 1
+        for key in [key for key in self.forecasts if key[0] is None or key[0] in users]:
+            del self.forecasts[key]
+
+    def reset_indexes(self) -> None:
+        self._by_id = {}
+        self.search_index.clear()
+        self.duplicate_index = None
+        self.completion_indexes = None
+        self.rollups = None
+        self.forecasts.clear()
+        self.forecast_generation += 1
+        self.forecast_history.clear()
+        self.user_names.clear()
+        for registry in self.category_names.values():
+            registry.clear()
+        self.name_pins = set()
+        self.refresh_name_pins()
+
+    def refresh_name_pins(self) -> None:
+        """Pin users and categories known only from unloaded shards, the archive or by hand.
+
+        Call after the shard manifest, the archive or manual_users changed; only the
+        difference to the previous pins reaches the registries.
+        """
+        pins: set[tuple[str, str | None]] = {(user, None) for user in self.manual_users}
+        if self.store is not None:
+            pins |= {(user, None) for user in self.store.users()}
+            pins |= {(user, category.strip().lower()) for user, category in self.store.user_categories()}
+        if self.archive is not None:
+            for user, category in self.archive.user_categories():
+                pins.add((user, None))
+                pins.add((user, category.strip().lower()))
+        for user, category in pins - self.name_pins:
+            self.add_names(user, category)
+        for user, category in self.name_pins - pins:
+            self.remove_names(user, category)
+        self.name_pins = pins
+
+    def duplicate_lookup(self) -> DuplicateIndex:
+        """The duplicate index, built on first use and kept current by the track hooks."""
+        if self.duplicate_index is None:
+            self.duplicate_index = DuplicateIndex()
+            self.duplicate_index.add_many((expense["id"], expense) for expense in self.expenses)
+        return self.duplicate_index
+
+    def completion_lookup(self) -> dict[str, CompletionIndex]:
+        """The autocomplete indexes, built on first use and kept current by the track hooks.
+
+        Archived uses come from the archive's block index; the indexes are rebuilt
+        when the archive changes.
+        """
+        signature = self.archive.signature() if self.archive is not None else None
+        if self.completion_indexes is None or signature != self.completion_signature:
+            self.completion_indexes = {name: CompletionIndex() for name in COMPLETION_FIELDS}
+            self.completion_signature = signature
+            for name, index in self.completion_indexes.items():
+                if self.archive is not None:
+                    index.add_counts(self.archive.value_uses(name))
+                index.add_many((expense["user"], expense[name], expense["date"]) for expense in self.expenses)
+        return self.completion_indexes
+
+    def rollup_lookup(self) -> SpendingRollups:
+        """The spending rollups, built on first use and kept current by the track hooks.
+
+        Archived days come from the archive's block index; the rollups are rebuilt
+        when the archive changes.
+        """
+        signature = self.archive.signature() if self.archive is not None else None
+        if self.rollups is None or signature != self.rollup_signature:
+            self.rollups = SpendingRollups()
+            self.rollup_signature = signature
+            if self.archive is not None:
+                self.rollups.add_day_totals(self.archive.day_totals())
+            self.rollups.add_many(self.expenses)
+        return self.rollups
+
+    def suggest_values(self, field_name: str, prefix: str, *, user: str, limit: int = 10) -> list[str]:
+        """Past values of a free-text field for ``user`` starting with ``prefix``.
+
+        Ranked by how often and how recently each value was used, best first.
+        """
+        if field_name not in COMPLETION_FIELDS:
+            raise ValueError(f"No suggestions for field: {field_name}")
+        self.load_partitions_for(user=user)
+        return self.completion_lookup()[field_name].complete(user, prefix, limit)
+
+    def search_text(self, expense: dict[str, Any]) -> str:
+        return f"{expense['description']} {expense['category']}"
+
+    def get_expense(self, expense_id: Any) -> dict[str, Any] | None:
+        return self._by_id.get(expense_id)
 
     def validate_non_empty_string(self, value: Any, field_name: str) -> str:
         if not isinstance(value, str):
@@ -34,11 +470,9 @@ class ExpenseManager:
             raise ValueError(f"{field_name} must be in YYYY-MM-DD format") from exc
         return parsed.isoformat()
 
-    def normalize_amount(self, value: Any) -> float:
-        try:
-            amount = float(value)
-        except (TypeError, ValueError) as exc:
-            raise ValueError("amount must be a number") from exc
+    def normalize_amount(self, value: Any) -> int:
+        """Exact integer cents for an amount; see money.parse_cents for rounding."""
+        amount = parse_cents(value)
         if amount < 0:
             raise ValueError("amount must be non-negative")
         return amount
@@ -68,7 +502,10 @@ class ExpenseManager:
         category: str,
         description: str,
         amount: float,
+        skip_duplicates: bool = False,
+        fuzzy_days: int = 0,
     ) -> dict[str, Any]:
+        """Add one expense; with ``skip_duplicates`` an existing duplicate is returned instead."""
         expense = self.validate_expense(
             user=user,
             expense_date=expense_date,
@@ -76,7 +513,17 @@ class ExpenseManager:
             description=description,
             amount=amount,
         )
+        if skip_duplicates:
+            existing = self.find_duplicates(expense, fuzzy_days=fuzzy_days)
+            if existing:
+                return existing[0]
+        self.prepare_partition_write(partition_key(expense))
+        expense = self.with_id(expense)
         self.expenses.append(expense)
+        self.track_expense(expense)
+        self.history.record(Delta(added=[(len(self.expenses) - 1, expense)]), "Add expense")
+        self.notify_changed()
+        self.check_budget(expense)
         return expense
 
     def edit_expense(
@@ -98,13 +545,232 @@ class ExpenseManager:
             description=description,
             amount=amount,
         )
+        # Edits keep the record id so other instances see an update, not add+delete.
+        previous = self.expenses[index]
+        self.prepare_partition_write(partition_key(previous))
+        self.prepare_partition_write(partition_key(updated))
+        updated = {"id": previous["id"], **updated}
         self.expenses[index] = updated
+        self.retrack_expense(previous, updated)
+        self.history.record(Delta(updated=[(previous, updated)]), "Edit expense")
+        self.notify_changed()
+        self.check_budget(updated, previous)
         return updated
 
     def delete_expense(self, index: int) -> dict[str, Any]:
         if not 0 <= index < len(self.expenses):
             raise ValueError("expense index out of range")
-        return self.expenses.pop(index)
+        self.prepare_partition_write(partition_key(self.expenses[index]))
+        removed = self.expenses.pop(index)
+        self.untrack_expense(removed)
+        self.history.record(Delta(removed=[(index, removed)]), "Delete expense")
+        self.notify_changed()
+        return removed
+
+    def delete_expenses(self, indexes: Iterable[int]) -> list[dict[str, Any]]:
+        """Delete many rows in one pass, as one undo step; returns them in ledger order."""
+        wanted = sorted(set(indexes))
+        if wanted and not (wanted[0] >= 0 and wanted[-1] < len(self.expenses)):
+            raise ValueError("expense index out of range")
+        removed = [(index, self.expenses[index]) for index in wanted]
+        # Shard loads only append, so the indexes stay valid.
+        for _index, expense in removed:
+            self.prepare_partition_write(partition_key(expense))
+        if not removed:
+            return []
+        dropped = {id(expense) for _index, expense in removed}
+        self.expenses = [expense for expense in self.expenses if id(expense) not in dropped]
+        for _index, expense in removed:
+            self.untrack_expense(expense)
+        self.history.record(Delta(removed=removed), "Delete expenses")
+        self.notify_changed()
+        return [expense for _index, expense in removed]
+
+    @contextmanager
+    def batch(self, label: str) -> Iterator[None]:
+        """Make every change inside the block a single undo step, e.g. removing a user."""
+        self.history.begin(label)
+        try:
+            yield
+        finally:
+            if self.history.end():
+                # Listeners saw the changes before the step existed; let them look again.
+                self.notify_changed()
+
+    def undo(self) -> ExpenseChanges:
+        """Revert the latest recorded operation; returns the rows views must patch."""
+        operation = self.history.pop_undo()
+        if operation is None:
+            return ExpenseChanges()
+        changes = self.apply_operation(operation.inverse())
+        self.history.push_redo(operation)
+        self.notify_changed()
+        return changes
+
+    def redo(self) -> ExpenseChanges:
+        """Re-apply the operation undone last."""
+        operation = self.history.pop_redo()
+        if operation is None:
+            return ExpenseChanges()
+        changes = self.apply_operation(operation)
+        self.history.push_undo(operation)
+        self.notify_changed()
+        return changes
+
+    def apply_operation(self, operation: Operation) -> ExpenseChanges:
+        """Apply logged deltas once every row they touch is checked to be as they expect.
+
+        Only the shards of those rows are loaded and marked for rewriting, so saving
+        an undo writes no more than the original change did. Raises ValueError, and
+        the operation is dropped, when a row was changed since, e.g. by another instance.
+        """
+        net = operation.net_rows()
+        for before, after in net.values():
+            for expense in (before, after):
+                if expense is not None:
+                    self.prepare_partition_write(partition_key(expense))
+        current = {expense_id: self._by_id.get(expense_id) for expense_id in net}
+        if any(current[expense_id] != before for expense_id, (before, _after) in net.items()):
+            raise ValueError("expenses changed since this action; it can no longer be undone or redone")
+        for delta in operation.deltas:
+            self.apply_delta(delta)
+        changes = ExpenseChanges()
+        for expense_id, (before, after) in net.items():
+            if before is None:
+                changes.added.append(after)
+            elif after is None:
+                changes.removed.append(current[expense_id])
+            else:
+                changes.updated.append((current[expense_id], after))
+        return changes
+
+    def apply_delta(self, delta: Delta) -> None:
+        """Patch self.expenses with one delta in a single pass, putting rows back at their positions."""
+        removed = {expense["id"] for _position, expense in delta.removed}
+        replaced = {old["id"]: new for old, new in delta.updated}
+        kept = self.expenses
+        if removed or replaced:
+            kept = [replaced.get(expense["id"], expense) for expense in kept if expense["id"] not in removed]
+        rebuilt: list[dict[str, Any]] = []
+        start = 0
+        for position, expense in sorted(delta.added, key=lambda item: item[0]):
+            take = max(position - len(rebuilt), 0)
+            rebuilt.extend(kept[start : start + take])
+            start += take
+            rebuilt.append(expense)
+        rebuilt.extend(kept[start:])
+        self.expenses = rebuilt
+        for _position, expense in delta.removed:
+            self.untrack_expense(expense)
+        for old, new in delta.updated:
+            self.retrack_expense(old, new)
+        self.track_expenses([expense for _position, expense in delta.added])
+
+    def find_duplicates(
+        self,
+        expense: dict[str, Any],
+        *,
+        fuzzy_days: int = 0,
+        archived: tuple[DuplicateIndex, dict[Any, dict[str, Any]]] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Archived, then live records duplicating a validated expense, exact matches first.
+
+        ``fuzzy_days`` also matches the same user and amount up to that many days away.
+        ``archived`` is a prebuilt archived_duplicate_lookup covering the expense.
+        """
+        if archived is None:
+            archived = self.archived_duplicate_lookup([expense], fuzzy_days=fuzzy_days)
+        index, rows = archived
+        found = [rows[expense_id] for expense_id in index.matches(expense, fuzzy_days=fuzzy_days)]
+        if self.store is not None:
+            day = date.fromisoformat(expense["date"])
+            self.load_partitions_for(
+                user=expense["user"],
+                from_date=day - timedelta(days=fuzzy_days),
+                to_date=day + timedelta(days=fuzzy_days),
+            )
+        matches = self.duplicate_lookup().matches(expense, fuzzy_days=fuzzy_days)
+        return found + [self._by_id[expense_id] for expense_id in matches]
+
+    def archived_duplicate_lookup(
+        self,
+        expenses: Sequence[dict[str, Any]],
+        *,
+        fuzzy_days: int = 0,
+    ) -> tuple[DuplicateIndex, dict[Any, dict[str, Any]]]:
+        """Duplicate index and rows by id of the archived rows that ``expenses`` could match.
+
+        Covers their users from the earliest date minus ``fuzzy_days`` to the latest
+        plus ``fuzzy_days``, so only the archive blocks of that window are read.
+        """
+        index = DuplicateIndex()
+        rows: dict[Any, dict[str, Any]] = {}
+        if self.archive is None or not expenses:
+            return index, rows
+        dates = [expense["date"] for expense in expenses]
+        window = timedelta(days=fuzzy_days)
+        users = {expense["user"] for expense in expenses}
+        for expense in self.archived_expenses(
+            from_date=date.fromisoformat(min(dates)) - window,
+            to_date=date.fromisoformat(max(dates)) + window,
+            user=next(iter(users)) if len(users) == 1 else None,
+        ):
+            if expense["user"] in users:
+                rows[expense["id"]] = expense
+        index.add_many(rows.items())
+        return index, rows
+
+    def import_expenses(
+        self,
+        data: list[Any],
+        *,
+        skip_duplicates: bool = True,
+        fuzzy_days: int = 0,
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Validate and add raw rows, e.g. a bank export, checking each for duplicates.
+
+        Returns ``(added, duplicates)``. Duplicates are left out when
+        ``skip_duplicates`` is set and added but still reported otherwise; rows
+        repeated within ``data`` itself are caught too.
+        """
+        added: list[dict[str, Any]] = []
+        positions: list[tuple[int, dict[str, Any]]] = []
+        duplicates: list[dict[str, Any]] = []
+        records = self.validate_records(data)
+        archived = self.archived_duplicate_lookup(records, fuzzy_days=fuzzy_days)
+        for expense in records:
+            expense_id = expense.pop("id")
+            if self.find_duplicates(expense, fuzzy_days=fuzzy_days, archived=archived):
+                duplicates.append(expense)
+                if skip_duplicates:
+                    continue
+            self.prepare_partition_write(partition_key(expense))
+            expense = self.with_id(expense, expense_id)
+            positions.append((len(self.expenses), expense))
+            self.expenses.append(expense)
+            self.track_expense(expense)
+            added.append(expense)
+        if added:
+            self.history.record(Delta(added=positions), "Import expenses")
+            self.notify_changed()
+        return added, duplicates
+
+    def duplicate_report(self, *, fuzzy_days: int = 0) -> list[list[dict[str, Any]]]:
+        """Groups of records, archived or live, that duplicate each other, oldest entry first."""
+        self.load_partitions_for()
+        archived = self.archived_expenses()
+        if not archived:
+            by_id = self._by_id
+            return [
+                [by_id[expense_id] for expense_id in group]
+                for group in self.duplicate_lookup().groups(fuzzy_days=fuzzy_days)
+            ]
+        # Archived rows go in first so they lead their groups; the maintained index stays live-only.
+        rows = {expense["id"]: expense for expense in archived}
+        rows.update(self._by_id)
+        index = DuplicateIndex()
+        index.add_many(rows.items())
+        return [[rows[expense_id] for expense_id in group] for group in index.groups(fuzzy_days=fuzzy_days)]
 
     def parse_optional_date(self, value: Any, field_name: str) -> date | None:
         if value is None:
@@ -114,37 +780,188 @@ class ExpenseManager:
         normalized = self.normalize_date(value, field_name)
         return datetime.strptime(normalized, "%Y-%m-%d").date()
 
-    def filter_expenses(
+    def build_filter(
         self,
         *,
         from_date: str | date | None = None,
         to_date: str | date | None = None,
         category: str | None = None,
         user: str | None = None,
-    ) -> list[dict[str, Any]]:
-        """Return a new filtered list without mutating self.expenses."""
+        search: str | None = None,
+    ) -> Callable[[dict[str, Any]], bool]:
+        """Compile filter arguments into a predicate usable on single records."""
         from_dt = self.parse_optional_date(from_date, "from_date")
         to_dt = self.parse_optional_date(to_date, "to_date")
         if from_dt and to_dt and from_dt > to_dt:
             raise ValueError("from_date cannot be after to_date")
 
+        # ISO date strings order the same way as dates, so compare them directly.
+        from_key = from_dt.isoformat() if from_dt else ""
+        to_key = to_dt.isoformat() if to_dt else ""
         category_filter = category.strip().lower() if isinstance(category, str) else ""
         user_filter = user.strip() if isinstance(user, str) else ""
+        search_ids = self.search_index.search(search) if isinstance(search, str) else None
 
-        filtered: list[dict[str, Any]] = []
-        for expense in self.expenses:
-            # Dates are stored as ISO strings for JSON portability.
-            expense_date = datetime.strptime(expense["date"], "%Y-%m-%d").date()
-            if from_dt and expense_date < from_dt:
-                continue
-            if to_dt and expense_date > to_dt:
-                continue
+        def matches(expense: dict[str, Any]) -> bool:
+            if search_ids is not None and expense["id"] not in search_ids:
+                return False
+            if from_key and expense["date"] < from_key:
+                return False
+            if to_key and expense["date"] > to_key:
+                return False
             if category_filter and expense["category"].strip().lower() != category_filter:
-                continue
+                return False
             if user_filter and expense["user"] != user_filter:
-                continue
-            filtered.append(expense)
-        return filtered
+                return False
+            return True
+
+        return matches
+
+    def filter_expenses(
+        self,
+        *,
+        from_date: str | date | None = None,
+        to_date: str | date | None = None,
+        category: str | None = None,
+        user: str | None = None,
+        search: str | None = None,
+        include_archive: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Return a new filtered list without mutating self.expenses.
+
+        ``search`` matches every word as a prefix of a description/category word.
+        ``include_archive`` puts matching archived (read-only) rows first.
+        """
+        self.load_partitions_for(user=user, from_date=from_date, to_date=to_date)
+        matches = self.build_filter(from_date=from_date, to_date=to_date, category=category, user=user)
+        archived = (
+            self.archived_expenses(from_date=from_date, to_date=to_date, category=category, user=user, search=search)
+            if include_archive
+            else []
+        )
+        search_ids = self.search_index.search(search) if isinstance(search, str) else None
+        if search_ids is None:
+            return archived + [expense for expense in self.expenses if matches(expense)]
+        # Only the index hits are checked against the other filters, and only the
+        # survivors are put back into ledger order.
+        by_id = self._by_id
+        hit_ids = [expense_id for expense_id in search_ids if matches(by_id[expense_id])]
+        return archived + [by_id[expense_id] for expense_id in self.search_index.ordered(hit_ids)]
+
+    def iter_expenses(self, *, include_archive: bool = False, **filters: Any) -> Iterator[dict[str, Any]]:
+        """Stream matching records without building an intermediate list.
+
+        ``include_archive`` yields matching archived rows first, as filter_expenses does.
+        """
+        search = filters.pop("search", None)
+        if search:
+            yield from self.filter_expenses(search=search, include_archive=include_archive, **filters)
+            return
+        if include_archive:
+            yield from self.archived_expenses(**filters)
+        self.load_partitions_for(
+            user=filters.get("user"),
+            from_date=filters.get("from_date"),
+            to_date=filters.get("to_date"),
+        )
+        matches = self.build_filter(**filters)
+        for expense in self.expenses:
+            if matches(expense):
+                yield expense
+
+    def count_expenses(self, *, include_archive: bool = False, **filters: Any) -> int:
+        """Number of matching records, without building a result list."""
+        return sum(1 for _expense in self.iter_expenses(include_archive=include_archive, **filters))
+
+    def top_expenses(self, n: int = 20, *, include_archive: bool = True, **filters: Any) -> list[dict[str, Any]]:
+        """Largest ``n`` matching expenses, via a bounded heap rather than a full sort."""
+        return expense_stats.top_n(self.iter_expenses(include_archive=include_archive, **filters), n)
+
+    def spending_quantiles(
+        self,
+        qs: tuple[float, ...] = (0.5, 0.95),
+        *,
+        by_category: bool = True,
+        include_archive: bool = True,
+        **filters: Any,
+    ) -> dict[Any, dict[float, float | None]]:
+        """Approximate (about 1%) quantiles per category, or overall when by_category is False."""
+        key = expense_stats.category_key if by_category else None
+        return expense_stats.quantiles(self.iter_expenses(include_archive=include_archive, **filters), qs, key=key)
+
+    def find_outliers(
+        self,
+        *,
+        method: str = "zscore",
+        threshold: float | None = None,
+        limit: int = 20,
+        include_archive: bool = True,
+        **filters: Any,
+    ) -> list[tuple[dict[str, Any], float]]:
+        """Unusual amounts per (user, category) group, with their scores."""
+        return expense_stats.find_outliers(
+            self.iter_expenses(include_archive=include_archive, **filters),
+            method=method,
+            threshold=threshold,
+            limit=limit,
+        )
+
+    def spending_forecast(self, *, user: str | None = None, as_of: date | None = None) -> SpendingForecast:
+        """Recurring expenses and next month's projection per category, over live and archived rows.
+
+        Recurrence needs history, so this reads every shard and archive block of
+        ``user`` (or of everyone). The result is cached until a change to that user's
+        rows or to the archive; the archived rows are kept until the archive changes.
+        """
+        as_of = as_of or date.today()
+        cached = self.cached_forecast(user=user, as_of=as_of)
+        if cached is not None:
+            return cached
+        token, rows = self.forecast_input(user=user, as_of=as_of)
+        result = forecast(rows, as_of=as_of)
+        self.store_forecast(token, result)
+        return result
+
+    def cached_forecast(self, *, user: str | None = None, as_of: date | None = None) -> SpendingForecast | None:
+        """The spending_forecast result if it is cached and current, else None."""
+        as_of = as_of or date.today()
+        cached = self.forecasts.get((user, as_of))
+        signature = self.archive.signature() if self.archive is not None else None
+        return cached[1] if cached is not None and cached[0] == signature else None
+
+    def forecast_input(
+        self, *, user: str | None = None, as_of: date | None = None
+    ) -> tuple[tuple[str | None, date, int, str | None], list[dict[str, Any]]]:
+        """A token and the rows for computing a forecast elsewhere, e.g. on a worker thread.
+
+        The rows are a private list of immutable records, safe to hand to
+        recurring.forecast off this thread; pass its result and the token to
+        store_forecast.
+        """
+        as_of = as_of or date.today()
+        signature = self.archive.signature() if self.archive is not None else None
+        rows = [*self.forecast_archive(user, signature), *self.iter_expenses(user=user)]
+        return (user, as_of, self.forecast_generation, signature), rows
+
+    def store_forecast(self, token: tuple[str | None, date, int, str | None], result: SpendingForecast) -> bool:
+        """Cache a forecast from forecast_input; False when rows changed since, so it was dropped."""
+        user, as_of, generation, signature = token
+        if generation != self.forecast_generation:
+            return False
+        if signature != (self.archive.signature() if self.archive is not None else None):
+            return False
+        self.forecasts[(user, as_of)] = (signature, result)
+        return True
+
+    def forecast_archive(self, user: str | None, signature: str | None) -> list[dict[str, Any]]:
+        """Archived rows of ``user`` (everyone when None) not shadowed by live copies."""
+        if self.archive is None:
+            return []
+        history = self.forecast_history.get(user)
+        if history is None or history[0] != signature:
+            history = self.forecast_history[user] = (signature, self.archive.read_range(user=user))
+        by_id = self._by_id
+        return [expense for expense in history[1] if expense["id"] not in by_id]
 
     def monthly_total(
         self,
@@ -153,69 +970,735 @@ class ExpenseManager:
         category: str | None = None,
         user: str | None = None,
     ) -> float:
-        """Monthly rollup helper kept for non-UI uses and smoke tests."""
+        """Total for one month, live and archived, from the spending rollups."""
         if month < 1 or month > 12:
             raise ValueError("month must be between 1 and 12")
 
-        category_totals: defaultdict[str, float] = defaultdict(float)
-        monthly_totals: defaultdict[tuple[int, int], float] = defaultdict(float)
-
         user_filter = user.strip() if isinstance(user, str) else ""
+        category_filter = category.strip().lower() if isinstance(category, str) else ""
+        first, last = date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+        self.load_partitions_for(user=user_filter, from_date=first, to_date=last)
+        rollups = self.rollup_lookup()
+        users = [user_filter] if user_filter else rollups.users()
+        return to_amount(sum(rollups.total(name, first, last, category=category_filter or None) for name in users))
 
-        for expense in self.expenses:
-            if user_filter and expense["user"] != user_filter:
-                continue
-            expense_date = datetime.strptime(expense["date"], "%Y-%m-%d").date()
-            ym_key = (expense_date.year, expense_date.month)
-            monthly_totals[ym_key] += float(expense["amount"])
-            if ym_key == (year, month):
-                category_totals[expense["category"].strip().lower()] += float(expense["amount"])
+    def set_budget(self, user: Any, category: Any, amount: Any) -> None:
+        """Set a user's monthly budget for a category; ``None`` or zero removes it."""
+        key = (
+            self.validate_non_empty_string(user, "user"),
+            self.validate_non_empty_string(category, "category").lower(),
+        )
+        limit = self.normalize_amount(amount) if amount is not None else 0
+        if limit:
+            self.budgets[key] = limit
+        else:
+            self.budgets.pop(key, None)
+
+    def period_totals(self, user: str, day: date | None = None) -> tuple[int, int, int]:
+        """Cents ``user`` spent on ``day`` (default: today), in its Monday-to-Sunday week and in its month.
 
-        if category and category.strip():
-            return round(category_totals[category.strip().lower()], 2)
-        return round(monthly_totals[(year, month)], 2)
+        Shards of the week and month are loaded first, since evicted shards are not in the rollups.
+        """
+        day = day or date.today()
+        monday = day - timedelta(days=day.weekday())
+        last = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+        self.load_partitions_for(
+            user=user,
+            from_date=min(monday, day.replace(day=1)),
+            to_date=max(monday + timedelta(days=6), last),
+        )
+        rollups = self.rollup_lookup()
+        return (
+            rollups.day_total(user, day),
+            rollups.week_total(user, day),
+            rollups.month_total(user, day.year, day.month),
+        )
+
+    def budget_status(self, user: str, *, month: date | None = None) -> list[BudgetStatus]:
+        """Spending against each of ``user``'s budgets in ``month`` (default: this month)."""
+        month = month or date.today()
+        first, last = month.replace(day=1), month.replace(day=calendar.monthrange(month.year, month.month)[1])
+        self.load_partitions_for(user=user, from_date=first, to_date=last)
+        rollups = self.rollup_lookup()
+        return [
+            BudgetStatus(user, category, first.isoformat()[:7], limit, rollups.total(user, first, last, category=category))
+            for (budget_user, category), limit in sorted(self.budgets.items())
+            if budget_user == user
+        ]
+
+    def check_budget(self, expense: dict[str, Any], previous: dict[str, Any] | None = None) -> BudgetStatus | None:
+        """Alert budget listeners when replacing ``previous`` by ``expense`` crossed a threshold.
+
+        Uses the rollups, so the check costs a couple of prefix lookups, not a scan.
+        """
+        category = expense_stats.category_key(expense)
+        limit = self.budgets.get((expense["user"], category))
+        if limit is None:
+            return None
+        day = date.fromisoformat(expense["date"])
+        spent = self.rollup_lookup().month_total(expense["user"], day.year, day.month, category=category)
+        before = spent - expense["amount"]
+        if (
+            previous is not None
+            and previous["user"] == expense["user"]
+            and previous["date"][:7] == expense["date"][:7]
+            and expense_stats.category_key(previous) == category
+        ):
+            before += previous["amount"]
+        # Compared in whole percent-cents so the check stays exact.
+        crossed = [step for step in BUDGET_THRESHOLDS if before * 100 < step * limit <= spent * 100]
+        if not crossed:
+            return None
+        status = BudgetStatus(expense["user"], category, expense["date"][:7], limit, spent, crossed[-1])
+        for callback in list(self.budget_listeners):
+            callback(status)
+        return status
+
+    def load_budgets(self, file_path: str | Path) -> None:
+        """Read budgets saved by save_budgets; a missing file means no budgets."""
+        target = Path(file_path)
+        if not target.exists():
+            return
+        with file_lock(target, exclusive=False):
+            with target.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        if not isinstance(data, dict) or not isinstance(data.get("budgets"), list):
+            raise ValueError("Budget file must contain a list of budgets")
+        self.budgets = {}
+        for item in data["budgets"]:
+            if not isinstance(item, dict):
+                raise ValueError("Invalid budget entry")
+            self.set_budget(item.get("user"), item.get("category"), item.get("amount"))
+
+    def save_budgets(self, file_path: str | Path) -> None:
+        target = Path(file_path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        budgets = [
+            {"user": user, "category": category, "amount": to_amount(limit)}
+            for (user, category), limit in sorted(self.budgets.items())
+        ]
+        with file_lock(target, exclusive=True):
+            write_json_atomic(target, {"version": 1, "budgets": budgets})
+
+    def known_users(self) -> set[str]:
+        """Users present in memory, in any on-disk shard (loaded or not), in the archive or added by hand."""
+        return set(self.user_names.names())
 
     def categories(self, *, user: str | None = None) -> list[str]:
+        """Sorted category names of ``user`` (everyone when empty) as stored, live, in shards or archived.
+
+        Spellings are kept as written; category_names_for has the folded names.
+        """
         user_filter = user.strip() if isinstance(user, str) else ""
+        self.load_unlisted_partitions(user_filter)
         values = {
             expense["category"]
             for expense in self.expenses
             if not user_filter or expense["user"] == user_filter
         }
+        if self.store is not None:
+            values |= {
+                category
+                for name, category in self.store.user_categories()
+                if not user_filter or name == user_filter
+            }
+        if self.archive is not None:
+            values |= self.archive.categories(user=user_filter or None)
         return sorted(values)
 
+    def category_names_for(self, user: str | None = None) -> NameRegistry:
+        """The folded category registry of ``user``, or no_categories if they have none.
+
+        Shard categories are pinned from the manifest, so only shards written
+        before it listed them are loaded.
+        """
+        user_filter = user.strip() if isinstance(user, str) else ""
+        self.load_unlisted_partitions(user_filter)
+        return self.category_names.get(user_filter, self.no_categories)
+
     def save_to_json(self, file_path: str | Path) -> None:
         """Persist the full expense list to disk."""
+        self.write_json_snapshot(file_path, self.expenses)
+
+    def json_snapshot(self) -> tuple[dict[str, Any], ...]:
+        """Frozen view of the ledger for writing on another thread.
+
+        Records are never mutated once stored (edits swap in a new dict), so a
+        shallow tuple is enough to decouple the writer from later changes.
+        """
+        return tuple(self.expenses)
+
+    def write_json_snapshot(self, file_path: str | Path, records: Sequence[dict[str, Any]]) -> None:
+        """Write a snapshot to disk; touches no in-memory state besides last_fingerprint."""
         target = Path(file_path)
         target.parent.mkdir(parents=True, exist_ok=True)
-        with target.open("w", encoding="utf-8") as handle:
-            json.dump(self.expenses, handle, indent=2)
+        with file_lock(target, exclusive=True):
+            checksum = write_checksummed_json(target, export_records(records))
+            self.last_fingerprint = file_fingerprint(target)
+            self.data_checksum = checksum
+            if self.rollup_path is not None:
+                # Under the data lock, so a reader holding it sees a matching pair.
+                self.write_rollup_sidecar(records, checksum)
 
-    def load_from_json(self, file_path: str | Path, *, merge: bool = False) -> None:
-        """Load and validate expenses from disk before using them in memory."""
-        target = Path(file_path)
-        if not target.exists():
+    def rollup_source(self, checksum: str | None) -> dict[str, Any]:
+        return {"data": checksum, "archive": self.archive_rollup[0] if self.archive_rollup else None}
+
+    def rollup_snapshot(self, records: Iterable[dict[str, Any]], checksum: str | None) -> RollupSnapshot:
+        """Totals of ``records`` plus the archive, stamped with the versions they came from."""
+        totals = tally(records)
+        if self.archive_rollup is not None:
+            merge_totals(totals, self.archive_rollup[1])
+        return RollupSnapshot(self.rollup_source(checksum), totals)
+
+    def write_rollup_sidecar(self, records: Iterable[dict[str, Any]], checksum: str | None) -> None:
+        write_rollup_file(self.rollup_path, self.rollup_snapshot(records, checksum))
+
+    def read_rollup_sidecar(self, data_path: str | Path | None = None) -> RollupSnapshot | None:
+        """The saved totals if they still match the data file and archive, else None.
+
+        With ``data_path`` the file's header checksum is used, so this works before
+        any row is loaded; otherwise the checksum of the file last read or written.
+        """
+        if self.rollup_path is None:
+            return None
+        checksum = read_snapshot_checksum(Path(data_path)) if data_path is not None else self.data_checksum
+        snapshot = read_rollup_file(self.rollup_path)
+        if checksum is None or snapshot is None or snapshot.source != self.rollup_source(checksum):
+            return None
+        return snapshot
+
+    def refresh_rollup_sidecar(self) -> bool:
+        """Rebuild the sidecar from the loaded rows when it is missing or stale.
+
+        Skipped while the data file has no checksum (e.g. a legacy plain JSON file):
+        such a sidecar could never be trusted, and the next save writes one anyway.
+        """
+        if self.rollup_path is None or self.data_checksum is None or self.read_rollup_sidecar() is not None:
+            return False
+        self.write_rollup_sidecar(self.expenses, self.data_checksum)
+        return True
+
+    def refresh_archive_rollup(self) -> None:
+        """Re-read the archive's totals for the sidecar after the archive may have changed."""
+        if self.archive is None:
+            self.archive_rollup = None
             return
-        with target.open("r", encoding="utf-8") as handle:
-            data = json.load(handle)
+        signature = self.archive.signature()
+        if self.archive_rollup is None or self.archive_rollup[0] != signature:
+            self.archive_rollup = (signature, self.archive.totals())
+
+    def read_expenses_file(self, target: Path) -> list[dict[str, Any]]:
+        """Read a JSON expense file under a shared lock, validating it unless trusted.
+
+        Files whose checksum header matches were written (and validated) by this app,
+        so their rows are used as-is; everything else goes through validate_records.
+        """
+        with file_lock(target, exclusive=False):
+            data, trusted = read_checksummed_json(target)
+            self.last_fingerprint = file_fingerprint(target)
+            self.data_checksum = read_snapshot_checksum(target) if trusted else None
         if not isinstance(data, list):
             raise ValueError("JSON data must be a list of expenses")
+        return self.checked_records(data, trusted)
 
+    def checked_records(self, data: list[Any], trusted: bool) -> list[dict[str, Any]]:
+        if trusted:
+            # Our own writer always puts "id" first, so rows only need their cents back.
+            return import_records(data)
+        return self.validate_records(data)
+
+    def validate_records(self, data: list[Any]) -> list[dict[str, Any]]:
+        """Validate raw JSON items in bulk, keeping any stored int or str id under "id".
+
+        Other ids (null, lists, objects, booleans from a hand-edited file) become None,
+        so claim_ids assigns a fresh one.
+
+        Same rules and messages as validate_expense, but well-formed values take a
+        fast path: plain numbers skip float() and zero-padded ISO dates are checked
+        once per distinct string with date.fromisoformat instead of strptime per row.
+        """
         validated: list[dict[str, Any]] = []
+        valid_dates: set[str] = set()
+        fullmatch = ISO_DATE_PATTERN.fullmatch
         for idx, item in enumerate(data):
             if not isinstance(item, dict):
                 raise ValueError(f"Invalid expense at index {idx}")
+            user = item.get("user")
+            user = user.strip() if type(user) is str else user
+            if not user or type(user) is not str:
+                user = self.validate_non_empty_string(user, "user")
+
+            expense_date = item.get("date")
+            if type(expense_date) is str and expense_date not in valid_dates:
+                if fullmatch(expense_date):
+                    try:
+                        date.fromisoformat(expense_date)
+                    except ValueError as exc:
+                        raise ValueError("date must be in YYYY-MM-DD format") from exc
+                    valid_dates.add(expense_date)
+                else:
+                    expense_date = self.normalize_date(expense_date, "date")
+            elif type(expense_date) is not str:
+                expense_date = self.normalize_date(expense_date, "date")
+
+            category = item.get("category")
+            category = category.strip() if type(category) is str else category
+            if not category or type(category) is not str:
+                category = self.validate_non_empty_string(category, "category")
+
+            description = item.get("description")
+            description = description.strip() if type(description) is str else description
+            if not description or type(description) is not str:
+                description = self.validate_non_empty_string(description, "description")
+
+            amount = item.get("amount")
+            if type(amount) is float or type(amount) is int:
+                if amount < 0:
+                    raise ValueError("amount must be non-negative")
+                amount = parse_cents(amount)
+            else:
+                amount = self.normalize_amount(amount)
+
+            expense_id = item.get("id")
+            if type(expense_id) is not int and type(expense_id) is not str:
+                expense_id = None
+
             validated.append(
-                self.validate_expense(
-                    user=item.get("user"),
-                    expense_date=item.get("date"),
-                    category=item.get("category"),
-                    description=item.get("description"),
-                    amount=item.get("amount"),
-                )
+                {
+                    "id": expense_id,
+                    "user": user,
+                    "date": expense_date,
+                    "category": category,
+                    "description": description,
+                    "amount": amount,
+                }
             )
+        return validated
 
-        if merge:
-            self.expenses.extend(validated)
+    def load_from_json(self, file_path: str | Path, *, merge: bool = False) -> None:
+        """Load and validate expenses from disk before using them in memory."""
+        target = Path(file_path)
+        if not target.exists():
+            return
+        validated = self.read_expenses_file(target)
+
+        if not merge:
+            self.expenses = []
+            self.reset_indexes()
+            self.history.clear()
+        self.claim_ids(validated)
+        self.expenses.extend(validated)
+        self.track_expenses(validated)
+
+    def merge_files(
+        self,
+        paths: Iterable[str | Path],
+        *,
+        max_workers: int | None = None,
+    ) -> list[FileLoadReport]:
+        """Merge many ledger files, parsing and validating them in a process pool.
+
+        Files are merged in the given order while later ones are still being parsed.
+        A row whose id is taken is skipped when it equals the stored row and gets a
+        fresh id otherwise. A file that cannot be read is reported and adds nothing.
+        """
+        paths = [Path(path) for path in paths]
+        workers = min(max_workers or os.cpu_count() or 1, len(paths))
+        names = [str(path) for path in paths]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                reports = self.merge_ledger_results(paths, executor.map(read_ledger_file, names))
         else:
-            self.expenses = validated
\ No newline at end of file
+            reports = self.merge_ledger_results(paths, map(read_ledger_file, names))
+        if any(report.added for report in reports):
+            self.notify_changed()
+        return reports
+
+    def merge_ledger_results(
+        self,
+        paths: list[Path],
+        results: Iterable[tuple[list[dict[str, Any]], str | None]],
+    ) -> list[FileLoadReport]:
+        """Fold per-file read results into the store, resolving id conflicts."""
+        reports: list[FileLoadReport] = []
+        merged: list[dict[str, Any]] = []
+        # Rows merged so far in this call; all of them are indexed in one bulk pass.
+        seen: dict[Any, dict[str, Any]] = {}
+        for path, (records, error) in zip(paths, results):
+            report = FileLoadReport(path, error=error)
+            reports.append(report)
+            for expense in records:
+                self.prepare_partition_write(partition_key(expense))
+                expense_id = expense["id"]
+                if expense_id is not None and not isinstance(expense_id, bool):
+                    existing = self._by_id.get(expense_id) or seen.get(expense_id)
+                    if existing == expense:
+                        report.skipped += 1
+                        continue
+                    if existing is not None:
+                        report.reassigned += 1
+                        expense_id = None
+                if expense_id is None or isinstance(expense_id, bool):
+                    expense_id = expense["id"] = self.new_expense_id()
+                seen[expense_id] = expense
+                merged.append(expense)
+                report.added += 1
+        self.history.record(Delta(added=list(enumerate(merged, len(self.expenses)))), "Merge files")
+        self.expenses.extend(merged)
+        self.track_expenses(merged)
+        return reports
+
+    def sync_from_json(self, file_path: str | Path) -> ExpenseChanges:
+        """Apply external edits to the file as a per-id diff instead of a full reload.
+
+        Unchanged records keep their object identity, so views holding them stay valid.
+        """
+        target = Path(file_path)
+        changes = ExpenseChanges()
+        if not target.exists():
+            return changes
+        incoming = self.read_expenses_file(target)
+        changes = self.diff_records(self.expenses, incoming)
+        self.apply_changes(changes)
+        if self.archive is not None:
+            # The other instance may have archived months too.
+            self.refresh_name_pins()
+            self.refresh_archive_rollup()
+        return changes
+
+    def diff_records(
+        self,
+        current_records: list[dict[str, Any]],
+        incoming: list[dict[str, Any]],
+    ) -> ExpenseChanges:
+        """Compare validated incoming rows with the in-memory rows they replace, by id."""
+        current = {expense["id"]: expense for expense in current_records}
+        changes = ExpenseChanges()
+        seen: set[Any] = set()
+        for expense in incoming:
+            expense_id = expense.pop("id")
+            if (
+                expense_id is None
+                or isinstance(expense_id, bool)
+                or expense_id in seen
+                or (expense_id in self._by_id and expense_id not in current)
+            ):
+                expense_id = self.new_expense_id()
+            seen.add(expense_id)
+            expense = {"id": expense_id, **expense}
+            old = current.get(expense_id)
+            if old is None:
+                changes.added.append(expense)
+            elif old != expense:
+                changes.updated.append((old, expense))
+        changes.removed = [expense for expense_id, expense in current.items() if expense_id not in seen]
+        return changes
+
+    def apply_changes(self, changes: ExpenseChanges) -> None:
+        """Patch self.expenses in place; unchanged records keep their object identity."""
+        if not changes:
+            return
+        replaced = {old["id"]: new for old, new in changes.updated}
+        removed = {expense["id"] for expense in changes.removed}
+        self.expenses = [
+            replaced.get(expense["id"], expense) for expense in self.expenses if expense["id"] not in removed
+        ]
+        self.expenses.extend(changes.added)
+        for expense in changes.removed:
+            self.untrack_expense(expense)
+        for old, new in changes.updated:
+            self.retrack_expense(old, new)
+        for expense in changes.added:
+            self.track_expense(expense)
+
+    def attach_store(self, store: PartitionStore, *, max_loaded_rows: int = 200_000) -> None:
+        """Switch to per-user/month shards that are loaded only when a query needs them.
+
+        ``max_loaded_rows`` is the memory budget: once exceeded, the least recently
+        used clean shards are dropped from memory (they stay on disk).
+        """
+        self.store = store
+        self.max_loaded_rows = max_loaded_rows
+        self.expenses = []
+        self.reset_indexes()
+        self.history.clear()
+        self.loaded_partitions.clear()
+        self.dirty_partitions.clear()
+        self.saving_partitions.clear()
+        store.refresh()
+        self.last_fingerprint = store.last_fingerprint
+        self.refresh_name_pins()
+
+    def load_partitions_for(
+        self,
+        *,
+        user: str | None = None,
+        from_date: str | date | None = None,
+        to_date: str | date | None = None,
+    ) -> None:
+        """Make sure every shard a query could touch is in memory, then enforce the budget."""
+        if self.store is None:
+            return
+        from_dt = self.parse_optional_date(from_date, "from_date")
+        to_dt = self.parse_optional_date(to_date, "to_date")
+        self.load_partitions(
+            self.store.keys(
+                user=user.strip() if isinstance(user, str) else None,
+                from_month=from_dt.isoformat()[:7] if from_dt else None,
+                to_month=to_dt.isoformat()[:7] if to_dt else None,
+            )
+        )
+
+    def load_partitions(self, keys: list[PartitionKey]) -> None:
+        """Load the shards of one query, then enforce the budget.
+
+        The budget runs on every query, not only after a load, so shards a wide
+        query pulled in are dropped once narrower ones no longer need them.
+        """
+        for key in keys:
+            if key in self.loaded_partitions:
+                self.loaded_partitions.move_to_end(key)
+            else:
+                self.load_partition(key)
+        self.evict_partitions(keep=set(keys))
+
+    def load_unlisted_partitions(self, user: str) -> None:
+        """Load ``user``'s shards (everyone's when empty) if any predates manifest category lists."""
+        if self.store is None:
+            return
+        keys = self.store.keys(user=user or None)
+        if self.store.unlisted_keys(keys):
+            self.load_partitions(keys)
+
+    def load_partition(self, key: PartitionKey) -> None:
+        records = self.claim_ids(self.checked_records(*self.store.read_partition(key)))
+        self.expenses.extend(records)
+        self.track_expenses(records)
+        self.loaded_partitions[key] = self.store.revision(key)
+
+    def evict_partitions(self, *, keep: set[PartitionKey] = frozenset()) -> None:
+        """Drop least recently used clean shards until the row budget is met."""
+        if len(self.expenses) <= self.max_loaded_rows:
+            return
+        counts = Counter(partition_key(expense) for expense in self.expenses)
+        remaining = len(self.expenses)
+        evicted: set[PartitionKey] = set()
+        for key in list(self.loaded_partitions):
+            if remaining <= self.max_loaded_rows:
+                break
+            if key in keep or key in self.dirty_partitions or key in self.saving_partitions:
+                continue
+            del self.loaded_partitions[key]
+            evicted.add(key)
+            remaining -= counts[key]
+        if not evicted:
+            return
+        # Evicted shards are unchanged on disk, so forecasts that read them stay valid.
+        forecasts, generation = dict(self.forecasts), self.forecast_generation
+        kept: list[dict[str, Any]] = []
+        for expense in self.expenses:
+            if partition_key(expense) in evicted:
+                self.untrack_expense(expense)
+            else:
+                kept.append(expense)
+        self.expenses = kept
+        self.forecasts, self.forecast_generation = forecasts, generation
+
+    def prepare_partition_write(self, key: PartitionKey) -> None:
+        """Load a shard before its rows change so the rewrite keeps its other rows."""
+        if self.store is None:
+            return
+        if key not in self.loaded_partitions:
+            if key in self.store.entries():
+                self.load_partition(key)
+            else:
+                self.loaded_partitions[key] = None
+        self.loaded_partitions.move_to_end(key)
+        self.dirty_partitions.add(key)
+
+    def save_partitions(self) -> None:
+        """Rewrite only the shards changed since the last save."""
+        snapshot = self.take_partition_snapshot()
+        if snapshot:
+            self.write_partition_snapshot(snapshot)
+            self.partitions_saved(snapshot)
+
+    def take_partition_snapshot(self) -> dict[PartitionKey, tuple[dict[str, Any], ...]]:
+        """Frozen rows of every dirty shard; the shards count as clean but stay loaded until saved."""
+        if self.store is None or not self.dirty_partitions:
+            return {}
+        rows: dict[PartitionKey, list[dict[str, Any]]] = {key: [] for key in self.dirty_partitions}
+        for expense in self.expenses:
+            bucket = rows.get(partition_key(expense))
+            if bucket is not None:
+                bucket.append(expense)
+        self.dirty_partitions.clear()
+        snapshot = {key: tuple(bucket) for key, bucket in rows.items()}
+        self.saving_partitions.update(snapshot)
+        return snapshot
+
+    def write_partition_snapshot(self, snapshot: dict[PartitionKey, Sequence[dict[str, Any]]]) -> None:
+        """Write shard snapshots to disk; safe to run on a worker thread."""
+        self.store.write_partitions({key: export_records(rows) for key, rows in snapshot.items()})
+        self.last_fingerprint = self.store.last_fingerprint
+
+    def partitions_saved(self, snapshot: dict[PartitionKey, Sequence[dict[str, Any]]]) -> None:
+        """Record the new manifest revisions of shards written from a snapshot and unpin them.
+
+        A shard snapshotted again meanwhile stays pinned until that newer write lands.
+        """
+        for key, rows in snapshot.items():
+            if self.saving_partitions.get(key) is rows:
+                del self.saving_partitions[key]
+            if key in self.saving_partitions or key in self.dirty_partitions:
+                continue
+            if key in self.loaded_partitions:
+                self.loaded_partitions[key] = self.store.revision(key)
+        self.refresh_name_pins()
+
+    def export_partitions(self, store: PartitionStore) -> None:
+        """Write the in-memory ledger out as shards, e.g. to migrate from expenses.json."""
+        rows: defaultdict[PartitionKey, list[dict[str, Any]]] = defaultdict(list)
+        for expense in self.expenses:
+            rows[partition_key(expense)].append(expense)
+        store.write_partitions({key: export_records(bucket) for key, bucket in rows.items()})
+
+    def sync_partitions(self) -> ExpenseChanges:
+        """Reload loaded shards whose manifest revision moved, as a per-id diff."""
+        if self.store is None:
+            return ExpenseChanges()
+        self.store.refresh()
+        self.last_fingerprint = self.store.last_fingerprint
+        self.refresh_name_pins()
+        stale = {
+            key
+            for key, revision in self.loaded_partitions.items()
+            if key not in self.dirty_partitions and self.store.revision(key) != revision
+        }
+        if not stale:
+            return ExpenseChanges()
+        incoming: list[dict[str, Any]] = []
+        for key in stale:
+            incoming.extend(self.checked_records(*self.store.read_partition(key)))
+            self.loaded_partitions[key] = self.store.revision(key)
+        current = [expense for expense in self.expenses if partition_key(expense) in stale]
+        changes = self.diff_records(current, incoming)
+        self.apply_changes(changes)
+        return changes
+
+    def attach_archive(self, archive: ExpenseArchive) -> None:
+        """Use a compressed archive for closed months next to the editable JSON file."""
+        self.archive = archive
+        self.refresh_name_pins()
+        self.refresh_archive_rollup()
+
+    def archive_closed_months(self, today: date | None = None) -> int:
+        """Move rows dated before the current month into the archive.
+
+        The archive is written first, so a failure leaves the rows in the editable
+        store. Returns the number of rows moved; callers persist the smaller ledger.
+        """
+        if self.archive is None or self.store is not None:
+            return 0
+        cutoff = (today or date.today()).replace(day=1).isoformat()
+        closed: defaultdict[str, list[dict[str, Any]]] = defaultdict(list)
+        kept: list[dict[str, Any]] = []
+        for expense in self.expenses:
+            if expense["date"] < cutoff:
+                closed[expense["date"][:7]].append(expense)
+            else:
+                kept.append(expense)
+        if not closed:
+            return 0
+        self.archive.write_months(dict(closed))
+        self.refresh_name_pins()
+        self.refresh_archive_rollup()
+        moved = len(self.expenses) - len(kept)
+        self.expenses = kept
+        for rows in closed.values():
+            for expense in rows:
+                self.untrack_expense(expense)
+        self.notify_changed()
+        return moved
+
+    def archived_expenses(
+        self,
+        *,
+        from_date: str | date | None = None,
+        to_date: str | date | None = None,
+        category: str | None = None,
+        user: str | None = None,
+        search: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Archived rows matching the filters.
+
+        Only blocks that overlap the dates, list the user and category and (for a
+        search) hold a hit in archive_search_lookup are decompressed.
+        """
+        if self.archive is None:
+            return []
+        from_dt = self.parse_optional_date(from_date, "from_date")
+        to_dt = self.parse_optional_date(to_date, "to_date")
+        matches = self.build_filter(from_date=from_dt, to_date=to_dt, category=category, user=user)
+        hits = self.archive_search_lookup().search(search) if isinstance(search, str) else None
+        if hits is not None and not hits:
+            return []
+        rows = self.archive.read_range(
+            from_dt.isoformat() if from_dt else None,
+            to_dt.isoformat() if to_dt else None,
+            user=user.strip() if isinstance(user, str) else None,
+            category=category.strip().lower() if isinstance(category, str) else None,
+            months=None if hits is None else {month for month, _id in hits},
+        )
+        # Rows restored for editing shadow their archived copies.
+        by_id = self._by_id
+        return [
+            expense
+            for expense in rows
+            if expense["id"] not in by_id
+            and (hits is None or (expense["date"][:7], expense["id"]) in hits)
+            and matches(expense)
+        ]
+
+    def archive_search_lookup(self) -> SearchIndex:
+        """Search index over the archive's rows, rebuilt when the archive changes."""
+        signature = self.archive.signature()
+        if self.archive_search is None or self.archive_search[0] != signature:
+            index = SearchIndex()
+            index.add_many(
+                ((expense["date"][:7], expense["id"]), self.search_text(expense))
+                for expense in self.archive.read_months(self.archive.months())
+            )
+            self.archive_search = (signature, index)
+        return self.archive_search[1]
+
+    def restore_archived(
+        self,
+        *,
+        months: Iterable[str] = (),
+        user: str | None = None,
+        save: Callable[[], bool] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Move whole archived months back into the editable store, e.g. before an edit.
+
+        ``user`` restores every month that has rows of that user. ``save`` should
+        persist the editable store and report success; the months are only dropped
+        from the archive once it has, and live rows shadow archived copies until then.
+        """
+        if self.archive is None:
+            return []
+        wanted = set(months)
+        if user:
+            wanted |= {month for month, block in self.archive.index().items() if user in block["users"]}
+        rows = [expense for expense in self.archive.read_months(wanted) if expense["id"] not in self._by_id]
+        if not rows:
+            return []
+        self.claim_ids(rows)
+        self.expenses.extend(rows)
+        self.track_expenses(rows)
+        self.notify_changed()
+        if save is None or save():
+            self.archive.write_months({month: [] for month in wanted})
+            self.refresh_name_pins()
+            self.refresh_archive_rollup()
+        return rows
@@ -0,0 +1,200 @@
+from __future__ import annotations
+import heapq
+import math
+from itertools import count
+from typing import Any, Callable, Iterable
+from money import amount_of, to_amount
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch-style).
+
+    Values fall into logarithmic buckets, so memory depends on the spread of the
+    amounts (a few hundred buckets for cents..millions) rather than the row count.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        if value < 0:
+            raise ValueError("QuantileSketch only accepts non-negative values")
+        self.count += 1
+        if value == 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[key] = self._buckets.get(key, 0) + 1
+
+    def merge(self, other: QuantileSketch) -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for key, bucket_count in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + bucket_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float | None:
+        if not 0 <= q <= 1:
+            raise ValueError("quantile must be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if seen > rank:
+                # Bucket midpoint keeps the error within relative_accuracy.
+                return 2 * self.gamma**key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self._buckets) / (self.gamma + 1)
+
+
+class RunningStats:
+    """Welford mean/variance accumulator; mergeable and O(1) memory."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, other: RunningStats) -> None:
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+
+def category_key(expense: dict[str, Any]) -> str:
+    return expense["category"].strip().lower()
+
+
+def user_category_key(expense: dict[str, Any]) -> tuple[str, str]:
+    return expense["user"], category_key(expense)
+
+
+def top_n(expenses: Iterable[dict[str, Any]], n: int) -> list[dict[str, Any]]:
+    """Largest ``n`` expenses by amount using a size-n heap instead of a full sort."""
+    if n <= 0:
+        return []
+    return heapq.nlargest(n, expenses, key=amount_of)
+
+
+def quantiles(
+    expenses: Iterable[dict[str, Any]],
+    qs: Iterable[float] = (0.5, 0.95),
+    *,
+    key: Callable[[dict[str, Any]], Any] | None = category_key,
+    relative_accuracy: float = 0.01,
+) -> dict[Any, dict[float, float | None]]:
+    """Approximate quantiles per group in one pass; ``key=None`` gives one overall group.
+
+    Amounts are sketched in cents and reported in currency units.
+    """
+    qs = tuple(qs)
+    sketches: dict[Any, QuantileSketch] = {}
+    for expense in expenses:
+        group = key(expense) if key is not None else None
+        sketch = sketches.get(group)
+        if sketch is None:
+            sketch = sketches[group] = QuantileSketch(relative_accuracy)
+        sketch.add(expense["amount"])
+    return {group: {q: scaled_quantile(sketch, q) for q in qs} for group, sketch in sketches.items()}
+
+
+def scaled_quantile(sketch: QuantileSketch, q: float) -> float | None:
+    value = sketch.quantile(q)
+    return None if value is None else to_amount(value)
+
+
+def find_outliers(
+    expenses: Iterable[dict[str, Any]],
+    *,
+    method: str = "zscore",
+    threshold: float | None = None,
+    key: Callable[[dict[str, Any]], Any] = user_category_key,
+    limit: int = 20,
+    min_count: int = 5,
+) -> list[tuple[dict[str, Any], float]]:
+    """Flag unusual amounts per group in a single pass with bounded memory.
+
+    Outliers are always extremes, so each group only keeps its ``limit`` largest and
+    smallest rows next to its running stats/sketch; thresholds are applied to those
+    candidates once the pass is done. Returns ``(expense, score)`` pairs where score
+    is the z-score, or the distance outside the IQR fence in IQR units.
+    """
+    if method not in ("zscore", "iqr"):
+        raise ValueError("method must be 'zscore' or 'iqr'")
+    if threshold is None:
+        threshold = 3.0 if method == "zscore" else 1.5
+
+    tie_breaker = count()
+    groups: dict[Any, tuple[RunningStats, QuantileSketch, list, list]] = {}
+    for expense in expenses:
+        amount = expense["amount"]  # cents; scores do not depend on the unit
+        group = key(expense)
+        state = groups.get(group)
+        if state is None:
+            state = groups[group] = (RunningStats(), QuantileSketch(), [], [])
+        stats, sketch, largest, smallest = state
+        stats.add(amount)
+        if method == "iqr":
+            sketch.add(amount)
+        order = next(tie_breaker)
+        # Min-heap of the largest rows and (negated) min-heap of the smallest rows.
+        if len(largest) < limit:
+            heapq.heappush(largest, (amount, order, expense))
+        elif amount > largest[0][0]:
+            heapq.heapreplace(largest, (amount, order, expense))
+        if len(smallest) < limit:
+            heapq.heappush(smallest, (-amount, order, expense))
+        elif -amount > smallest[0][0]:
+            heapq.heapreplace(smallest, (-amount, order, expense))
+
+    flagged: list[tuple[dict[str, Any], float]] = []
+    for stats, sketch, largest, smallest in groups.values():
+        if stats.count < min_count:
+            continue
+        candidates = {order: expense for _amount, order, expense in largest + smallest}
+        if method == "zscore":
+            if stats.stddev == 0:
+                continue
+            for expense in candidates.values():
+                score = (expense["amount"] - stats.mean) / stats.stddev
+                if abs(score) >= threshold:
+                    flagged.append((expense, score))
+        else:
+            q1, q3 = sketch.quantile(0.25), sketch.quantile(0.75)
+            iqr = q3 - q1
+            if iqr <= 0:
+                continue
+            low, high = q1 - threshold * iqr, q3 + threshold * iqr
+            for expense in candidates.values():
+                amount = expense["amount"]
+                if amount > high:
+                    flagged.append((expense, (amount - q3) / iqr))
+                elif amount < low:
+                    flagged.append((expense, (amount - q1) / iqr))
+    flagged.sort(key=lambda item: abs(item[1]), reverse=True)
+    return flagged
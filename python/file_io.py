@@ -0,0 +1,127 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+try:
+    import fcntl
+except ImportError:
+    # Advisory locks are POSIX-only; on Windows I/O falls back to unlocked access.
+    fcntl = None
+
+
+@contextmanager
+def file_lock(target: Path, *, exclusive: bool) -> Iterator[None]:
+    """Hold an advisory lock on a sidecar ``.lock`` file next to ``target``.
+
+    The data file itself is replaced atomically on save, so the lock lives on a
+    separate file whose inode stays stable across writers.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path = target.with_name(target.name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a+") as lock_handle:
+        fcntl.flock(lock_handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_handle.fileno(), fcntl.LOCK_UN)
+
+
+def file_fingerprint(target: str | Path) -> tuple[int, int] | None:
+    """Cheap change marker (mtime, size) used to tell our own writes from external ones."""
+    try:
+        stat = Path(target).stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_json_atomic(target: Path, data: Any, *, indent: int | None = 2) -> None:
+    """Write a temp file and swap it in so readers never observe a half-written file."""
+    temp_path = target.with_name(target.name + ".tmp")
+    with temp_path.open("w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=indent)
+    os.replace(temp_path, target)
+
+
+SNAPSHOT_FORMAT = "expense-tracker"
+SNAPSHOT_VERSION = 2
+
+
+def write_checksummed_json(target: Path, records: list[Any]) -> str:
+    """Atomically write records as a JSON object whose first line carries a checksum.
+
+    The whole file is still ordinary JSON (``{"format": ..., "expenses": [...]}``);
+    the checksum covers the exact bytes of the ``expenses`` array, so a reader can
+    verify it without re-serializing anything. Returns that checksum.
+    """
+    payload = json.dumps(records, indent=2).encode("utf-8")
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "count": len(records),
+        "checksum": "sha256:" + hashlib.sha256(payload).hexdigest(),
+    }
+    header_line = json.dumps(header)[:-1] + ', "expenses":\n'
+    temp_path = target.with_name(target.name + ".tmp")
+    with temp_path.open("wb") as handle:
+        handle.write(header_line.encode("utf-8"))
+        handle.write(payload)
+        handle.write(b"\n}\n")
+    os.replace(temp_path, target)
+    return header["checksum"]
+
+
+def read_snapshot_checksum(target: Path) -> str | None:
+    """The checksum in a data file's header line, read without loading the rows.
+
+    It is what the writer recorded, not verified against the payload.
+    """
+    try:
+        with target.open("rb") as handle:
+            first_line = handle.readline()
+    except OSError:
+        return None
+    if not first_line.startswith(b'{"format": "' + SNAPSHOT_FORMAT.encode("ascii")):
+        return None
+    try:
+        header = json.loads(first_line.rstrip(b"\n") + b" null}")
+    except ValueError:
+        return None
+    checksum = header.get("checksum") if isinstance(header, dict) else None
+    return checksum if isinstance(checksum, str) else None
+
+
+def read_checksummed_json(target: Path) -> tuple[Any, bool]:
+    """Read a data file written by write_checksummed_json or by older/other writers.
+
+    Returns ``(records, trusted)``. ``trusted`` is True only when the checksum header
+    matches the payload, i.e. the file is byte-for-byte what this app wrote. Other
+    files (legacy bare lists, hand edits, other apps) come back untrusted.
+    """
+    raw = target.read_bytes()
+    header_end = raw.find(b"\n")
+    if raw.startswith(b'{"format": "' + SNAPSHOT_FORMAT.encode("ascii")) and header_end > 0:
+        try:
+            header = json.loads(raw[:header_end] + b" null}")
+        except ValueError:
+            header = None
+        payload = raw[header_end + 1 : -3]
+        if (
+            isinstance(header, dict)
+            and raw.endswith(b"\n}\n")
+            and header.get("checksum") == "sha256:" + hashlib.sha256(payload).hexdigest()
+        ):
+            records = json.loads(payload)
+            if isinstance(records, list) and len(records) == header.get("count"):
+                return records, True
+
+    data = json.loads(raw)
+    if isinstance(data, dict) and "expenses" in data:
+        data = data["expenses"]
+    return data, False
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import multiprocessing
 import sys
 from pathlib import Path
 from PySide6.QtWidgets import QApplication
@@ -20,4 +21,6 @@ def main() -> int:
     return app.exec()
 
 if __name__ == "__main__":
+    # Needed for the file-merge process pool in frozen (PyInstaller) builds.
+    multiprocessing.freeze_support()
     raise SystemExit(main())
\ No newline at end of file
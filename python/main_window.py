@@ -1,11 +1,16 @@
 from __future__ import annotations
 import csv
+import os
+import threading
 from collections import defaultdict
+from datetime import date
 from pathlib import Path
-from typing import Any
-from PySide6.QtCore import QFile, QDate, Qt
+from typing import Any, Callable
+from PySide6.QtCore import QFile, QDate, QFileSystemWatcher, Qt, QTimer, Signal
+from PySide6.QtGui import QKeySequence
 from PySide6.QtUiTools import QUiLoader
 from PySide6.QtWidgets import (
+    QApplication,
     QComboBox,
     QDateEdit,
     QDialog,
@@ -13,8 +18,10 @@ from PySide6.QtWidgets import (
     QFrame,
     QHBoxLayout,
     QGridLayout,
+    QInputDialog,
     QLabel,
-    QListWidget,
+    QLineEdit,
+    QListView,
     QMainWindow,
     QMessageBox,
     QPushButton,
@@ -32,8 +39,19 @@ try:
     HAS_QT_CHARTS = True
 except ImportError:
     HAS_QT_CHARTS = False
+import expense_stats
+import recurring
 from add_expense_dialog import AddEditDialog
-from expense_manager import ExpenseManager
+from background_saver import BackgroundSaver
+from expense_archive import ExpenseArchive
+from expense_manager import BudgetStatus, ExpenseChanges, ExpenseManager
+from file_io import file_fingerprint
+from memory_usage import MemoryEstimate, format_bytes
+from money import format_amount, to_amount, total_cents
+from name_list_model import NameListModel
+from partition_store import PartitionStore
+from recurring import SpendingForecast
+from rollup_file import RollupSnapshot
 from table_model import ExpenseTableModel
 
 
@@ -41,34 +59,111 @@ from table_model import ExpenseTableModel
 class MainWindow(QMainWindow):
     """Coordinates UI events, table data, filters, and summary display."""
 
+    # Emitted from the loader thread with None or the exception that stopped the load.
+    ledgerLoaded = Signal(object)
+    # Emitted from the forecast thread with (token, SpendingForecast or the exception raised).
+    forecastReady = Signal(object)
+
+    # Row budget for lazily loaded shards when partitioned storage is in use.
+    MAX_LOADED_ROWS = 200_000
+    # Same user and amount this many days apart counts as a possible duplicate.
+    DUPLICATE_WINDOW_DAYS = 3
+    # Soft memory cap for ledger, indexes and table caches; EXPENSE_TRACKER_MEMORY_MB overrides it.
+    MEMORY_BUDGET_MB = 512
+    # Rows kept in the table's display cache once the budget has been exceeded.
+    LEAN_CACHE_ROWS = 2048
+    # Undo/redo touching more rows than this re-filters the view instead of patching it.
+    PATCH_ROW_LIMIT = 500
+
     def __init__(self) -> None:
         super().__init__()
         self.load_main_ui()
 
         self.manager = ExpenseManager()
+        self.manager.memory_budget = int(os.environ.get("EXPENSE_TRACKER_MEMORY_MB", self.MEMORY_BUDGET_MB)) * 2**20
         self.data_path = Path(__file__).resolve().parent.parent / "shared" / "data" / "expenses.json"
-        self.load_data()
-        self.manual_users: set[str] = set()
+        self.partition_store = PartitionStore(self.data_path.parent / "partitions")
+        self.archive_path = self.data_path.parent / "expenses_archive.bin"
+        self.budgets_path = self.data_path.parent / "budgets.json"
+        self.rollup_path = self.data_path.parent / "expenses.rollup.json"
+        self.saver: BackgroundSaver | None = None
+        self.load_warnings: list[tuple[str, str]] = []
+        # Latest forecast per user, shown while a newer one is computed off the GUI thread.
+        self.shown_forecasts: dict[str, SpendingForecast] = {}
+        self.forecast_running = False
+        # Summary rows behind the insights panel, to redraw it when a forecast arrives.
+        self.insight_rows: list[dict[str, Any]] = []
 
         self.bind_or_create_widgets()
 
         self.current_view: list[dict[str, Any]] = []
         self.table_model = ExpenseTableModel([])
         self.expenseTableView.setModel(self.table_model)
+        self.expenseTableView.setSortingEnabled(True)
+        self.expenseTableView.verticalScrollBar().valueChanged.connect(self.prefetch_visible_rows)
         self.expenseTableView.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.expenseTableView.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.expenseTableView.verticalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        # Fixed row heights: ResizeToContents would format every row to measure it.
+        self.expenseTableView.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.expenseTableView.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 10)
 
         splitter = self.findChild(QWidget, "mainSplitter")
         if splitter is not None and hasattr(splitter, "setStretchFactor"):
             splitter.setStretchFactor(0, 5)
             splitter.setStretchFactor(1, 2)
 
+        self.setup_name_models()
         self.setup_filter_defaults()
+        self.show_saved_totals()
+        self.ledgerLoaded.connect(self.on_ledger_loaded)
+        self.forecastReady.connect(self.on_forecast_ready)
+        threading.Thread(target=self.load_in_background, name="expense-loader", daemon=True).start()
+
+    def show_saved_totals(self) -> None:
+        """Paint every user's totals and the pie chart from the rollup sidecar before rows load."""
+        if self.statusBar() is not None:
+            self.statusBar().showMessage("Loading expenses...")
+        if self.partition_store.exists():
+            return
+        self.manager.rollup_path = self.rollup_path
+        self.manager.attach_archive(ExpenseArchive(self.archive_path))
+        saved = self.manager.read_rollup_sidecar(self.data_path)
+        if saved is not None:
+            self.show_rollup_summary(saved)
+
+    def show_rollup_summary(self, saved: RollupSnapshot) -> None:
+        totals = {self.normalized_category(category): cents for category, cents in saved.category_totals().items()}
+        self.summaryUserLabel.setText(f"All users: {saved.row_count()} expenses (loading...)")
+        self.summaryTotalLabel.setText(f"Total: ${format_amount(sum(totals.values()))}")
+        self.byCategoryText.setPlainText(self.category_lines(totals))
+        self.update_chart_placeholder(totals)
+
+    def load_in_background(self) -> None:
+        """Loader thread: read the ledger while the window shows saved totals.
+
+        Nothing on the GUI side touches the manager until ledgerLoaded arrives.
+        """
+        try:
+            self.load_data()
+        except Exception as exc:  # reported on the GUI thread
+            self.ledgerLoaded.emit(exc)
+        else:
+            self.ledgerLoaded.emit(None)
+
+    def on_ledger_loaded(self, error: Exception | None) -> None:
+        if error is not None:
+            QMessageBox.critical(self, "Load Error", f"Could not read expenses: {error}")
+            self.close()
+            return
+        self.setup_background_saver()
+        self.manager.add_budget_listener(self.on_budget_alert)
+        self.user_model.set_registry(self.manager.user_names)
         self.connect_signals()
-        self.refresh_user_dropdown()
         self.refresh_category_filter_dropdown()
         self.refresh_table()
+        self.setup_file_watcher()
+        for title, message in self.load_warnings:
+            QMessageBox.warning(self, title, message)
 
     def load_main_ui(self) -> None:
         """Load shared main window layout and attach central widget to this instance."""
@@ -133,6 +228,43 @@ class MainWindow(QMainWindow):
 
         self.create_top_toolbar_if_missing()
         self.create_summary_panel_if_missing()
+        self.create_search_box_if_missing()
+        self.create_insights_panel_if_missing()
+
+    def create_insights_panel_if_missing(self) -> None:
+        """Add the largest/percentile/outlier readout under the summary chart."""
+        self.insightsText = self.findChild(QTextEdit, "insightsText")
+        if self.insightsText is not None:
+            return
+
+        insights_label = QLabel("Insights:", self)
+        insights_label.setStyleSheet("font-weight: bold;")
+
+        self.insightsText = QTextEdit(self)
+        self.insightsText.setObjectName("insightsText")
+        self.insightsText.setReadOnly(True)
+        self.insightsText.setMaximumHeight(140)
+
+        self.summaryContainerLayout.addWidget(insights_label)
+        self.summaryContainerLayout.addWidget(self.insightsText)
+
+    def create_search_box_if_missing(self) -> None:
+        """Add a description search box to the filter row when shared UI omits it."""
+        self.searchLineEdit = self.findChild(QLineEdit, "searchLineEdit")
+        if self.searchLineEdit is not None:
+            return
+
+        self.searchLineEdit = QLineEdit(self)
+        self.searchLineEdit.setObjectName("searchLineEdit")
+        self.searchLineEdit.setPlaceholderText("Search description...")
+        self.searchLineEdit.setClearButtonEnabled(True)
+        self.searchLineEdit.setMinimumWidth(160)
+
+        filter_layout = self.findChild(QHBoxLayout, "filterLayout")
+        if filter_layout is None:
+            self.root_layout().insertWidget(0, self.searchLineEdit)
+            return
+        filter_layout.insertWidget(filter_layout.indexOf(self.clearFiltersButton), self.searchLineEdit)
 
     def create_top_toolbar_if_missing(self) -> None:
         """Build top action toolbar at runtime when shared UI omits it."""
@@ -140,6 +272,10 @@ class MainWindow(QMainWindow):
         self.editButton = self.findChild(QPushButton, "editButton")
         self.deleteButton = self.findChild(QPushButton, "deleteButton")
         self.exportCsvButton = self.findChild(QPushButton, "exportCsvButton")
+        self.mergeFilesButton = self.findChild(QPushButton, "mergeFilesButton")
+        self.budgetsButton = self.findChild(QPushButton, "budgetsButton")
+        self.undoButton = self.findChild(QPushButton, "undoButton")
+        self.redoButton = self.findChild(QPushButton, "redoButton")
         self.manageUsersButton = self.findChild(QPushButton, "manageUsersButton")
         self.userComboBox = self.findChild(QComboBox, "userComboBox")
 
@@ -150,6 +286,10 @@ class MainWindow(QMainWindow):
                 self.editButton,
                 self.deleteButton,
                 self.exportCsvButton,
+                self.mergeFilesButton,
+                self.budgetsButton,
+                self.undoButton,
+                self.redoButton,
                 self.manageUsersButton,
                 self.userComboBox,
             ]
@@ -170,6 +310,14 @@ class MainWindow(QMainWindow):
         self.deleteButton.setObjectName("deleteButton")
         self.exportCsvButton = QPushButton("Export CSV", self)
         self.exportCsvButton.setObjectName("exportCsvButton")
+        self.mergeFilesButton = QPushButton("Merge Files", self)
+        self.mergeFilesButton.setObjectName("mergeFilesButton")
+        self.budgetsButton = QPushButton("Budgets", self)
+        self.budgetsButton.setObjectName("budgetsButton")
+        self.undoButton = QPushButton("Undo", self)
+        self.undoButton.setObjectName("undoButton")
+        self.redoButton = QPushButton("Redo", self)
+        self.redoButton.setObjectName("redoButton")
         self.addButton.setMinimumWidth(120)
         self.exportCsvButton.setMinimumWidth(110)
 
@@ -187,6 +335,10 @@ class MainWindow(QMainWindow):
         toolbar.addWidget(self.editButton)
         toolbar.addWidget(self.deleteButton)
         toolbar.addWidget(self.exportCsvButton)
+        toolbar.addWidget(self.mergeFilesButton)
+        toolbar.addWidget(self.budgetsButton)
+        toolbar.addWidget(self.undoButton)
+        toolbar.addWidget(self.redoButton)
         toolbar.addSeparator()
         toolbar.addWidget(user_label)
         toolbar.addWidget(self.userComboBox)
@@ -262,7 +414,149 @@ class MainWindow(QMainWindow):
         self.summaryContainerLayout.addWidget(self.chartPlaceholderWidget)
 
     def load_data(self) -> None:
-        self.manager.load_from_json(self.data_path)
+        """Runs on the loader thread, so problems are queued in load_warnings, not shown."""
+        # A shard manifest switches the app to lazy per-user/month loading.
+        if self.partition_store.exists():
+            self.manager.attach_store(self.partition_store, max_loaded_rows=self.MAX_LOADED_ROWS)
+        else:
+            # The archive is attached by show_saved_totals.
+            self.manager.load_from_json(self.data_path)
+            # Closed months move to the compressed archive; the current month stays editable.
+            try:
+                if self.manager.archive_closed_months():
+                    self.manager.save_to_json(self.data_path)
+            except (OSError, ValueError) as exc:
+                self.load_warnings.append(("Archive Error", f"Could not archive old months: {exc}"))
+            try:
+                self.manager.refresh_rollup_sidecar()
+            except OSError as exc:
+                self.load_warnings.append(("Rollup Error", f"Could not write saved totals: {exc}"))
+        try:
+            self.manager.load_budgets(self.budgets_path)
+        except (OSError, ValueError) as exc:
+            self.load_warnings.append(("Budget Error", f"Could not read budgets: {exc}"))
+
+    def setup_background_saver(self) -> None:
+        """Persist mutations off the GUI thread, one write per burst of changes."""
+        if self.manager.store is not None:
+            self.saver = BackgroundSaver(
+                self.manager.take_partition_snapshot,
+                self.manager.write_partition_snapshot,
+                parent=self,
+            )
+            self.saver.saveFinished.connect(self.manager.partitions_saved)
+        else:
+            self.saver = BackgroundSaver(
+                lambda: {self.data_path: self.manager.json_snapshot()},
+                lambda snapshot: self.manager.write_json_snapshot(self.data_path, snapshot[self.data_path]),
+                parent=self,
+            )
+        self.saver.saveFailed.connect(self.on_save_failed)
+        self.manager.add_change_listener(self.saver.mark_dirty)
+
+    def on_save_failed(self, message: str) -> None:
+        # Non-modal on purpose: keep accepting input and retry on the next change.
+        if self.statusBar() is not None:
+            self.statusBar().showMessage(f"Save failed: {message} (will retry on next change)")
+
+    def closeEvent(self, event) -> None:
+        if self.saver is not None and not self.saver.close():
+            QMessageBox.warning(self, "Save Error", "Some changes could not be written to disk.")
+        super().closeEvent(event)
+
+    def watched_data_path(self) -> Path:
+        if self.manager.store is not None:
+            return self.manager.store.manifest_path
+        return self.data_path
+
+    def setup_file_watcher(self) -> None:
+        """Watch the shared data file so another running instance's edits show up here."""
+        watched = self.watched_data_path()
+        self.data_watcher = QFileSystemWatcher(self)
+        # Watch the folder too: atomic saves replace the file and drop the file watch.
+        self.data_watcher.addPath(str(watched.parent))
+        if watched.exists():
+            self.data_watcher.addPath(str(watched))
+
+        # Writers can touch the file several times in a row; react once they settle.
+        self.data_reload_timer = QTimer(self)
+        self.data_reload_timer.setSingleShot(True)
+        self.data_reload_timer.setInterval(250)
+        self.data_reload_timer.timeout.connect(self.on_data_file_changed)
+        self.data_watcher.fileChanged.connect(self.data_reload_timer.start)
+        self.data_watcher.directoryChanged.connect(self.data_reload_timer.start)
+
+    def on_data_file_changed(self) -> None:
+        watched = self.watched_data_path()
+        if watched.exists() and str(watched) not in self.data_watcher.files():
+            self.data_watcher.addPath(str(watched))
+        if self.saver.is_busy():
+            # Local edits win; look again once they are on disk.
+            self.data_reload_timer.start()
+            return
+        if file_fingerprint(watched) == self.manager.last_fingerprint:
+            return  # our own save, or nothing changed
+        try:
+            if self.manager.store is not None:
+                changes = self.manager.sync_partitions()
+            else:
+                changes = self.manager.sync_from_json(self.data_path)
+        except (OSError, ValueError) as exc:
+            # A non-locking writer may be mid-save; the next change event retries.
+            if self.statusBar() is not None:
+                self.statusBar().showMessage(f"Could not reload data file: {exc}", 5000)
+            return
+        self.apply_expense_changes(changes)
+        if changes.removed and self.manager.archive is not None:
+            # Another instance may have moved the rows into the archive.
+            self.refresh_table()
+        if changes and self.statusBar() is not None:
+            self.statusBar().showMessage(
+                f"Synced external changes: {len(changes.added)} added, "
+                f"{len(changes.updated)} updated, {len(changes.removed)} removed",
+                5000,
+            )
+
+    def setup_name_models(self) -> None:
+        """Back the user and category selectors with models that follow the manager's registries."""
+        # Follows manager.user_names once the ledger has loaded; see on_ledger_loaded.
+        self.user_model = NameListModel(leading=[("", "")], parent=self)
+        self.bind_name_model(self.userComboBox, self.user_model)
+
+        self.category_filter_model = NameListModel(
+            label=self.normalized_category, leading=[("All Categories", "")], parent=self
+        )
+        self.bind_name_model(self.categoryFilterComboBox, self.category_filter_model)
+
+        self.summary_category_model = NameListModel(
+            label=self.normalized_category, leading=[("All Categories", "")], parent=self
+        )
+        self.bind_name_model(self.summaryCategoryComboBox, self.summary_category_model)
+
+    def bind_name_model(self, combo: QComboBox, model: NameListModel) -> None:
+        """Use ``model`` for ``combo``, keeping its selection when rows are removed or reset."""
+        combo.setModel(model)
+        saved: list[str] = []
+
+        def before(*_args) -> None:
+            saved.append(combo.currentText())
+            combo.blockSignals(True)
+
+        def after(*_args) -> None:
+            text = saved.pop()
+            index = combo.findText(text)
+            if index >= 0:
+                combo.setCurrentIndex(index)
+            elif combo.isEditable():
+                combo.setCurrentText(text)
+            else:
+                combo.setCurrentIndex(0)
+            combo.blockSignals(False)
+
+        model.rowsAboutToBeRemoved.connect(before)
+        model.rowsRemoved.connect(after)
+        model.modelAboutToBeReset.connect(before)
+        model.modelReset.connect(after)
 
     def setup_filter_defaults(self) -> None:
         """Initialize sentinel values for optional date and category filters."""
@@ -276,14 +570,9 @@ class MainWindow(QMainWindow):
         self.toDateEdit.setDate(sentinel)
         self.toDateEdit.setSpecialValueText("Any")
 
-        self.categoryFilterComboBox.clear()
-        self.categoryFilterComboBox.addItem("All Categories", "")
-
         self.summaryMonthDateEdit.setMinimumDate(sentinel)
         self.summaryMonthDateEdit.setDate(sentinel)
         self.summaryMonthDateEdit.setSpecialValueText("All Months")
-        self.summaryCategoryComboBox.clear()
-        self.summaryCategoryComboBox.addItem("All Categories", "")
 
     def connect_signals(self) -> None:
         """Wire UI actions to controller handlers."""
@@ -291,6 +580,14 @@ class MainWindow(QMainWindow):
         self.editButton.clicked.connect(self.on_edit)
         self.deleteButton.clicked.connect(self.on_delete)
         self.exportCsvButton.clicked.connect(self.on_export_csv)
+        self.mergeFilesButton.clicked.connect(self.on_merge_files)
+        self.budgetsButton.clicked.connect(self.on_budgets)
+        self.undoButton.setShortcut(QKeySequence.StandardKey.Undo)
+        self.undoButton.clicked.connect(self.on_undo)
+        self.redoButton.setShortcut(QKeySequence.StandardKey.Redo)
+        self.redoButton.clicked.connect(self.on_redo)
+        self.manager.add_change_listener(self.refresh_history_buttons)
+        self.refresh_history_buttons()
         self.manageUsersButton.clicked.connect(self.on_manage_users)
 
         self.userComboBox.currentTextChanged.connect(self.refresh_table)
@@ -300,6 +597,13 @@ class MainWindow(QMainWindow):
         self.categoryFilterComboBox.currentIndexChanged.connect(self.refresh_table)
         self.clearFiltersButton.clicked.connect(self.on_clear_filters)
 
+        # Index lookups are cheap, but rebuilding the view per keystroke is not.
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.refresh_table)
+        self.searchLineEdit.textChanged.connect(self.search_timer.start)
+
         self.summaryApplyButton.clicked.connect(self.refresh_summary_from_current_view)
 
     def current_user(self) -> str:
@@ -326,55 +630,13 @@ class MainWindow(QMainWindow):
             raise ValueError("current user is required")
         return user
 
-    def refresh_user_dropdown(self) -> None:
-        """Sync user selector from persisted users and runtime manual users."""
-        current = self.current_user()
-        users = sorted({expense["user"] for expense in self.manager.expenses}.union(self.manual_users))
-
-        self.userComboBox.blockSignals(True)
-        self.userComboBox.clear()
-        self.userComboBox.addItem("")
-        for user in users:
-            self.userComboBox.addItem(user)
-
-        if current:
-            self.userComboBox.setCurrentText(current)
-        else:
-            self.userComboBox.setCurrentText("")
-        self.userComboBox.blockSignals(False)
-
     def refresh_category_filter_dropdown(self) -> None:
-        """Populate category filter with normalized, de-duplicated category names."""
-        current = self.categoryFilterComboBox.currentData() or ""
-        raw_categories = self.manager.categories(user=self.current_user() or None)
-        normalized_map = self.normalized_category_map(raw_categories)
-        categories = [normalized_map[key] for key in sorted(normalized_map.keys())]
-
-        self.categoryFilterComboBox.blockSignals(True)
-        self.categoryFilterComboBox.clear()
-        self.categoryFilterComboBox.addItem("All Categories", "")
-        for category in categories:
-            self.categoryFilterComboBox.addItem(category, category)
-
-        idx = self.categoryFilterComboBox.findData(current)
-        self.categoryFilterComboBox.setCurrentIndex(idx if idx >= 0 else 0)
-        self.categoryFilterComboBox.blockSignals(False)
+        """Point the category filter at the current user's registry; it then updates itself."""
+        self.category_filter_model.set_registry(self.manager.category_names_for(self.current_user() or None))
 
     def refresh_summary_filter_dropdown(self, expenses: list[dict[str, Any]]) -> None:
         """Keep summary category selector aligned to currently displayed rows."""
-        current = self.summaryCategoryComboBox.currentData() or ""
-        normalized_map = self.normalized_category_map([expense["category"] for expense in expenses])
-        categories = [normalized_map[key] for key in sorted(normalized_map.keys())]
-
-        self.summaryCategoryComboBox.blockSignals(True)
-        self.summaryCategoryComboBox.clear()
-        self.summaryCategoryComboBox.addItem("All Categories", "")
-        for category in categories:
-            self.summaryCategoryComboBox.addItem(category, category)
-
-        idx = self.summaryCategoryComboBox.findData(current)
-        self.summaryCategoryComboBox.setCurrentIndex(idx if idx >= 0 else 0)
-        self.summaryCategoryComboBox.blockSignals(False)
+        self.summary_category_model.set_names({expense_stats.category_key(expense) for expense in expenses})
 
     def optional_date_from_edit(self, edit: QDateEdit) -> str | None:
         if edit.date() == edit.minimumDate():
@@ -383,23 +645,26 @@ class MainWindow(QMainWindow):
 
     def summary_filtered_expenses(self, expenses: list[dict[str, Any]]) -> list[dict[str, Any]]:
         """Apply optional summary-level month/category filters on top of table view."""
-        filtered = list(expenses)
-
         month_date = self.summaryMonthDateEdit.date()
-        if month_date != self.summaryMonthDateEdit.minimumDate():
-            ym = month_date.toString("yyyy-MM")
-            filtered = [expense for expense in filtered if expense["date"].startswith(ym)]
-
-        category = self.summaryCategoryComboBox.currentData() or ""
-        if category:
-            filtered = [expense for expense in filtered if expense["category"].strip().lower() == category.lower()]
-
-        return filtered
+        ym = month_date.toString("yyyy-MM") if month_date != self.summaryMonthDateEdit.minimumDate() else ""
+        category = (self.summaryCategoryComboBox.currentData() or "").lower()
+        if not ym and not category:
+            # No summary filter: reuse the view list instead of copying it.
+            return expenses
+        return [
+            expense
+            for expense in expenses
+            if (not ym or expense["date"].startswith(ym))
+            and (not category or expense["category"].strip().lower() == category)
+        ]
 
     def on_clear_filters(self) -> None:
         self.fromDateEdit.setDate(self.fromDateEdit.minimumDate())
         self.toDateEdit.setDate(self.toDateEdit.minimumDate())
         self.categoryFilterComboBox.setCurrentIndex(0)
+        self.searchLineEdit.blockSignals(True)
+        self.searchLineEdit.clear()
+        self.searchLineEdit.blockSignals(False)
         self.refresh_table()
 
     def selected_expense_and_index(self) -> tuple[dict[str, Any], int] | tuple[None, None]:
@@ -411,11 +676,94 @@ class MainWindow(QMainWindow):
             return None, None
 
         expense = self.current_view[row]
+        if self.manager.get_expense(expense["id"]) is not expense:
+            # Archived rows are read-only; bring their month back to edit them.
+            self.manager.restore_archived(months=[expense["date"][:7]], save=self.saver.flush)
+            self.refresh_table()
+            expense = self.manager.get_expense(expense["id"])
         for idx, candidate in enumerate(self.manager.expenses):
             if candidate is expense:
                 return expense, idx
         return None, None
 
+    def memory_usage(self) -> dict[str, MemoryEstimate]:
+        """Estimated bytes per structure: manager ledger and indexes plus table model and caches.
+
+        ``table_rows`` is the current view list shared by the table model.
+        """
+        return {**self.manager.memory_usage(), **self.table_model.memory_usage()}
+
+    def check_memory_budget(self) -> None:
+        """On crossing the budget: trim caches (see enforce_memory_budget), cap the table caches and warn."""
+        ui_bytes = sum(estimate.bytes for estimate in self.table_model.memory_usage().values())
+        total = self.manager.enforce_memory_budget(ui_bytes)
+        if total is None:
+            return
+        self.table_model.set_cache_limit(self.LEAN_CACHE_ROWS)
+        if self.statusBar() is not None:
+            self.statusBar().showMessage(
+                f"Memory budget exceeded ({format_bytes(total)} of {format_bytes(self.manager.memory_budget)}); "
+                "caches trimmed",
+                10000,
+            )
+
+    def current_filter(self):
+        """Predicate matching the rows the table should show for the current selection."""
+        return self.manager.build_filter(
+            from_date=self.optional_date_from_edit(self.fromDateEdit),
+            to_date=self.optional_date_from_edit(self.toDateEdit),
+            category=self.categoryFilterComboBox.currentData() or None,
+            user=self.current_user(),
+            search=self.current_search(),
+        )
+
+    def current_search(self) -> str | None:
+        return self.searchLineEdit.text().strip() or None
+
+    def apply_expense_changes(self, changes: ExpenseChanges) -> None:
+        """Patch the visible rows from a record diff instead of re-filtering and resetting."""
+        if not changes:
+            return
+        user = self.current_user()
+        if not user:
+            return
+        try:
+            matches = self.current_filter()
+        except ValueError:
+            self.refresh_table()
+            return
+
+        for expense in changes.removed:
+            self.table_model.remove_expense(expense)
+        for old, new in changes.updated:
+            if self.table_model.contains(old):
+                if matches(new):
+                    self.table_model.replace_expense(old, new)
+                else:
+                    self.table_model.remove_expense(old)
+            elif matches(new):
+                self.table_model.append_expense(new)
+        for expense in changes.added:
+            if matches(expense):
+                self.table_model.append_expense(expense)
+
+        # A user's first expense creates their category registry.
+        self.refresh_category_filter_dropdown()
+        self.refresh_summary_filter_dropdown(self.current_view)
+        self.update_summary_panel(self.current_view)
+
+    def prefetch_visible_rows(self) -> None:
+        """Batch-format the rows on screen (plus a page ahead) before Qt asks per cell."""
+        view = self.expenseTableView
+        first = view.rowAt(0)
+        if first < 0:
+            return
+        last = view.rowAt(view.viewport().height() - 1)
+        if last < 0:
+            last = self.table_model.rowCount() - 1
+        page = last - first + 1
+        self.table_model.prefetch_rows(first, last + page)
+
     def refresh_table(self) -> None:
         """Refresh table data for selected user + filter state, then update summary."""
         try:
@@ -437,6 +785,8 @@ class MainWindow(QMainWindow):
                 to_date=to_date,
                 category=category,
                 user=user,
+                search=self.current_search(),
+                include_archive=True,
             )
             self.table_model.set_expenses(self.current_view)
 
@@ -445,8 +795,9 @@ class MainWindow(QMainWindow):
             self.update_summary_panel(self.current_view)
 
             if self.statusBar() is not None:
-                total = len(self.manager.filter_expenses(user=user))
+                total = self.manager.count_expenses(user=user, include_archive=True)
                 self.statusBar().showMessage(f"User: {user} | Showing {len(self.current_view)} of {total} records")
+            self.check_memory_budget()
         except ValueError as exc:
             QMessageBox.warning(self, "Filter Error", str(exc))
 
@@ -457,35 +808,67 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Validation Error", str(exc))
             return
 
-        dialog = AddEditDialog(self)
+        dialog = AddEditDialog(
+            self,
+            suggest=lambda field_name, prefix: self.manager.suggest_values(field_name, prefix, user=user),
+        )
         if dialog.exec() == QDialog.DialogCode.Accepted:
             payload = dialog.get_values()
             try:
-                self.manager.add_expense(
+                if not self.confirm_not_duplicate(user, payload):
+                    return
+                expense = self.manager.add_expense(
                     user=user,
                     expense_date=payload["date"],
                     category=payload["category"],
                     description=payload["description"],
                     amount=payload["amount"],
                 )
-                self.manager.save_to_json(self.data_path)
-                self.refresh_user_dropdown()
-                self.refresh_table()
+                # Single-row insert keeps the current sort order without a reset.
+                self.apply_expense_changes(ExpenseChanges(added=[expense]))
             except ValueError as exc:
                 QMessageBox.warning(self, "Validation Error", str(exc))
 
+    def confirm_not_duplicate(self, user: str, payload: dict[str, Any]) -> bool:
+        """Ask before adding a row that matches an existing one; True means go ahead."""
+        candidate = self.manager.validate_expense(
+            user=user,
+            expense_date=payload["date"],
+            category=payload["category"],
+            description=payload["description"],
+            amount=payload["amount"],
+        )
+        matches = self.manager.find_duplicates(candidate, fuzzy_days=self.DUPLICATE_WINDOW_DAYS)
+        if not matches:
+            return True
+        existing = matches[0]
+        answer = QMessageBox.question(
+            self,
+            "Possible Duplicate",
+            "A similar expense already exists:\n"
+            f"{existing['date']}  ${format_amount(existing['amount'])}  "
+            f"{existing['category']} - {existing['description']}\n\nAdd this one anyway?",
+        )
+        return answer == QMessageBox.StandardButton.Yes
+
     def on_edit(self) -> None:
         expense, index = self.selected_expense_and_index()
         if expense is None or index is None:
             QMessageBox.information(self, "Edit Expense", "Select an expense to edit")
             return
 
-        dialog = AddEditDialog(self, expense=expense)
+        dialog = AddEditDialog(
+            self,
+            expense=expense,
+            suggest=lambda field_name, prefix: self.manager.suggest_values(
+                field_name, prefix, user=expense["user"]
+            ),
+        )
         if dialog.exec() == QDialog.DialogCode.Accepted:
             payload = dialog.get_values()
             try:
                 user = self.require_current_user()
-                self.manager.edit_expense(
+                updated = self.manager.edit_expense(
                     index,
                     user=user,
                     expense_date=payload["date"],
@@ -493,9 +876,7 @@ class MainWindow(QMainWindow):
                     description=payload["description"],
                     amount=payload["amount"],
                 )
-                self.manager.save_to_json(self.data_path)
-                self.refresh_user_dropdown()
-                self.refresh_table()
+                self.apply_expense_changes(ExpenseChanges(updated=[(expense, updated)]))
             except ValueError as exc:
                 QMessageBox.warning(self, "Validation Error", str(exc))
 
@@ -506,13 +887,36 @@ class MainWindow(QMainWindow):
             return
 
         try:
-            self.manager.delete_expense(index)
-            self.manager.save_to_json(self.data_path)
-            self.refresh_user_dropdown()
-            self.refresh_table()
+            removed = self.manager.delete_expense(index)
+            self.apply_expense_changes(ExpenseChanges(removed=[removed]))
         except ValueError as exc:
             QMessageBox.warning(self, "Delete Error", str(exc))
 
+    def on_undo(self) -> None:
+        self.run_history_step(self.manager.undo, "Undo")
+
+    def on_redo(self) -> None:
+        self.run_history_step(self.manager.redo, "Redo")
+
+    def run_history_step(self, step: Callable[[], ExpenseChanges], title: str) -> None:
+        try:
+            changes = step()
+        except ValueError as exc:
+            QMessageBox.warning(self, title, str(exc))
+            self.refresh_history_buttons()
+            return
+        if len(changes.added) + len(changes.updated) + len(changes.removed) > self.PATCH_ROW_LIMIT:
+            self.refresh_table()
+        else:
+            self.apply_expense_changes(changes)
+
+    def refresh_history_buttons(self) -> None:
+        history = self.manager.history
+        self.undoButton.setEnabled(history.can_undo())
+        self.undoButton.setToolTip(f"Undo {history.undo_label()}" if history.can_undo() else "Nothing to undo")
+        self.redoButton.setEnabled(history.can_redo())
+        self.redoButton.setToolTip(f"Redo {history.redo_label()}" if history.can_redo() else "Nothing to redo")
+
     def on_export_csv(self) -> None:
         """Export currently visible rows to CSV."""
         if not self.current_view:
@@ -537,7 +941,7 @@ class MainWindow(QMainWindow):
                 writer.writerow(
                     [
                         expense["date"],
-                        f"{float(expense['amount']):.2f}",
+                        format_amount(expense["amount"]),
                         expense["category"],
                         expense["description"],
                     ]
@@ -545,6 +949,78 @@ class MainWindow(QMainWindow):
 
         QMessageBox.information(self, "Export CSV", f"Exported {len(self.current_view)} expenses")
 
+    def on_merge_files(self) -> None:
+        """Merge other ledger files (e.g. per-branch exports) into this one."""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self,
+            "Merge Ledger Files",
+            str(self.data_path.parent),
+            "JSON Files (*.json)",
+        )
+        if not paths:
+            return
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            reports = self.manager.merge_files(paths)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.refresh_table()
+
+        lines = [
+            f"Merged {sum(report.added for report in reports)} expenses from "
+            f"{sum(report.error is None for report in reports)} of {len(reports)} files."
+        ]
+        for report in reports:
+            if report.error is not None:
+                lines.append(f"{report.path.name}: {report.error}")
+            elif report.skipped or report.reassigned:
+                lines.append(
+                    f"{report.path.name}: {report.added} added, {report.skipped} already present, "
+                    f"{report.reassigned} given new ids"
+                )
+        QMessageBox.information(self, "Merge Files", "\n".join(lines))
+
+    def on_budgets(self) -> None:
+        """Set or clear the current user's monthly budget for one category."""
+        try:
+            user = self.require_current_user()
+        except ValueError as exc:
+            QMessageBox.warning(self, "Validation Error", str(exc))
+            return
+
+        lines = [self.budget_line(status) for status in self.manager.budget_status(user)]
+        categories = sorted(self.normalized_category_map(self.manager.categories(user=user)).values())
+        category, ok = QInputDialog.getItem(
+            self, "Budgets", "\n".join([*lines, "", "Category:"]) if lines else "Category:", categories, 0, True
+        )
+        if not ok or not category.strip():
+            return
+        current = self.manager.budgets.get((user, category.strip().lower()), 0)
+        amount, ok = QInputDialog.getDouble(
+            self, "Budgets", f"Monthly budget for {category.strip()} (0 removes it):", to_amount(current), 0, 1e9, 2
+        )
+        if not ok:
+            return
+        try:
+            self.manager.set_budget(user, category, amount)
+            self.manager.save_budgets(self.budgets_path)
+        except (OSError, ValueError) as exc:
+            QMessageBox.warning(self, "Budget Error", str(exc))
+        self.refresh_summary_from_current_view()
+
+    def budget_line(self, status: BudgetStatus) -> str:
+        return (
+            f"{self.normalized_category(status.category)}: ${format_amount(status.spent)} "
+            f"of ${format_amount(status.limit)} ({status.percent:.0f}%)"
+        )
+
+    def on_budget_alert(self, status: BudgetStatus) -> None:
+        # Shown once the add/edit has reached the table, not in the middle of it.
+        title = "Budget Exceeded" if status.crossed >= 100 else "Budget Warning"
+        message = f"{self.budget_line(status)} in {status.month}."
+        QTimer.singleShot(0, lambda: QMessageBox.warning(self, title, message))
+
     def on_manage_users(self) -> None:
         """Manage users from a lightweight popup (add/remove/select current)."""
         dialog = QDialog(self)
@@ -552,18 +1028,22 @@ class MainWindow(QMainWindow):
         dialog.setMinimumWidth(360)
         layout = QVBoxLayout(dialog)
 
-        users_list = QListWidget(dialog)
-        users = sorted({expense["user"] for expense in self.manager.expenses}.union(self.manual_users))
-        users_list.addItems(users)
+        # The list and the name box share one model that follows the user registry.
+        users_model = NameListModel(parent=dialog)
+        users_model.set_registry(self.manager.user_names)
+        dialog.finished.connect(lambda _result: users_model.set_registry(None))
+        users_list = QListView(dialog)
+        users_list.setModel(users_model)
+        users = users_model.names()
         if self.current_user() in users:
-            users_list.setCurrentRow(users.index(self.current_user()))
+            users_list.setCurrentIndex(users_model.index(users.index(self.current_user())))
         layout.addWidget(users_list)
 
         input_row = QHBoxLayout()
         input_label = QLabel("User Name:", dialog)
         user_name_input = QComboBox(dialog)
         user_name_input.setEditable(True)
-        user_name_input.addItems(users)
+        self.bind_name_model(user_name_input, users_model)
         input_row.addWidget(input_label)
         input_row.addWidget(user_name_input)
         layout.addLayout(input_row)
@@ -579,31 +1059,17 @@ class MainWindow(QMainWindow):
         action_grid.addWidget(close_button, 1, 1)
         layout.addLayout(action_grid)
 
-        def refresh_user_list() -> None:
-            latest_users = sorted({expense["user"] for expense in self.manager.expenses}.union(self.manual_users))
-            users_list.clear()
-            users_list.addItems(latest_users)
-            current = self.current_user()
-            if current in latest_users:
-                users_list.setCurrentRow(latest_users.index(current))
-            user_name_input.blockSignals(True)
-            user_name_input.clear()
-            user_name_input.addItems(latest_users)
-            user_name_input.setCurrentText(current)
-            user_name_input.blockSignals(False)
-
         def add_user() -> None:
             new_user = user_name_input.currentText().strip()
             if not new_user:
                 QMessageBox.warning(dialog, "Manage Users", "Enter a user name")
                 return
-            if any(expense["user"] == new_user for expense in self.manager.expenses) or new_user in self.manual_users:
+            if new_user in self.manager.user_names:
                 QMessageBox.information(dialog, "Manage Users", "User already exists")
                 return
-            self.manual_users.add(new_user)
-            self.refresh_user_dropdown()
+            self.manager.manual_users.add(new_user)
+            self.manager.refresh_name_pins()
             self.refresh_table()
-            refresh_user_list()
             user_name_input.setCurrentText(new_user)
 
         def remove_user() -> None:
@@ -611,8 +1077,7 @@ class MainWindow(QMainWindow):
             if not selected_name:
                 QMessageBox.warning(dialog, "Manage Users", "Select a user to remove")
                 return
-            rows = [idx for idx, expense in enumerate(self.manager.expenses) if expense["user"] == selected_name]
-            if not rows and selected_name not in self.manual_users:
+            if selected_name not in self.manager.user_names:
                 QMessageBox.information(dialog, "Manage Users", "User not found")
                 return
             answer = QMessageBox.question(
@@ -622,22 +1087,23 @@ class MainWindow(QMainWindow):
             )
             if answer != QMessageBox.StandardButton.Yes:
                 return
-            for idx in reversed(rows):
-                self.manager.delete_expense(idx)
-            self.manual_users.discard(selected_name)
-            self.manager.save_to_json(self.data_path)
+            self.manager.load_partitions_for(user=selected_name)
+            self.manager.restore_archived(user=selected_name, save=self.saver.flush)
+            rows = [idx for idx, expense in enumerate(self.manager.expenses) if expense["user"] == selected_name]
+            with self.manager.batch(f"Remove user {selected_name}"):
+                self.manager.delete_expenses(rows)
+            self.manager.manual_users.discard(selected_name)
+            self.manager.refresh_name_pins()
             if self.current_user() == selected_name:
                 self.userComboBox.setCurrentText("")
-            self.refresh_user_dropdown()
             self.refresh_table()
-            refresh_user_list()
 
         def set_current() -> None:
-            selected_item = users_list.currentItem()
-            if selected_item is None:
+            selected_index = users_list.currentIndex()
+            if not selected_index.isValid():
                 selected_name = user_name_input.currentText().strip()
             else:
-                selected_name = selected_item.text().strip()
+                selected_name = selected_index.data().strip()
             if not selected_name:
                 return
             self.userComboBox.setCurrentText(selected_name)
@@ -647,10 +1113,8 @@ class MainWindow(QMainWindow):
         remove_button.clicked.connect(remove_user)
         set_current_button.clicked.connect(set_current)
         close_button.clicked.connect(dialog.reject)
-        users_list.itemSelectionChanged.connect(
-            lambda: user_name_input.setCurrentText(users_list.currentItem().text())
-            if users_list.currentItem() is not None
-            else None
+        users_list.selectionModel().currentChanged.connect(
+            lambda index, _previous: user_name_input.setCurrentText(index.data()) if index.isValid() else None
         )
 
         dialog.exec()
@@ -664,27 +1128,141 @@ class MainWindow(QMainWindow):
         user = self.current_user()
         self.summaryUserLabel.setText(f"User: {user or '-'}")
 
-        total = sum(float(expense["amount"]) for expense in summary_expenses)
-        self.summaryTotalLabel.setText(f"Total: ${total:.2f}")
+        # Integer cents throughout, so the totals are exact however many rows there are.
+        total = total_cents(summary_expenses)
+        self.summaryTotalLabel.setText(f"Total: ${format_amount(total)}")
 
-        totals: defaultdict[str, float] = defaultdict(float)
+        totals: defaultdict[str, int] = defaultdict(int)
         for expense in summary_expenses:
             key = self.normalized_category(expense["category"])
-            totals[key] += float(expense["amount"])
+            totals[key] += expense["amount"]
 
+        self.byCategoryText.setPlainText(self.category_lines(totals))
+        self.update_chart_placeholder(totals)
+        self.update_insights_panel(summary_expenses)
+
+    def category_lines(self, totals: dict[str, int]) -> str:
+        """Per-category cents as "Label: $x (y%)" lines, largest first."""
+        total = sum(totals.values())
         if total <= 0 or not totals:
-            self.byCategoryText.setPlainText("No data available for the current selection.")
+            return "No data available for the current selection."
+        lines = []
+        for category, amount in sorted(totals.items(), key=lambda it: it[1], reverse=True):
+            lines.append(f"{category}: ${format_amount(amount)} ({amount / total * 100.0:.1f}%)")
+        return "\n".join(lines)
+
+    def update_insights_panel(self, expenses: list[dict[str, Any]]) -> None:
+        """Show recent totals, budgets and the forecast, then top expenses, median/p95 and outliers of the summary rows."""
+        self.insight_rows = expenses
+        lines = self.spending_overview_lines() + self.forecast_lines()
+        if not expenses:
+            self.insightsText.setPlainText("\n".join([*lines, "No data available for the current selection."]))
+            return
+
+        overall = expense_stats.quantiles(expenses, (0.5, 0.95), key=None)[None]
+        lines.append(f"Median: ${overall[0.5]:.2f} | P95: ${overall[0.95]:.2f}")
+
+        by_category = expense_stats.quantiles(expenses, (0.5, 0.95))
+        for key in sorted(by_category):
+            values = by_category[key]
+            lines.append(
+                f"  {self.normalized_category(key)}: median ${values[0.5]:.2f}, p95 ${values[0.95]:.2f}"
+            )
+
+        lines.append("Largest:")
+        for expense in expense_stats.top_n(expenses, 5):
+            lines.append(f"  {expense['date']}  ${format_amount(expense['amount'])}  {expense['description']}")
+
+        outliers = expense_stats.find_outliers(expenses, limit=5)
+        if outliers:
+            lines.append("Outliers:")
+            for expense, score in outliers[:5]:
+                lines.append(
+                    f"  {expense['date']}  ${format_amount(expense['amount'])}  "
+                    f"{self.normalized_category(expense['category'])} (z={score:+.1f})"
+                )
+        self.insightsText.setPlainText("\n".join(lines))
+
+    def spending_overview_lines(self) -> list[str]:
+        """Today/week/month totals and budget use for the current user, read from the rollups."""
+        user = self.current_user()
+        if not user:
+            return []
+        today = date.today()
+        day_cents, week_cents, month_cents = self.manager.period_totals(user, today)
+        lines = [
+            f"Today: ${format_amount(day_cents)} | "
+            f"This week: ${format_amount(week_cents)} | "
+            f"This month: ${format_amount(month_cents)}"
+        ]
+        lines.extend(f"Budget {self.budget_line(status)}" for status in self.manager.budget_status(user, month=today))
+        return lines
+
+    def forecast_lines(self) -> list[str]:
+        """Next month's projected spending per category for the current user, and their recurring expenses."""
+        user = self.current_user()
+        if not user:
+            return []
+        forecast = self.manager.cached_forecast(user=user)
+        if forecast is None:
+            self.start_forecast(user)
+            forecast = self.shown_forecasts.get(user)
+            if forecast is None:
+                return ["Forecast: calculating..."]
         else:
-            lines = []
-            for category, amount in sorted(totals.items(), key=lambda it: it[1], reverse=True):
-                pct = (amount / total * 100.0) if total > 0 else 0.0
-                lines.append(f"{category}: ${amount:.2f} ({pct:.1f}%)")
-            self.byCategoryText.setPlainText("\n".join(lines))
+            self.shown_forecasts[user] = forecast
+        categories = forecast.for_user(user)
+        if not categories:
+            return []
+        lines = [f"Forecast {forecast.month}: ${format_amount(sum(item.total for item in categories))}"]
+        for item in categories:
+            recurring = f" (recurring ${format_amount(item.recurring)})" if item.recurring else ""
+            lines.append(f"  {self.normalized_category(item.category)}: ${format_amount(item.total)}{recurring}")
+        series = [series for series in forecast.series if series.user == user and series.active]
+        if series:
+            lines.append("Recurring:")
+            for item in series[:5]:
+                lines.append(
+                    f"  {item.description}  ${format_amount(item.amount)} {item.period}, next {item.next_date}"
+                )
+        return lines
 
-        self.update_chart_placeholder(totals)
+    def start_forecast(self, user: str) -> None:
+        """Compute ``user``'s forecast on a worker thread; one runs at a time.
+
+        Rows are gathered here on the GUI thread; the worker only runs the
+        detection over that private list. Requests made meanwhile are picked up
+        when on_forecast_ready redraws the panel.
+        """
+        if self.forecast_running:
+            return
+        self.forecast_running = True
+        token, rows = self.manager.forecast_input(user=user)
+        threading.Thread(
+            target=self.forecast_in_background, args=(token, rows), name="expense-forecast", daemon=True
+        ).start()
+
+    def forecast_in_background(self, token: tuple, rows: list[dict[str, Any]]) -> None:
+        try:
+            result = recurring.forecast(rows, as_of=token[1])
+        except Exception as exc:  # reported on the GUI thread
+            result = exc
+        self.forecastReady.emit((token, result))
+
+    def on_forecast_ready(self, payload: tuple[tuple, SpendingForecast | Exception]) -> None:
+        token, result = payload
+        self.forecast_running = False
+        if isinstance(result, Exception):
+            if self.statusBar() is not None:
+                self.statusBar().showMessage(f"Forecast failed: {result}", 10000)
+            return
+        # Shown even if rows changed meanwhile; the redraw then asks for a fresh one.
+        self.shown_forecasts[token[0]] = result
+        self.manager.store_forecast(token, result)
+        self.update_insights_panel(self.insight_rows)
 
-    def update_chart_placeholder(self, totals: defaultdict[str, float]) -> None:
-        """Render pie chart if QtCharts is available, else show text fallback."""
+    def update_chart_placeholder(self, totals: dict[str, int]) -> None:
+        """Render pie chart of per-category cents if QtCharts is available, else show text fallback."""
         while self.chartPlaceholderLayout.count():
             item = self.chartPlaceholderLayout.takeAt(0)
             widget = item.widget()
@@ -698,7 +1276,7 @@ class MainWindow(QMainWindow):
         if HAS_QT_CHARTS:
             series = QPieSeries()
             for category, amount in sorted(totals.items(), key=lambda it: it[1], reverse=True):
-                series.append(category, amount)
+                series.append(category, to_amount(amount))
 
             chart = QChart()
             chart.addSeries(series)
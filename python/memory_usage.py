@@ -0,0 +1,84 @@
+from __future__ import annotations
+import sys
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Iterable, Sized
+
+# Rows are sampled evenly rather than walked, so a report stays cheap on big ledgers.
+SAMPLE_SIZE = 256
+
+
+@dataclass
+class MemoryEstimate:
+    """Estimated bytes held by one structure and the rows it covers."""
+
+    rows: int
+    bytes: int
+
+    @property
+    def per_row(self) -> float:
+        return self.bytes / self.rows if self.rows else 0.0
+
+
+def sampled(items: list[Any], sample: int = SAMPLE_SIZE) -> list[Any]:
+    if len(items) <= sample:
+        return items
+    step = len(items) / sample
+    return [items[int(i * step)] for i in range(sample)]
+
+
+def deep_size(value: Any) -> int:
+    """Size of a value plus the containers and scalars inside it.
+
+    Dict keys are left out: record field names are shared by every row.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for item in value.values():
+            size += deep_size(item)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += deep_size(item)
+    return size
+
+
+def scaled(total: int, sample: list[Any], size_of: Callable[[Any], int]) -> int:
+    if not sample:
+        return 0
+    return int(sum(size_of(item) for item in sample) * total / len(sample))
+
+
+def estimate_rows(rows: list[dict[str, Any]]) -> MemoryEstimate:
+    """A list that owns its records: the list itself plus every record dict."""
+    return MemoryEstimate(len(rows), sys.getsizeof(rows) + scaled(len(rows), sampled(rows), deep_size))
+
+
+def estimate_references(rows: Sized) -> MemoryEstimate:
+    """A view holding references to records owned elsewhere: pointers only."""
+    return MemoryEstimate(len(rows), sys.getsizeof(rows))
+
+
+def estimate_mapping(
+    mapping: dict[Any, Any],
+    size_of: Callable[[Any], int] | None = None,
+) -> MemoryEstimate:
+    """A dict's hash table plus, with ``size_of``, what each value holds on its own.
+
+    Keys are assumed to be shared with the records (ids, tokens) and not counted.
+    """
+    size = sys.getsizeof(mapping)
+    if size_of is not None and mapping:
+        size += scaled(len(mapping), sampled(list(islice(mapping.values(), 4 * SAMPLE_SIZE))), size_of)
+    return MemoryEstimate(len(mapping), size)
+
+
+def combine(estimates: Iterable[MemoryEstimate], rows: int) -> MemoryEstimate:
+    return MemoryEstimate(rows, sum(estimate.bytes for estimate in estimates))
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import math
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from operator import itemgetter
+from typing import Any, Iterable
+
+# In memory every record's "amount" is an int number of cents; floats exist only
+# in files and on screen.
+CENTS_PER_UNIT = 100
+ONE_CENT = Decimal("0.01")
+amount_of = itemgetter("amount")
+
+
+def parse_cents(value: Any) -> int:
+    """Exact cents for an amount given as a number or numeric string.
+
+    Digits past the cent are rounded half up on the decimal value as written, so
+    ``"1.005"`` and ``1.005`` both give 101 rather than float rounding's 100.
+    """
+    if type(value) is int:
+        return value * CENTS_PER_UNIT
+    if isinstance(value, str):
+        text = value.strip()
+    elif isinstance(value, Decimal):
+        text = value
+    else:
+        try:
+            number = float(value)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("amount must be a number") from exc
+        if not math.isfinite(number):
+            raise ValueError("amount must be a number")
+        cents = round(number * CENTS_PER_UNIT)
+        if cents / CENTS_PER_UNIT == number:
+            return cents  # the usual case: the float was written with at most two decimals
+        text = repr(number)
+    try:
+        exact = Decimal(text)
+        if not exact.is_finite():
+            raise ValueError("amount must be a number")
+        return int(exact.quantize(ONE_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+    except InvalidOperation as exc:
+        raise ValueError("amount must be a number") from exc
+
+
+def to_amount(cents: int) -> float:
+    """Currency units for files, charts and APIs that take a float."""
+    return cents / CENTS_PER_UNIT
+
+
+def format_amount(cents: int) -> str:
+    """Exact "12.50"-style text, with no float rounding in between."""
+    units, rest = divmod(abs(cents), CENTS_PER_UNIT)
+    return f"{'-' if cents < 0 else ''}{units}.{rest:02d}"
+
+
+def total_cents(expenses: Iterable[dict[str, Any]]) -> int:
+    """Exact sum of the records' amounts; int addition never drifts however many rows."""
+    return sum(map(amount_of, expenses))
+
+
+def export_records(records: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Copies of records with float amounts, as written to JSON files."""
+    return [{**expense, "amount": expense["amount"] / CENTS_PER_UNIT} for expense in records]
+
+
+def import_records(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Turn the float amounts of already validated rows back into cents, in place."""
+    for expense in records:
+        amount = expense["amount"]
+        cents = round(amount * CENTS_PER_UNIT)
+        # Same check as parse_cents, inlined because loads run it on every row.
+        expense["amount"] = cents if cents / CENTS_PER_UNIT == amount else parse_cents(amount)
+    return records
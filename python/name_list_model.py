@@ -0,0 +1,98 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Any, Callable, Iterable
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+from name_registry import NameRegistry
+
+DISPLAY_ROLE = Qt.ItemDataRole.DisplayRole.value
+EDIT_ROLE = Qt.ItemDataRole.EditRole.value
+USER_ROLE = Qt.ItemDataRole.UserRole.value
+
+
+class NameListModel(QAbstractListModel):
+    """Sorted names for a combo box or list, changed by single-row inserts and removes.
+
+    Follows a NameRegistry (``set_registry``) or an explicit name set (``set_names``).
+    ``leading`` (label, data) rows stay on top, e.g. an "All Categories" entry. The
+    user role holds ``label(name)``, matching items added as ``addItem(label, label)``.
+    """
+
+    def __init__(
+        self,
+        *,
+        label: Callable[[str], str] | None = None,
+        leading: Iterable[tuple[str, Any]] = (),
+        parent=None,
+    ) -> None:
+        super().__init__(parent)
+        self._label = label or (lambda name: name)
+        self._leading = list(leading)
+        self._names: list[str] = []
+        self.registry: NameRegistry | None = None
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._leading) + len(self._names)
+
+    def data(self, index: QModelIndex, role: int = DISPLAY_ROLE) -> Any:
+        if not index.isValid():
+            return None
+        role = int(role)
+        row = index.row()
+        if row < len(self._leading):
+            label, value = self._leading[row]
+            if role in (DISPLAY_ROLE, EDIT_ROLE):
+                return label
+            return value if role == USER_ROLE else None
+        if role in (DISPLAY_ROLE, EDIT_ROLE, USER_ROLE):
+            return self._label(self._names[row - len(self._leading)])
+        return None
+
+    def names(self) -> list[str]:
+        return list(self._names)
+
+    def set_registry(self, registry: NameRegistry | None) -> None:
+        """Follow another registry; the only change that resets the whole list."""
+        if registry is self.registry:
+            return
+        if self.registry is not None:
+            self.registry.listeners.remove(self.on_registry_change)
+        self.registry = registry
+        self.beginResetModel()
+        self._names = registry.names() if registry is not None else []
+        self.endResetModel()
+        if registry is not None:
+            registry.listeners.append(self.on_registry_change)
+
+    def on_registry_change(self, name: str, present: bool) -> None:
+        if present:
+            self.insert_name(name)
+        else:
+            self.remove_name(name)
+
+    def set_names(self, names: Iterable[str]) -> None:
+        """Show exactly ``names``, touching only rows that appear or disappear."""
+        wanted = set(names)
+        for name in [name for name in self._names if name not in wanted]:
+            self.remove_name(name)
+        for name in sorted(wanted.difference(self._names)):
+            self.insert_name(name)
+
+    def insert_name(self, name: str) -> None:
+        position = bisect_left(self._names, name)
+        if position < len(self._names) and self._names[position] == name:
+            return
+        row = len(self._leading) + position
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._names.insert(position, name)
+        self.endInsertRows()
+
+    def remove_name(self, name: str) -> None:
+        position = bisect_left(self._names, name)
+        if position == len(self._names) or self._names[position] != name:
+            return
+        row = len(self._leading) + position
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._names[position]
+        self.endRemoveRows()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+from typing import Callable
+
+
+class NameRegistry:
+    """Reference-counted set of names, e.g. the users or categories in the ledger.
+
+    Each row holding a name is one reference, and so is each pin for a name known
+    from elsewhere (an unloaded shard, an archive block, a user added by hand).
+    Listeners are called with ``(name, present)`` only when a name gains its first
+    reference or loses its last one, never for repeat references.
+    """
+
+    def __init__(self) -> None:
+        self._counts: dict[str, int] = {}
+        self.listeners: list[Callable[[str, bool], None]] = []
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._counts
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def names(self) -> list[str]:
+        return sorted(self._counts)
+
+    def count(self, name: str) -> int:
+        return self._counts.get(name, 0)
+
+    def add(self, name: str, count: int = 1) -> None:
+        previous = self._counts.get(name, 0)
+        self._counts[name] = previous + count
+        if not previous:
+            self._notify(name, True)
+
+    def remove(self, name: str, count: int = 1) -> None:
+        remaining = self._counts.get(name, 0) - count
+        if remaining > 0:
+            self._counts[name] = remaining
+        elif name in self._counts:
+            del self._counts[name]
+            self._notify(name, False)
+
+    def clear(self) -> None:
+        for name in list(self._counts):
+            del self._counts[name]
+            self._notify(name, False)
+
+    def _notify(self, name: str, present: bool) -> None:
+        for callback in list(self.listeners):
+            callback(name, present)
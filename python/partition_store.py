@@ -0,0 +1,151 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+from file_io import (
+    file_fingerprint,
+    file_lock,
+    read_checksummed_json,
+    write_checksummed_json,
+    write_json_atomic,
+)
+
+PartitionKey = tuple[str, str]
+
+
+def partition_key(expense: dict[str, Any]) -> PartitionKey:
+    """Shard key of a record: (user, "YYYY-MM")."""
+    return expense["user"], expense["date"][:7]
+
+
+class PartitionStore:
+    """On-disk ledger split into one JSON shard per user and year-month.
+
+    ``manifest.json`` lists every shard with its row count, its categories and a
+    revision, so readers can tell which shards changed, and fill category lists,
+    without opening them. Revisions come from a manifest-wide generation that only
+    grows, so a shard deleted and written again never repeats an old revision.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    FORMAT_VERSION = 1
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.manifest_path = self.root / self.MANIFEST_NAME
+        self._entries: dict[PartitionKey, dict[str, Any]] = {}
+        self.last_fingerprint: tuple[int, int] | None = None
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    def refresh(self) -> dict[PartitionKey, dict[str, Any]]:
+        """Re-read the manifest (shared lock) and return its entries by key."""
+        with file_lock(self.manifest_path, exclusive=False):
+            _generation, self._entries = self._read_manifest()
+            self.last_fingerprint = file_fingerprint(self.manifest_path)
+        return self._entries
+
+    def _read_manifest(self) -> tuple[int, dict[PartitionKey, dict[str, Any]]]:
+        """The last generation handed out and the entries by key."""
+        if not self.manifest_path.exists():
+            return 0, {}
+        with self.manifest_path.open("r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        if not isinstance(data, dict) or not isinstance(data.get("partitions"), list):
+            raise ValueError(f"Invalid partition manifest: {self.manifest_path}")
+        entries = {(entry["user"], entry["month"]): entry for entry in data["partitions"]}
+        # Manifests from before the counter: no revision handed out so far is larger.
+        generation = data.get("generation", max((entry["rev"] for entry in entries.values()), default=0))
+        return generation, entries
+
+    def entries(self) -> dict[PartitionKey, dict[str, Any]]:
+        return self._entries
+
+    def revision(self, key: PartitionKey) -> int | None:
+        entry = self._entries.get(key)
+        return entry["rev"] if entry is not None else None
+
+    def users(self) -> set[str]:
+        return {user for user, _month in self._entries}
+
+    def user_categories(self) -> set[tuple[str, str]]:
+        """Every (user, category) pair listed for some shard; see unlisted_keys for older entries."""
+        return {
+            (user, category)
+            for (user, _month), entry in self._entries.items()
+            for category in entry.get("categories", ())
+        }
+
+    def unlisted_keys(self, keys: list[PartitionKey]) -> list[PartitionKey]:
+        """Those of ``keys`` whose entry was written before the manifest listed categories."""
+        return [key for key in keys if "categories" not in self._entries[key]]
+
+    def keys(
+        self,
+        *,
+        user: str | None = None,
+        from_month: str | None = None,
+        to_month: str | None = None,
+    ) -> list[PartitionKey]:
+        """Shards overlapping a user and an inclusive "YYYY-MM" month range."""
+        return sorted(
+            key
+            for key in self._entries
+            if (not user or key[0] == user)
+            and (not from_month or key[1] >= from_month)
+            and (not to_month or key[1] <= to_month)
+        )
+
+    def partition_path(self, key: PartitionKey) -> Path:
+        user, month = key
+        # Percent-encode user names so any name maps to a safe folder.
+        return self.root / quote(user, safe="") / f"{month}.json"
+
+    def read_partition(self, key: PartitionKey) -> tuple[list[Any], bool]:
+        """Rows of one shard plus whether its checksum proved it unmodified."""
+        path = self.partition_path(key)
+        if not path.exists():
+            return [], True
+        with file_lock(path, exclusive=False):
+            data, trusted = read_checksummed_json(path)
+        if not isinstance(data, list):
+            raise ValueError(f"Partition {path} must be a list of expenses")
+        return data, trusted
+
+    def write_partitions(self, partitions: dict[PartitionKey, list[dict[str, Any]]]) -> None:
+        """Rewrite only the given shards and update their manifest entries.
+
+        An empty row list deletes the shard. The manifest is re-read under an
+        exclusive lock so concurrent writers of other shards are not lost.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.manifest_path, exclusive=True):
+            generation, entries = self._read_manifest()
+            generation += 1
+            for key, rows in partitions.items():
+                path = self.partition_path(key)
+                if not rows:
+                    path.unlink(missing_ok=True)
+                    entries.pop(key, None)
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with file_lock(path, exclusive=True):
+                    write_checksummed_json(path, rows)
+                entries[key] = {
+                    "user": key[0],
+                    "month": key[1],
+                    "file": path.relative_to(self.root).as_posix(),
+                    "count": len(rows),
+                    "categories": sorted({row["category"] for row in rows}),
+                    "rev": generation,
+                }
+            manifest = {
+                "version": self.FORMAT_VERSION,
+                "generation": generation,
+                "partitions": [entries[key] for key in sorted(entries)],
+            }
+            write_json_atomic(self.manifest_path, manifest)
+            self._entries = entries
+            self.last_fingerprint = file_fingerprint(self.manifest_path)
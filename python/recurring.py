@@ -0,0 +1,360 @@
+from __future__ import annotations
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Iterable
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    # The pure-Python path gives the same results, only slower on big ledgers.
+    np = None
+    HAS_NUMPY = False
+
+# (name, length in days, allowed slack in days, calendar months per step or 0)
+# of the periods a series may have.
+PERIODS = (
+    ("weekly", 7.0, 1.0, 0),
+    ("biweekly", 14.0, 2.0, 0),
+    ("monthly", 30.44, 3.5, 1),
+    ("quarterly", 91.31, 8.0, 3),
+    ("yearly", 365.25, 12.0, 12),
+)
+# A series needs this many rows, and this share of its gaps must fit its period.
+MIN_OCCURRENCES = 3
+MIN_REGULARITY = 0.75
+# Amounts are banded on a log scale, each band 15% wide, so small price changes
+# keep a series together.
+LOG_BAND = math.log(1.15)
+# Full months before the current one averaged for the non-recurring part of a forecast.
+BASELINE_MONTHS = 3
+NON_WORD = re.compile(r"[\W\d_]+")
+
+
+def normalized_description(description: str) -> str:
+    """Matching form of a description: case-folded, digits and punctuation dropped.
+
+    "NETFLIX.COM 03/2026" and "Netflix.com 04/2026" both become "netflix com".
+    """
+    words = NON_WORD.sub(" ", description.casefold()).split()
+    return " ".join(words) if words else " ".join(description.casefold().split())
+
+
+def amount_band(cents: int) -> int:
+    return int(math.log(cents) / LOG_BAND) if cents > 0 else -1
+
+
+@dataclass
+class RecurringSeries:
+    """Rows of one user with the same description and amount band, repeating on a schedule."""
+
+    user: str
+    description: str
+    category: str
+    period: str
+    period_days: float
+    amount: int
+    occurrences: int
+    first_date: str
+    last_date: str
+    next_date: str
+    regularity: float
+    active: bool
+
+
+@dataclass
+class CategoryForecast:
+    """Projected cents of one user's category in ``month``: due recurring rows plus a baseline."""
+
+    user: str
+    category: str
+    month: str
+    recurring: int
+    baseline: int
+
+    @property
+    def total(self) -> int:
+        return self.recurring + self.baseline
+
+
+@dataclass
+class SpendingForecast:
+    month: str
+    series: list[RecurringSeries] = field(default_factory=list)
+    categories: list[CategoryForecast] = field(default_factory=list)
+
+    def for_user(self, user: str) -> list[CategoryForecast]:
+        """The user's categories, largest forecast first."""
+        return sorted(
+            (forecast for forecast in self.categories if forecast.user == user),
+            key=lambda forecast: (-forecast.total, forecast.category),
+        )
+
+
+class LedgerColumns:
+    """Parallel per-row columns of integer codes (numpy arrays when ``vectorized``).
+
+    ``series`` numbers each (user, normalized description, amount band), ``pairs``
+    each (user, folded category); days are ordinals and months year * 12 + month - 1.
+    Each text column is coded on its own first, so normalizing, parsing and
+    banding run once per distinct value rather than once per row.
+    """
+
+    def __init__(self, expenses: Iterable[dict[str, Any]], *, vectorized: bool) -> None:
+        self.rows = expenses if isinstance(expenses, list) else list(expenses)
+        rows = self.rows
+        user_codes, users = factorize([row["user"] for row in rows])
+        text_codes, texts = factorize([row["description"] for row in rows])
+        category_codes, categories = factorize([row["category"] for row in rows])
+        date_codes, iso_dates = factorize([row["date"] for row in rows])
+        cents = [row["amount"] for row in rows]
+        name_of, names = factorize([normalized_description(text) for text in texts])
+        folded_of, folded = factorize([category.strip().lower() for category in categories])
+        parsed = [date.fromisoformat(iso_date) for iso_date in iso_dates]
+        day_of = [day.toordinal() for day in parsed]
+        month_of = [day.year * 12 + day.month - 1 for day in parsed]
+
+        if vectorized:
+            user_codes = np.asarray(user_codes, dtype=np.int64)
+            self.cents = np.asarray(cents, dtype=np.int64)
+            amounts, amount_codes = np.unique(self.cents, return_inverse=True)
+            bands = np.asarray([amount_band(int(amount)) for amount in amounts], dtype=np.int64) + 1
+            names_per_row = np.asarray(name_of, dtype=np.int64)[np.asarray(text_codes, dtype=np.int64)]
+            band_count = int(bands.max()) + 1 if len(bands) else 1
+            series_keys = (user_codes * len(names) + names_per_row) * band_count + bands[amount_codes]
+            distinct_series, self.series = np.unique(series_keys, return_inverse=True)
+            folded_per_row = np.asarray(folded_of, dtype=np.int64)[np.asarray(category_codes, dtype=np.int64)]
+            pair_keys, self.pairs = np.unique(user_codes * len(folded) + folded_per_row, return_inverse=True)
+            self.pair_keys = [(users[key // len(folded)], folded[key % len(folded)]) for key in pair_keys.tolist()]
+            date_codes = np.asarray(date_codes, dtype=np.int64)
+            self.days = np.asarray(day_of, dtype=np.int64)[date_codes]
+            self.months = np.asarray(month_of, dtype=np.int64)[date_codes]
+            self.series_count = len(distinct_series)
+        else:
+            bands = {amount: amount_band(amount) for amount in set(cents)}
+            self.cents = cents
+            self.series, series_keys = factorize(
+                [(user, name_of[text], bands[amount]) for user, text, amount in zip(user_codes, text_codes, cents)]
+            )
+            self.pairs, pair_keys = factorize(
+                [(user, folded_of[category]) for user, category in zip(user_codes, category_codes)]
+            )
+            self.pair_keys = [(users[user], folded[category]) for user, category in pair_keys]
+            self.days = [day_of[code] for code in date_codes]
+            self.months = [month_of[code] for code in date_codes]
+            self.series_count = len(series_keys)
+
+
+def factorize(values: list[Any]) -> tuple[list[int], list[Any]]:
+    """Per value its code (order of first appearance), and the distinct values."""
+    codes: dict[Any, int] = {}
+    return [codes.setdefault(value, len(codes)) for value in values], list(codes)
+
+
+def match_period(median_gap: float) -> int | None:
+    for position, (_name, days, slack, _months) in enumerate(PERIODS):
+        if abs(median_gap - days) <= slack:
+            return position
+    return None
+
+
+# Per detected series: (period position, regularity, row count, first row, last row).
+Detection = dict[int, tuple[int, float, int, int, int]]
+
+
+def detect_python(columns: LedgerColumns) -> Detection:
+    members: list[list[int]] = [[] for _ in range(columns.series_count)]
+    for row, series_id in enumerate(columns.series):
+        members[series_id].append(row)
+    days = columns.days
+    found: Detection = {}
+    for series_id, rows in enumerate(members):
+        if len(rows) < MIN_OCCURRENCES:
+            continue
+        rows.sort(key=days.__getitem__)
+        gaps = [days[later] - days[earlier] for earlier, later in zip(rows, rows[1:])]
+        gaps = sorted(gap for gap in gaps if gap > 0)
+        if len(gaps) < MIN_OCCURRENCES - 1:
+            continue
+        middle = len(gaps) // 2
+        median_gap = (gaps[(len(gaps) - 1) // 2] + gaps[middle]) / 2
+        period = match_period(median_gap)
+        if period is None:
+            continue
+        _name, length, slack, _months = PERIODS[period]
+        regularity = sum(abs(gap - length) <= slack for gap in gaps) / len(gaps)
+        if regularity >= MIN_REGULARITY:
+            found[series_id] = (period, regularity, len(rows), rows[0], rows[-1])
+    return found
+
+
+def detect_numpy(columns: LedgerColumns) -> Detection:
+    """Same as detect_python, with every per-row and per-gap step done on whole arrays."""
+    series = np.asarray(columns.series, dtype=np.int64)
+    days = np.asarray(columns.days, dtype=np.int64)
+    order = np.lexsort((days, series))
+    series_sorted = series[order]
+    days_sorted = days[order]
+    counts = np.bincount(series, minlength=columns.series_count)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Gaps between consecutive rows of a series; same-day repeats are not gaps.
+    gaps = np.diff(days_sorted)
+    gap_series = series_sorted[1:]
+    keep = (series_sorted[1:] == series_sorted[:-1]) & (gaps > 0)
+    gaps, gap_series = gaps[keep], gap_series[keep]
+    gap_counts = np.bincount(gap_series, minlength=columns.series_count)
+
+    # Median gap per series: sort gaps within each series, then pick the middle ones.
+    gap_order = np.lexsort((gaps, gap_series))
+    gaps_sorted = gaps[gap_order]
+    gap_starts = np.concatenate(([0], np.cumsum(gap_counts)[:-1]))
+    candidates = np.flatnonzero((counts >= MIN_OCCURRENCES) & (gap_counts >= MIN_OCCURRENCES - 1))
+    low = gaps_sorted[gap_starts[candidates] + (gap_counts[candidates] - 1) // 2]
+    high = gaps_sorted[gap_starts[candidates] + gap_counts[candidates] // 2]
+    median_gap = (low + high) / 2
+
+    period = np.full(len(candidates), -1, dtype=np.int64)
+    for position, (_name, length, slack, _months) in reversed(list(enumerate(PERIODS))):
+        period[np.abs(median_gap - length) <= slack] = position
+    matched = period >= 0
+    candidates, period = candidates[matched], period[matched]
+
+    lengths = np.array([period[1] for period in PERIODS])
+    slacks = np.array([period[2] for period in PERIODS])
+    period_of = np.full(columns.series_count, -1, dtype=np.int64)
+    period_of[candidates] = period
+    gap_period = period_of[gap_series]
+    counted = gap_period >= 0
+    fits = np.zeros(len(gaps), dtype=bool)
+    fits[counted] = np.abs(gaps[counted] - lengths[gap_period[counted]]) <= slacks[gap_period[counted]]
+    regularity = np.bincount(gap_series[fits], minlength=columns.series_count)[candidates] / gap_counts[candidates]
+
+    regular = regularity >= MIN_REGULARITY
+    candidates, period, regularity = candidates[regular], period[regular], regularity[regular]
+    first_rows = order[starts[candidates]]
+    last_rows = order[starts[candidates] + counts[candidates] - 1]
+    return {
+        int(series_id): (int(position), float(share), int(count), int(first), int(last))
+        for series_id, position, share, count, first, last in zip(
+            candidates, period, regularity, counts[candidates], first_rows, last_rows
+        )
+    }
+
+
+def baseline_python(columns: LedgerColumns, recurring: set[int], first_month: int, last_month: int) -> dict[int, int]:
+    totals: dict[int, int] = {}
+    for series_id, pair_id, month, cents in zip(columns.series, columns.pairs, columns.months, columns.cents):
+        if first_month <= month <= last_month and series_id not in recurring:
+            totals[pair_id] = totals.get(pair_id, 0) + cents
+    return totals
+
+
+def baseline_numpy(columns: LedgerColumns, recurring: set[int], first_month: int, last_month: int) -> dict[int, int]:
+    months = np.asarray(columns.months, dtype=np.int64)
+    is_recurring = np.zeros(columns.series_count, dtype=bool)
+    is_recurring[list(recurring)] = True
+    mask = (months >= first_month) & (months <= last_month)
+    mask &= ~is_recurring[np.asarray(columns.series, dtype=np.int64)]
+    pairs = np.asarray(columns.pairs, dtype=np.int64)[mask]
+    sums = np.bincount(pairs, weights=np.asarray(columns.cents, dtype=np.int64)[mask], minlength=len(columns.pair_keys))
+    return {int(pair_id): int(round(sums[pair_id])) for pair_id in np.flatnonzero(sums)}
+
+
+def month_bounds(month_index: int) -> tuple[date, date]:
+    year, month = divmod(month_index, 12)
+    first = date(year, month + 1, 1)
+    return first, (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def step(day: date, position: int, count: int = 1) -> date:
+    """``count`` periods after ``day``; calendar periods keep the day of month where it exists."""
+    _name, length, _slack, months = PERIODS[position]
+    if not months:
+        return day + timedelta(days=round(length) * count)
+    year, month = divmod(day.year * 12 + day.month - 1 + months * count, 12)
+    last = month_bounds(year * 12 + month)[1].day
+    return date(year, month + 1, min(day.day, last))
+
+
+def due_count(last: date, position: int, first_day: date, last_day: date) -> int:
+    """Occurrences after ``last``, one period apart, that fall within [first_day, last_day]."""
+    count = 0
+    steps = 1
+    due = step(last, position)
+    while due <= last_day:
+        count += due >= first_day
+        steps += 1
+        due = step(last, position, steps)
+    return count
+
+
+def forecast(
+    expenses: Iterable[dict[str, Any]],
+    *,
+    as_of: date | None = None,
+    vectorized: bool | None = None,
+) -> SpendingForecast:
+    """Find recurring series and project next month's spending per user and category.
+
+    A category's forecast is its active series due next month plus the mean
+    monthly non-recurring spending of the BASELINE_MONTHS full months before
+    ``as_of``'s month. ``vectorized`` picks the numpy path (default: when installed).
+    """
+    as_of = as_of or date.today()
+    use_numpy = HAS_NUMPY if vectorized is None else vectorized
+    current_month = as_of.year * 12 + as_of.month - 1
+    target_first, target_last = month_bounds(current_month + 1)
+    result = SpendingForecast(target_first.isoformat()[:7])
+    rows = expenses if isinstance(expenses, list) else list(expenses)
+    if not rows:
+        return result
+    columns = LedgerColumns(rows, vectorized=use_numpy)
+
+    detected = (detect_numpy if use_numpy else detect_python)(columns)
+    recurring_cents: dict[int, int] = {}
+    for position, regularity, count, first_row, last_row in detected.values():
+        name, length, slack, _months = PERIODS[position]
+        first, last = rows[first_row], rows[last_row]
+        last_date = date.fromisoformat(last["date"])
+        active = (as_of - last_date).days <= 1.5 * length + slack
+        result.series.append(
+            RecurringSeries(
+                user=last["user"],
+                description=last["description"],
+                category=last["category"].strip().lower(),
+                period=name,
+                period_days=length,
+                amount=last["amount"],
+                occurrences=count,
+                first_date=first["date"],
+                last_date=last["date"],
+                next_date=step(last_date, position).isoformat(),
+                regularity=regularity,
+                active=active,
+            )
+        )
+        due = due_count(last_date, position, target_first, target_last) if active else 0
+        if due:
+            pair_id = int(columns.pairs[last_row])
+            recurring_cents[pair_id] = recurring_cents.get(pair_id, 0) + due * last["amount"]
+    result.series.sort(key=lambda series: (series.user, -series.amount, series.description))
+
+    baseline = (baseline_numpy if use_numpy else baseline_python)(
+        columns, set(detected), current_month - BASELINE_MONTHS, current_month - 1
+    )
+    for pair_id in set(recurring_cents) | set(baseline):
+        user, category = columns.pair_keys[pair_id]
+        result.categories.append(
+            CategoryForecast(
+                user=user,
+                category=category,
+                month=result.month,
+                recurring=recurring_cents.get(pair_id, 0),
+                baseline=round(baseline.get(pair_id, 0) / BASELINE_MONTHS),
+            )
+        )
+    result.categories.sort(key=lambda forecast: (forecast.user, forecast.category))
+    return result
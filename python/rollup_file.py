@@ -0,0 +1,93 @@
+from __future__ import annotations
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+from file_io import write_json_atomic
+
+ROLLUP_FORMAT = "expense-tracker-rollup"
+ROLLUP_VERSION = 1
+
+# (user, "YYYY-MM", folded category) -> [cents, row count]
+RollupKey = tuple[str, str, str]
+RollupTotals = dict[RollupKey, list[int]]
+
+
+def tally(expenses: Iterable[dict[str, Any]], totals: RollupTotals | None = None) -> RollupTotals:
+    """Add the rows' cents and counts per (user, month, folded category) into ``totals``."""
+    totals = {} if totals is None else totals
+    folded: dict[str, str] = {}
+    for expense in expenses:
+        category = expense["category"]
+        category_folded = folded.get(category)
+        if category_folded is None:
+            category_folded = folded[category] = category.strip().lower()
+        key = (expense["user"], expense["date"][:7], category_folded)
+        cell = totals.get(key)
+        if cell is None:
+            totals[key] = [expense["amount"], 1]
+        else:
+            cell[0] += expense["amount"]
+            cell[1] += 1
+    return totals
+
+
+def merge_totals(totals: RollupTotals, other: RollupTotals) -> RollupTotals:
+    for key, (cents, count) in other.items():
+        cell = totals.get(key)
+        if cell is None:
+            totals[key] = [cents, count]
+        else:
+            cell[0] += cents
+            cell[1] += count
+    return totals
+
+
+@dataclass
+class RollupSnapshot:
+    """Pre-aggregated totals plus the versions of the files they were computed from.
+
+    ``source`` identifies those files (the data file's payload checksum, the
+    archive's signature); a reader compares it with what is on disk now and
+    ignores the totals when anything moved.
+    """
+
+    source: dict[str, Any]
+    totals: RollupTotals = field(default_factory=dict)
+
+    def category_totals(self, *, user: str | None = None, month: str | None = None) -> dict[str, int]:
+        """Cents per folded category, for one user and/or "YYYY-MM" month or everything."""
+        totals: dict[str, int] = {}
+        for (row_user, row_month, category), (cents, _count) in self.totals.items():
+            if (user is None or row_user == user) and (month is None or row_month == month):
+                totals[category] = totals.get(category, 0) + cents
+        return {category: cents for category, cents in totals.items() if cents}
+
+    def row_count(self, *, user: str | None = None) -> int:
+        return sum(
+            count
+            for (row_user, _month, _category), (_cents, count) in self.totals.items()
+            if user is None or row_user == user
+        )
+
+
+def write_rollup_file(target: Path, snapshot: RollupSnapshot) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    rows = [[*key, cents, count] for key, (cents, count) in sorted(snapshot.totals.items())]
+    write_json_atomic(
+        target,
+        {"format": ROLLUP_FORMAT, "version": ROLLUP_VERSION, "source": snapshot.source, "rows": rows},
+        indent=None,
+    )
+
+
+def read_rollup_file(target: Path) -> RollupSnapshot | None:
+    """The saved snapshot, or None when the file is missing, unreadable or another format."""
+    try:
+        data = json.loads(target.read_bytes())
+        if data.get("format") != ROLLUP_FORMAT or data.get("version") != ROLLUP_VERSION:
+            return None
+        totals = {(user, month, category): [cents, count] for user, month, category, cents, count in data["rows"]}
+        return RollupSnapshot(dict(data["source"]), totals)
+    except (OSError, ValueError, TypeError, KeyError, AttributeError):
+        return None
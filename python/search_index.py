@@ -0,0 +1,166 @@
+from __future__ import annotations
+import re
+import sys
+from bisect import bisect_left, insort
+from typing import Any, Iterable
+from memory_usage import MemoryEstimate, combine, estimate_mapping, estimate_references
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> set[str]:
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+class SearchIndex:
+    """Token/prefix inverted index from words to expense ids.
+
+    Postings are kept per distinct token and the vocabulary is kept sorted, so a
+    prefix lookup is a bisect plus a walk over matching tokens only; the cost
+    does not grow with the number of rows that do not match.
+    """
+
+    def __init__(self) -> None:
+        self._postings: dict[str, set[Any]] = {}
+        self._vocabulary: list[str] = []
+        self._doc_tokens: dict[Any, frozenset[str]] = {}
+        # Insertion sequence lets callers return hits in ledger order without a scan.
+        self._sequence: dict[Any, int] = {}
+        self._next_sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._doc_tokens.clear()
+        self._sequence.clear()
+        self._next_sequence = 0
+
+    def add(self, doc_id: Any, text: str) -> None:
+        if doc_id in self._doc_tokens:
+            self.update(doc_id, text)
+            return
+        tokens = frozenset(tokenize(text))
+        self._doc_tokens[doc_id] = tokens
+        self._sequence[doc_id] = self._next_sequence
+        self._next_sequence += 1
+        for token in tokens:
+            self._add_posting(token, doc_id)
+
+    def add_many(self, docs: Iterable[tuple[Any, str]]) -> None:
+        """Bulk add for loads: tokenizes each distinct text once and sorts the vocabulary once."""
+        postings = self._postings
+        token_cache: dict[str, frozenset[str]] = {}
+        new_tokens: list[str] = []
+        for doc_id, text in docs:
+            if doc_id in self._doc_tokens:
+                self.update(doc_id, text)
+                continue
+            tokens = token_cache.get(text)
+            if tokens is None:
+                tokens = token_cache[text] = frozenset(tokenize(text))
+            self._doc_tokens[doc_id] = tokens
+            self._sequence[doc_id] = self._next_sequence
+            self._next_sequence += 1
+            for token in tokens:
+                posting = postings.get(token)
+                if posting is None:
+                    posting = postings[token] = set()
+                    new_tokens.append(token)
+                posting.add(doc_id)
+        if new_tokens:
+            self._vocabulary.extend(new_tokens)
+            self._vocabulary.sort()
+
+    def update(self, doc_id: Any, text: str) -> None:
+        """Re-index a document, touching only the tokens that changed."""
+        old_tokens = self._doc_tokens.get(doc_id)
+        if old_tokens is None:
+            self.add(doc_id, text)
+            return
+        new_tokens = frozenset(tokenize(text))
+        for token in old_tokens - new_tokens:
+            self._remove_posting(token, doc_id)
+        for token in new_tokens - old_tokens:
+            self._add_posting(token, doc_id)
+        self._doc_tokens[doc_id] = new_tokens
+
+    def remove(self, doc_id: Any) -> None:
+        tokens = self._doc_tokens.pop(doc_id, None)
+        if tokens is None:
+            return
+        self._sequence.pop(doc_id, None)
+        for token in tokens:
+            self._remove_posting(token, doc_id)
+
+    def _add_posting(self, token: str, doc_id: Any) -> None:
+        posting = self._postings.get(token)
+        if posting is None:
+            posting = self._postings[token] = set()
+            insort(self._vocabulary, token)
+        posting.add(doc_id)
+
+    def _remove_posting(self, token: str, doc_id: Any) -> None:
+        posting = self._postings.get(token)
+        if posting is None:
+            return
+        posting.discard(doc_id)
+        if not posting:
+            del self._postings[token]
+            pos = bisect_left(self._vocabulary, token)
+            if pos < len(self._vocabulary) and self._vocabulary[pos] == token:
+                del self._vocabulary[pos]
+
+    def prefix_matches(self, prefix: str) -> set[Any]:
+        """Ids of documents containing any token that starts with ``prefix``."""
+        vocabulary = self._vocabulary
+        pos = bisect_left(vocabulary, prefix)
+        postings = []
+        while pos < len(vocabulary) and vocabulary[pos].startswith(prefix):
+            postings.append(self._postings[vocabulary[pos]])
+            pos += 1
+        if len(postings) == 1:
+            return postings[0]
+        matched: set[Any] = set()
+        return matched.union(*postings)
+
+    def search(self, query: str) -> set[Any] | None:
+        """Ids matching every query word as a prefix, or None for an empty query."""
+        words = sorted(tokenize(query), key=len, reverse=True)
+        if not words:
+            return None
+        result: set[Any] | None = None
+        # Longer prefixes tend to be more selective; start from them to keep sets small.
+        for word in words:
+            matched = self.prefix_matches(word)
+            if result is None:
+                result = set(matched)
+            else:
+                result.intersection_update(matched)
+            if not result:
+                return set()
+        return result
+
+    def memory_usage(self) -> MemoryEstimate:
+        """Estimated bytes of postings, vocabulary, per-document tokens and sequence numbers.
+
+        Postings are summed rather than sampled: the first tokens indexed tend to be
+        the most common ones, so a sample of them would overstate the rest.
+        """
+        postings = self._postings
+        return combine(
+            (
+                MemoryEstimate(len(postings), sys.getsizeof(postings) + sum(map(sys.getsizeof, postings.values()))),
+                estimate_references(self._vocabulary),
+                estimate_mapping(self._doc_tokens, sys.getsizeof),
+                estimate_mapping(self._sequence, sys.getsizeof),
+            ),
+            len(self._doc_tokens),
+        )
+
+    def ordered(self, doc_ids: Iterable[Any]) -> list[Any]:
+        """Sort ids back into the order they were first indexed."""
+        sequence = self._sequence
+        return sorted(doc_ids, key=sequence.__getitem__)
@@ -1,6 +1,13 @@
 """Minimal logic smoke test for ExpenseManager."""
 
+import json
+import tempfile
+from datetime import date
+from pathlib import Path
+
 from expense_manager import ExpenseManager
+from expense_archive import ExpenseArchive
+from partition_store import PartitionStore
 
 m = ExpenseManager()
 m.add_expense(user="ashish", expense_date="2026-02-20", category="Food", description="Lunch", amount=12.5)
@@ -9,4 +16,374 @@ m.add_expense(user="ashish", expense_date="2026-02-21", category="Gas", descript
 assert len(m.filter_expenses(user="ashish")) == 2
 assert m.monthly_total(2026, 2, user="ashish") == 52.5
 assert m.monthly_total(2026, 2, category="Food", user="ashish") == 12.5
+
+# Amounts are exact integer cents in memory; floats only appear in files and on screen.
+from decimal import ROUND_HALF_UP, Decimal
+from money import format_amount, parse_cents
+assert m.expenses[0]["amount"] == 1250 and parse_cents("0.1") == parse_cents(0.1) == 10
+assert parse_cents("1.005") == parse_cents(1.005) == 101 and format_amount(-5) == "-0.05"
+# A month of float amounts read from a file totals exactly what decimal arithmetic gives
+# (summing the floats themselves would be off by 400.00).
+amounts = (0.1, 1.005, 0.07, 19.99, 2.675, 1234567.89)
+exact = ExpenseManager()
+with tempfile.TemporaryDirectory() as tmp:
+    ledger = Path(tmp) / "exact.json"
+    rows = [
+        {"user": "exact", "date": f"2026-01-{1 + i % 31:02d}", "category": "Misc", "description": "x", "amount": amounts[i % 6]}
+        for i in range(240_000)
+    ]
+    ledger.write_text(json.dumps(rows), encoding="utf-8")
+    exact.load_from_json(ledger)
+reference = sum(Decimal(repr(amount)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) for amount in amounts) * 40_000
+assert format_amount(exact.rollup_lookup().month_total("exact", 2026, 1)) == str(reference) == "49383669600.00"
+assert exact.monthly_total(2026, 1, user="exact") == float(reference)
+del rows, exact
+# The file test above stops at 240k rows to stay quick; the integer sums behind it are
+# checked at 10M rows here, streamed so no 10M-row list is ever built.
+from itertools import cycle, islice
+from money import total_cents
+from rollup_file import tally
+from spending_rollups import SpendingRollups
+pattern = [
+    {"user": "exact", "date": f"2026-01-{1 + i % 31:02d}", "category": "Misc", "amount": parse_cents(amounts[i % 6])}
+    for i in range(186)
+]
+full, rest = divmod(10_000_000, len(pattern))
+reference = full * sum(row["amount"] for row in pattern) + sum(row["amount"] for row in pattern[:rest])
+assert reference == sum(  # the same total from decimal amounts, pattern by pattern
+    Decimal(repr(amounts[i % 6])).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * (full + (i < rest))
+    for i in range(len(pattern))
+) * 100
+assert total_cents(islice(cycle(pattern), 10_000_000)) == reference
+assert tally(islice(cycle(pattern), 10_000_000)) == {("exact", "2026-01", "misc"): [reference, 10_000_000]}
+big = SpendingRollups()
+big.add_many(islice(cycle(pattern), 10_000_000))
+assert big.month_total("exact", 2026, 1) == reference and big.week_total("exact", date(2026, 1, 7)) > 0
+del pattern, big
+
+# Search matches word prefixes in description or category, combined with other filters.
+assert [e["description"] for e in m.filter_expenses(search="lun")] == ["Lunch"]
+assert [e["description"] for e in m.filter_expenses(search="ga", user="ashish")] == ["Fuel"]
+assert m.filter_expenses(search="lunch", category="Gas") == []
+
+# Streaming query operators.
+assert [e["description"] for e in m.top_expenses(1, user="ashish")] == ["Fuel"]
+median = m.spending_quantiles((0.5,), by_category=False)[None][0.5]
+assert abs(median - 12.5) <= 12.5 * 0.01
+for amount in (10, 11, 12, 10, 11, 12, 10, 11, 500):
+    m.add_expense(user="stats", expense_date="2026-03-01", category="Food", description="Meal", amount=amount)
+assert [e["amount"] for e, _score in m.find_outliers(user="stats", threshold=2.5)] == [50000]
+assert [e["amount"] for e, _score in m.find_outliers(user="stats", method="iqr")] == [50000]
+for idx in reversed(range(len(m.expenses))):
+    if m.expenses[idx]["user"] == "stats":
+        m.delete_expense(idx)
+
+# Two managers sharing one file: the second picks up edits as a per-id diff.
+with tempfile.TemporaryDirectory() as tmp:
+    path = Path(tmp) / "expenses.json"
+    m.save_to_json(path)
+    other = ExpenseManager()
+    other.load_from_json(path)
+    untouched = other.expenses[1]
+
+    m.edit_expense(0, user="ashish", expense_date="2026-02-20", category="Food", description="Dinner", amount=20)
+    m.add_expense(user="partha", expense_date="2026-02-22", category="Food", description="Snack", amount=3)
+    m.save_to_json(path)
+
+    changes = other.sync_from_json(path)
+    assert len(changes.added) == 1 and len(changes.updated) == 1 and not changes.removed
+    assert other.expenses[1] is untouched
+    assert [e["id"] for e in other.expenses] == [e["id"] for e in m.expenses]
+    assert [e["description"] for e in other.filter_expenses(search="din")] == ["Dinner"]
+    assert other.filter_expenses(search="lunch") == []
+
+    # Checksummed snapshots load without re-validation; edited files are validated again.
+    from file_io import read_checksummed_json
+    assert read_checksummed_json(path)[1] is True
+    assert read_checksummed_json(path)[0][0]["amount"] == 20.0 and other.expenses[0]["amount"] == 2000
+    path.write_text(path.read_text(encoding="utf-8").replace('"Snack"', '"  "'), encoding="utf-8")
+    assert read_checksummed_json(path)[1] is False
+    try:
+        ExpenseManager().load_from_json(path)
+    except ValueError as exc:
+        assert str(exc) == "description is required"
+    else:
+        raise AssertionError("tampered file should be re-validated")
+    assert m.validate_records([{"user": " a ", "date": "2026-2-3", "category": "X", "description": "Y", "amount": "4"}]) == [
+        {"id": None, "user": "a", "date": "2026-02-03", "category": "X", "description": "Y", "amount": 400}
+    ]
+    odd = [{"id": [1], "user": "a", "date": "2026-02-03", "category": "X", "description": "Y", "amount": 4},
+           {"id": {"n": 1}, "user": "a", "date": "2026-02-04", "category": "X", "description": "Y", "amount": 4}]
+    assert all(type(e["id"]) is str for e in ExpenseManager().claim_ids(m.validate_records(odd)))
+
+# Partitioned storage: shards load on demand, evict under budget, and saves touch one shard.
+with tempfile.TemporaryDirectory() as tmp:
+    store = PartitionStore(Path(tmp) / "partitions")
+    m.export_partitions(store)
+    lazy = ExpenseManager()
+    lazy.attach_store(PartitionStore(store.root), max_loaded_rows=2)
+    assert lazy.expenses == [] and lazy.known_users() == {"ashish", "partha"}
+    assert lazy.category_names_for().names() == ["food", "gas"] and lazy.expenses == []  # from the manifest
+    assert len(lazy.filter_expenses(user="ashish")) == 2
+    assert len(lazy.filter_expenses(user="partha")) == 1
+    assert {e["user"] for e in lazy.expenses} == {"partha"}  # ashish shard evicted
+    assert len(lazy.filter_expenses()) == 3 and len(lazy.expenses) == 3
+    lazy.filter_expenses(user="partha")
+    assert {e["user"] for e in lazy.expenses} == {"partha"}  # over budget again, without a new load
+
+    lazy.add_expense(user="partha", expense_date="2026-03-01", category="Gas", description="Fuel", amount=30)
+    before = {key: entry["rev"] for key, entry in store.refresh().items()}
+    lazy.save_partitions()
+    after = {key: entry["rev"] for key, entry in store.refresh().items()}
+    assert after.pop(("partha", "2026-03")) == 2 and after == before  # the manifest's next generation
+
+    # A shard handed to the background writer stays loaded until its write lands.
+    lazy.add_expense(user="partha", expense_date="2026-03-02", category="Gas", description="Fuel", amount=5)
+    snapshot = lazy.take_partition_snapshot()
+    lazy.filter_expenses(user="ashish")
+    assert ("partha", "2026-03") in lazy.loaded_partitions
+    lazy.write_partition_snapshot(snapshot)
+    lazy.partitions_saved(snapshot)
+    assert lazy.saving_partitions == {} and lazy.loaded_partitions[("partha", "2026-03")] == 3
+    lazy.filter_expenses(user="ashish")
+    assert ("partha", "2026-03") not in lazy.loaded_partitions
+    assert lazy.period_totals("partha", date(2026, 3, 2))[2] == 3500  # evicted shards are reloaded first
+    copy = lazy.add_expense(user="partha", expense_date="2026-03-02", category="Gas", description="Fuel", amount=5,
+                            skip_duplicates=True)
+    assert copy["amount"] == 500 and not lazy.dirty_partitions  # a skipped duplicate leaves its shard clean
+
+    # A shard deleted and written again gets a new revision, so other instances reload it.
+    lazy.add_expense(user="mia", expense_date="2026-04-01", category="Gas", description="Fuel", amount=1)
+    lazy.save_partitions()
+    other = ExpenseManager()
+    other.attach_store(PartitionStore(store.root), max_loaded_rows=100)
+    assert len(other.filter_expenses(user="mia")) == 1
+    lazy.delete_expense(next(i for i, e in enumerate(lazy.expenses) if e["user"] == "mia"))
+    lazy.save_partitions()
+    lazy.add_expense(user="mia", expense_date="2026-04-02", category="Gas", description="Fuel", amount=2)
+    lazy.save_partitions()
+    other.sync_partitions()
+    assert [e["date"] for e in other.filter_expenses(user="mia")] == ["2026-04-02"]
+
+# Memory accounting covers the ledger and every index; over budget drops rebuildable caches.
+usage = m.memory_usage()
+assert usage["expenses"].rows == len(m.expenses) and usage["expenses"].per_row > 0
+assert usage["search_index"].bytes > 0 and m.count_expenses(user="ashish") == 2
+m.duplicate_lookup()
+m.memory_budget = sum(estimate.bytes for estimate in m.memory_usage().values()) - 1  # the index tips it over
+assert m.enforce_memory_budget() is not None and m.duplicate_index is None
+m.duplicate_lookup()
+assert m.enforce_memory_budget() is None and m.duplicate_index is not None  # once per crossing
+m.memory_budget = 2**40
+assert m.enforce_memory_budget() is None and not m.over_memory_budget  # back under, so re-armed
+m.memory_budget = 1
+assert m.enforce_memory_budget() is not None and m.duplicate_index is not None  # rows alone are over
+m.memory_budget, m.over_memory_budget = None, False
+
+# Duplicate detection: exact key, nearby dates with the same amount, bulk import and report.
+dupes = ExpenseManager()
+first = dupes.add_expense(user="ashish", expense_date="2026-02-20", category="Food", description="Lunch", amount=12.5)
+assert dupes.add_expense(
+    user="ashish", expense_date="2026-02-20", category=" food", description="lunch ", amount=12.50, skip_duplicates=True
+) is first
+candidate = dupes.validate_expense(user="ashish", expense_date="2026-02-22", category="Cafe", description="X", amount=12.5)
+assert dupes.find_duplicates(candidate) == [] and dupes.find_duplicates(candidate, fuzzy_days=2) == [first]
+added, skipped = dupes.import_expenses(
+    [
+        {"user": "ashish", "date": "2026-02-20", "category": "Food", "description": "Lunch", "amount": 12.5},
+        {"user": "ashish", "date": "2026-02-25", "category": "Gas", "description": "Fuel", "amount": 40},
+        {"user": "ashish", "date": "2026-02-25", "category": "Gas", "description": "Fuel", "amount": "40.00"},
+    ]
+)
+assert len(added) == 1 and len(skipped) == 2 and len(dupes.expenses) == 2
+dupes.add_expense(user="ashish", expense_date="2026-02-25", category="Gas", description="Fuel", amount=40)
+assert [len(group) for group in dupes.duplicate_report()] == [2]
+dupes.delete_expense(len(dupes.expenses) - 1)
+assert dupes.duplicate_report() == []
+
+# Autocomplete ranks a user's past values by use and recency and follows edits.
+hints = ExpenseManager()
+hints.add_expense(user="ashish", expense_date="2026-02-20", category="Food", description="Lunch", amount=12)
+hints.add_expense(user="ashish", expense_date="2026-02-21", category="Food", description="lunch", amount=9)
+hints.add_expense(user="ashish", expense_date="2026-01-05", category="Fun", description="Lunch meetup", amount=5)
+assert hints.suggest_values("description", "lu", user="ashish") == ["lunch", "Lunch meetup"]
+assert hints.suggest_values("category", "F", user="ashish") == ["Food", "Fun"]
+hints.edit_expense(2, user="ashish", expense_date="2026-03-01", category="Fees", description="Lunch meetup", amount=5)
+assert hints.suggest_values("category", "f", user="ashish") == ["Food", "Fees"]  # Fun is gone
+assert hints.suggest_values("category", "f", user="mia") == []
+
+# Day/week/month rollups follow every mutation; budgets alert once per crossed threshold.
+alerts = []
+hints.add_budget_listener(alerts.append)
+hints.set_budget("ashish", " food ", 30)
+rollups = hints.rollup_lookup()
+assert rollups.week_total("ashish", date(2026, 2, 18)) == 2100 and rollups.day_total("ashish", date(2026, 2, 21)) == 900
+assert [cents for _day, cents in rollups.series("ashish", date(2026, 1, 1), date(2026, 3, 31), period="month")] == [0, 2100, 500]
+hints.add_expense(user="ashish", expense_date="2026-02-22", category="Food", description="Snack", amount=4)
+assert [(a.category, a.crossed, a.spent) for a in alerts] == [("food", 80, 2500)]
+hints.edit_expense(3, user="ashish", expense_date="2026-02-22", category="Food", description="Snack", amount=10)
+hints.add_expense(user="ashish", expense_date="2026-02-23", category="Food", description="Tea", amount=1)
+assert [a.crossed for a in alerts] == [80, 100] and hints.monthly_total(2026, 2, category="food") == 32.0
+assert [(s.category, s.spent, round(s.percent)) for s in hints.budget_status("ashish", month=date(2026, 2, 1))] == [
+    ("food", 3200, 107)
+]
+hints.delete_expense(4)
+assert rollups.month_total("ashish", 2026, 2, category="Food") == 3100
+with tempfile.TemporaryDirectory() as tmp:
+    hints.save_budgets(Path(tmp) / "budgets.json")
+    reloaded = ExpenseManager()
+    reloaded.load_budgets(Path(tmp) / "budgets.json")
+    assert reloaded.budgets == {("ashish", "food"): 3000}
+
+# User and category registries count references; listeners hear only first and last ones.
+events = []
+names = ExpenseManager()
+names.category_names[""].listeners.append(lambda name, present: events.append((name, present)))
+names.add_expense(user="ashish", expense_date="2026-02-20", category="Food", description="Lunch", amount=12)
+names.add_expense(user="ashish", expense_date="2026-02-21", category=" food", description="Snack", amount=3)
+names.add_expense(user="mia", expense_date="2026-02-21", category="Gas", description="Fuel", amount=30)
+names.delete_expense(0)
+assert events == [("food", True), ("gas", True)] and names.user_names.count("ashish") == 1
+names.edit_expense(0, user="ashish", expense_date="2026-02-21", category="Rent", description="Snack", amount=3)
+assert events[2:] == [("rent", True), ("food", False)]
+assert names.known_users() == {"ashish", "mia"} and names.categories(user="mia") == ["Gas"]
+assert names.category_names_for("mi").names() == [] and "mi" not in names.category_names  # typed prefix
+
+# Undo/redo replays logged deltas; a batch is one step and rows return to their old positions.
+history = ExpenseManager()
+for day, user in (("2026-02-01", "ashish"), ("2026-02-02", "mia"), ("2026-02-03", "ashish")):
+    history.add_expense(user=user, expense_date=day, category="Food", description="Lunch", amount=10)
+before = list(history.expenses)
+history.edit_expense(1, user="mia", expense_date="2026-02-02", category="Gas", description="Fuel", amount=40)
+with history.batch("Remove user ashish"):
+    history.delete_expenses([0, 2])
+assert [e["user"] for e in history.expenses] == ["mia"] and history.history.undo_label() == "Remove user ashish"
+assert len(history.undo().added) == 2 and history.undo().updated[0][1]["amount"] == 1000
+assert history.expenses == before and history.known_users() == {"ashish", "mia"}
+history.redo()
+history.history.max_operations = 2  # the next push drops all but the edit and the new add
+history.add_expense(user="mia", expense_date="2026-02-04", category="Food", description="Snack", amount=2)
+assert not history.history.can_redo() and history.monthly_total(user="mia", year=2026, month=2) == 42.0
+history.undo()
+history.undo()
+assert not history.history.can_undo() and history.expenses == before
+
+# Recurring rows (same user, description and amount band on a schedule) drive next month's forecast.
+import recurring
+plans = ExpenseManager()
+for month in range(3, 10):
+    plans.add_expense(user="ashish", expense_date=f"2026-{month:02d}-01", category="Rent", description="Rent", amount=900)
+    plans.add_expense(user="ashish", expense_date=f"2026-{month:02d}-{month + 10}", category="Fun",
+                      description=f"NETFLIX.COM {month:02d}/26", amount=15.99 if month < 9 else 16.29)
+for day in ("2026-05-02", "2026-05-09", "2026-05-16", "2026-05-23"):  # weekly, but stopped
+    plans.add_expense(user="ashish", expense_date=day, category="Fun", description="Gym", amount=8)
+for day in ("2026-07-04", "2026-08-20", "2026-09-09"):
+    plans.add_expense(user="ashish", expense_date=day, category="Food", description="Groceries", amount=60)
+ahead = plans.spending_forecast(user="ashish", as_of=date(2026, 10, 5))
+assert ahead is plans.spending_forecast(user="ashish", as_of=date(2026, 10, 5))  # cached until a change
+assert [(s.description, s.period, s.next_date, s.active) for s in ahead.series] == [
+    ("Rent", "monthly", "2026-10-01", True), ("NETFLIX.COM 09/26", "monthly", "2026-10-19", True),
+    ("Gym", "weekly", "2026-05-30", False),
+]
+assert [(f.category, f.recurring, f.baseline) for f in ahead.for_user("ashish")] == [
+    ("rent", 90000, 0), ("food", 0, 6000), ("fun", 1629, 0)
+]
+assert ahead.month == "2026-11" and plans.monthly_total(2026, 11) == 0
+if recurring.HAS_NUMPY:
+    assert recurring.forecast(plans.expenses, as_of=date(2026, 10, 5), vectorized=False) == ahead
+everyone = plans.spending_forecast(as_of=date(2026, 10, 5))
+plans.add_expense(user="mia", expense_date="2026-10-02", category="Gas", description="Fuel", amount=30)
+assert plans.spending_forecast(user="ashish", as_of=date(2026, 10, 5)) is ahead  # other users' changes keep it
+assert plans.spending_forecast(as_of=date(2026, 10, 5)) is not everyone
+plans.delete_expense(0)
+assert plans.forecasts == {}
+# The window computes forecasts on a worker thread; results from rows changed meanwhile are not cached.
+token, rows = plans.forecast_input(user="ashish", as_of=date(2026, 10, 5))
+assert plans.cached_forecast(user="ashish", as_of=date(2026, 10, 5)) is None
+plans.delete_expense(0)
+assert not plans.store_forecast(token, recurring.forecast(rows, as_of=date(2026, 10, 5)))
+token, rows = plans.forecast_input(user="ashish", as_of=date(2026, 10, 5))
+result = recurring.forecast(rows, as_of=date(2026, 10, 5))
+assert plans.store_forecast(token, result) and plans.spending_forecast(user="ashish", as_of=date(2026, 10, 5)) is result
+
+# Merging several ledger files: shared rows are skipped, clashing ids renamed, bad files reported.
+with tempfile.TemporaryDirectory() as tmp:
+    branch_a, branch_b, broken = Path(tmp) / "a.json", Path(tmp) / "b.json", Path(tmp) / "broken.json"
+    dupes.save_to_json(branch_a)
+    clash = {**dupes.expenses[0], "description": "Branch B lunch"}
+    branch_b.write_text(json.dumps([clash, {"user": "mia", "date": "2026-02-01", "category": "Gas",
+                                            "description": "Fuel", "amount": 9}]), encoding="utf-8")
+    broken.write_text("[{", encoding="utf-8")
+    merged = ExpenseManager()
+    reports = merged.merge_files([branch_a, branch_b, broken, branch_a], max_workers=1)
+    assert [(r.added, r.skipped, r.reassigned) for r in reports[:2]] == [(2, 0, 0), (2, 0, 1)]
+    assert reports[2].error and reports[2].added == 0 and reports[3].skipped == 2
+    assert len({e["id"] for e in merged.expenses}) == len(merged.expenses) == 4
+
+# Closed months move to the compressed archive and stay queryable by date range.
+with tempfile.TemporaryDirectory() as tmp:
+    aged = ExpenseManager()
+    aged.attach_archive(ExpenseArchive(Path(tmp) / "archive.bin"))
+    for day in ("2025-11-03", "2025-12-24", "2026-01-15", "2026-02-02"):
+        aged.add_expense(user="ashish", expense_date=day, category="Food", description="Groceries", amount=10)
+    assert aged.archive_closed_months(today=date(2026, 2, 10)) == 3
+    assert [e["date"] for e in aged.expenses] == ["2026-02-02"]
+    assert aged.archive.months() == ["2025-11", "2025-12", "2026-01"]
+    assert aged.known_users() == {"ashish"} and aged.category_names["ashish"].count("food") == 2  # row + archive pin
+    assert aged.archive_closed_months(today=date(2026, 2, 10)) == 0
+    reader = ExpenseArchive(aged.archive.path)
+    assert [e["date"] for e in reader.read_range("2025-12-01", "2025-12-31")] == ["2025-12-24"]
+    assert [key[0] for key in reader._cache] == ["2025-12"]  # only the overlapping block was read
+    assert reader.read_range(user="mia") == [] and len(reader._cache) == 1  # no block lists mia
+    assert len(aged.filter_expenses(user="ashish", search="groc", include_archive=True)) == 4
+    assert aged.filter_expenses(search="fuel", include_archive=True) == [] and "archive_search_index" in aged.memory_usage()
+    assert [e["date"] for e in aged.top_expenses(5, from_date="2025-12-01", to_date="2025-12-31")] == ["2025-12-24"]
+    assert aged.count_expenses(user="ashish", include_archive=True) == 4
+    copy = {"user": "ashish", "date": "2025-12-25", "category": "Food", "description": "Groceries", "amount": 10}
+    added, skipped = aged.import_expenses([copy], fuzzy_days=1)
+    assert added == [] and [e["date"] for e in skipped] == ["2025-12-25"]
+    assert aged.find_duplicates(aged.validate_records([copy])[0], fuzzy_days=1)[0]["date"] == "2025-12-24"
+    assert aged.duplicate_report() == [] and len(aged.duplicate_report(fuzzy_days=40)) == 1
+    fresh = ExpenseManager()
+    fresh.attach_archive(ExpenseArchive(aged.archive.path))
+    assert fresh.suggest_values("description", "gr", user="ashish") == ["Groceries"]
+    assert fresh.rollup_lookup().month_total("ashish", 2025, 11) == 1000
+    assert fresh.archive._cache == {}  # both counted from the block index
+    assert aged.monthly_total(2026, 1, user="ashish") == 10
+    assert aged.rollup_lookup().week_total("ashish", date(2025, 12, 24)) == 1000
+    aged.spending_forecast(user="ashish", as_of=date(2026, 2, 10))
+    history = aged.forecast_history["ashish"]
+    aged.add_expense(user="ashish", expense_date="2026-02-03", category="Food", description="Tea", amount=1)
+    aged.delete_expense(len(aged.expenses) - 1)
+    assert aged.forecasts == {} and len(history[1]) == 3
+    aged.spending_forecast(user="ashish", as_of=date(2026, 2, 10))
+    assert aged.forecast_history["ashish"] is history  # archived share kept across live edits
+    assert aged.restore_archived(months=["2026-01"])[0]["date"] == "2026-01-15"
+    assert aged.archive.months() == ["2025-11", "2025-12"] and len(aged.expenses) == 2
+    assert aged.monthly_total(2026, 1, user="ashish") == 10 and aged.monthly_total(2025, 12) == 10
+    rewritten = ExpenseArchive(aged.archive.path)  # untouched blocks were copied with their summaries
+    assert "Groceries" not in json.dumps(rewritten.index())
+    assert rewritten.value_uses("description") == [("ashish", "Groceries", 1, "2025-11-03"), ("ashish", "Groceries", 1, "2025-12-24")]
+    assert rewritten.day_totals() == [("ashish", "food", "2025-11-03", 1000), ("ashish", "food", "2025-12-24", 1000)]
+
+    # Saves write a rollup sidecar (live rows plus archive) that is only trusted while both match.
+    ledger = Path(tmp) / "expenses.json"
+    aged.rollup_path = Path(tmp) / "expenses.rollup.json"
+    aged.save_to_json(ledger)
+    saved = aged.read_rollup_sidecar(ledger)
+    assert saved.category_totals(user="ashish") == {"food": 4000} and saved.row_count() == 4
+    assert saved.category_totals(month="2025-12") == {"food": 1000}
+    other = ExpenseManager()
+    other.load_from_json(ledger)
+    other.add_expense(user="mia", expense_date="2026-02-03", category="Gas", description="Fuel", amount=5)
+    other.save_to_json(ledger)
+    assert aged.read_rollup_sidecar(ledger) is None
+    aged.sync_from_json(ledger)
+    assert aged.refresh_rollup_sidecar() and aged.read_rollup_sidecar(ledger).category_totals(user="mia") == {"gas": 500}
+    plain = Path(tmp) / "plain.json"
+    plain.write_text(json.dumps([{"user": "mia", "date": "2026-02-03", "category": "Gas", "description": "Fuel", "amount": 5}]))
+    legacy = ExpenseManager()
+    legacy.rollup_path = Path(tmp) / "plain.rollup.json"
+    legacy.load_from_json(plain)
+    assert not legacy.refresh_rollup_sidecar() and not legacy.rollup_path.exists()
 print("OK")
@@ -0,0 +1,213 @@
+from __future__ import annotations
+import calendar
+import sys
+from array import array
+from datetime import date, timedelta
+from typing import Any, Iterable
+from expense_stats import category_key
+from memory_usage import MemoryEstimate, combine, estimate_mapping
+
+# (user, folded category), or (user, None) for the user's spending in every category.
+SeriesKey = tuple[str, str | None]
+PERIODS = ("day", "week", "month")
+
+
+def zeros(size: int) -> array:
+    return array("q", bytes(8 * size))
+
+
+class DayTotals:
+    """Cents per day plus a Fenwick tree (binary indexed prefix sums) over them.
+
+    Adding to a day and summing any day range both cost O(log days). The covered
+    range starts around the first day seen and doubles whenever a row falls
+    outside it, so rebuilds are rare and linear.
+    """
+
+    def __init__(self, origin: int, days: array | None = None) -> None:
+        self.origin = origin
+        self.days = days if days is not None else zeros(64)
+        self.tree = self.build_tree(self.days)
+
+    @staticmethod
+    def build_tree(days: array) -> array:
+        size = len(days)
+        tree = zeros(size + 1)
+        tree[1:] = days
+        for position in range(1, size + 1):
+            parent = position + (position & -position)
+            if parent <= size:
+                tree[parent] += tree[position]
+        return tree
+
+    def grow(self, day: int) -> None:
+        size = len(self.days)
+        end = self.origin + size
+        new_size = 2 * size
+        while not end - new_size <= day < self.origin + new_size:
+            new_size *= 2
+        days = zeros(new_size)
+        # Extend towards the day that did not fit: earlier days shift the origin.
+        origin = end - new_size if day < self.origin else self.origin
+        offset = self.origin - origin
+        days[offset : offset + size] = self.days
+        self.origin, self.days = origin, days
+        self.tree = self.build_tree(days)
+
+    def add(self, day: int, cents: int) -> None:
+        position = day - self.origin
+        if not 0 <= position < len(self.days):
+            self.grow(day)
+            position = day - self.origin
+        self.days[position] += cents
+        tree = self.tree
+        size = len(tree) - 1
+        position += 1
+        while position <= size:
+            tree[position] += cents
+            position += position & -position
+
+    def through(self, day: int) -> int:
+        """Sum of every day up to and including ``day``."""
+        position = min(day - self.origin + 1, len(self.days))
+        tree = self.tree
+        total = 0
+        while position > 0:
+            total += tree[position]
+            position -= position & -position
+        return total
+
+    def total(self, first_day: int, last_day: int) -> int:
+        return self.through(last_day) - self.through(first_day - 1)
+
+
+class SpendingRollups:
+    """Per-user spending totals over time, overall and per category.
+
+    Each series is a DayTotals, so the total of any day, week, month or custom
+    range is two prefix lookups and an add, edit or delete updates O(log days)
+    cells; nothing here ever rescans the ledger.
+    """
+
+    def __init__(self) -> None:
+        self._series: dict[SeriesKey, DayTotals] = {}
+        self._categories: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def clear(self) -> None:
+        self._series.clear()
+        self._categories.clear()
+
+    def add(self, expense: dict[str, Any], sign: int = 1) -> None:
+        user = expense["user"]
+        category = category_key(expense)
+        day = date.fromisoformat(expense["date"]).toordinal()
+        cents = sign * expense["amount"]
+        for key in ((user, category), (user, None)):
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = DayTotals(day - 32)
+            series.add(day, cents)
+        self._categories.setdefault(user, set()).add(category)
+
+    def remove(self, expense: dict[str, Any]) -> None:
+        self.add(expense, -1)
+
+    def add_many(self, expenses: Iterable[dict[str, Any]]) -> None:
+        """Bulk add for loads: buckets by day first, then builds each tree in one pass."""
+        self.add_day_totals(
+            (expense["user"], expense["category"], expense["date"], expense["amount"]) for expense in expenses
+        )
+
+    def add_day_totals(self, items: Iterable[tuple[str, str, str, int]]) -> None:
+        """Bulk add of (user, category, ISO date, cents), e.g. an archive's per-day totals."""
+        buckets: dict[SeriesKey, dict[int, int]] = {}
+        ordinals: dict[str, int] = {}
+        folded: dict[str, str] = {}
+        for user, category, iso_date, cents in items:
+            day = ordinals.get(iso_date)
+            if day is None:
+                day = ordinals[iso_date] = date.fromisoformat(iso_date).toordinal()
+            category_folded = folded.get(category)
+            if category_folded is None:
+                category_folded = folded[category] = category.strip().lower()
+            for key in ((user, category_folded), (user, None)):
+                days = buckets.get(key)
+                if days is None:
+                    days = buckets[key] = {}
+                days[day] = days.get(day, 0) + cents
+        for key, days in buckets.items():
+            series = self._series.get(key)
+            if series is not None:
+                for day, cents in days.items():
+                    series.add(day, cents)
+                continue
+            first, last = min(days), max(days)
+            size = 64
+            while size < last - first + 1:
+                size *= 2
+            values = zeros(size)
+            for day, cents in days.items():
+                values[day - first] = cents
+            self._series[key] = DayTotals(first, values)
+            if key[1] is not None:
+                self._categories.setdefault(key[0], set()).add(key[1])
+
+    def users(self) -> list[str]:
+        return sorted(self._categories)
+
+    def total(self, user: str, first: date, last: date, *, category: str | None = None) -> int:
+        """Cents ``user`` spent from ``first`` to ``last`` inclusive, optionally in one category."""
+        series = self._series.get((user, category.strip().lower() if category else None))
+        if series is None:
+            return 0
+        return series.total(first.toordinal(), last.toordinal())
+
+    def day_total(self, user: str, day: date, *, category: str | None = None) -> int:
+        return self.total(user, day, day, category=category)
+
+    def week_total(self, user: str, day: date, *, category: str | None = None) -> int:
+        """Spending in the Monday-to-Sunday week containing ``day``."""
+        monday = day - timedelta(days=day.weekday())
+        return self.total(user, monday, monday + timedelta(days=6), category=category)
+
+    def month_total(self, user: str, year: int, month: int, *, category: str | None = None) -> int:
+        last = date(year, month, calendar.monthrange(year, month)[1])
+        return self.total(user, date(year, month, 1), last, category=category)
+
+    def series(
+        self,
+        user: str,
+        first: date,
+        last: date,
+        *,
+        period: str = "day",
+        category: str | None = None,
+    ) -> list[tuple[date, int]]:
+        """(bucket start, cents) for every day, week or month overlapping the range."""
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        if period == "day":
+            start = first
+        elif period == "week":
+            start = first - timedelta(days=first.weekday())
+        else:
+            start = first.replace(day=1)
+        buckets: list[tuple[date, int]] = []
+        while start <= last:
+            if period == "day":
+                following = start + timedelta(days=1)
+            elif period == "week":
+                following = start + timedelta(days=7)
+            else:
+                following = (start + timedelta(days=32)).replace(day=1)
+            end = min(following - timedelta(days=1), last)
+            buckets.append((start, self.total(user, max(start, first), end, category=category)))
+            start = following
+        return buckets
+
+    def memory_usage(self) -> MemoryEstimate:
+        arrays = sum(sys.getsizeof(series.days) + sys.getsizeof(series.tree) for series in self._series.values())
+        return combine((estimate_mapping(self._series), MemoryEstimate(0, arrays)), len(self._series))
@@ -1,9 +1,23 @@
 from __future__ import annotations
-from datetime import datetime
+import sys
+from bisect import bisect_right
+from datetime import date, datetime
+from functools import cmp_to_key
 from typing import Any
 from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from memory_usage import MemoryEstimate, deep_size, estimate_mapping, estimate_references
+from money import format_amount
 
 
+# Plain ints compare much faster than enum members in the hot data() path.
+DISPLAY_ROLE = Qt.ItemDataRole.DisplayRole.value
+ALIGNMENT_ROLE = Qt.ItemDataRole.TextAlignmentRole.value
+AMOUNT_ALIGNMENT = Qt.AlignRight | Qt.AlignVCenter
+
+def cache_entry_size(entry: tuple[dict[str, Any], tuple]) -> int:
+    # The record itself belongs to the manager; only the pair and its values count here.
+    return sys.getsizeof(entry) + deep_size(entry[1])
+
 
 class ExpenseTableModel(QAbstractTableModel):
     """Read-only model mapped to expense dictionaries."""
@@ -13,12 +27,196 @@ class ExpenseTableModel(QAbstractTableModel):
     def __init__(self, expenses: list[dict[str, Any]] | None = None) -> None:
         super().__init__()
         self._expenses: list[dict[str, Any]] = expenses or []
+        # Most recent sort first; earlier clicks break ties (stable multi-column sort).
+        self._sort_spec: list[tuple[int, Qt.SortOrder]] = []
+        # Typed sort keys per record id, so comparisons never go through data().
+        self._sort_keys: dict[Any, tuple[dict[str, Any], tuple[int, int, str, str]]] = {}
+        # Formatted cell text per record id, filled lazily on first paint.
+        self._display_cache: dict[Any, tuple[dict[str, Any], tuple[str, str, str, str]]] = {}
+        # Few distinct dates exist, so their labels are shared across rows.
+        self._date_labels: dict[str, str] = {}
+        # Memory-budget mode: display cache capped at this many rows, sort keys not kept.
+        self.cache_limit: int | None = None
 
     def set_expenses(self, expenses: list[dict[str, Any]]) -> None:
         self.beginResetModel()
         self._expenses = expenses
+        # Entries are checked by identity, so they stay valid across filter changes;
+        # only drop them once stale records would dominate the caches.
+        limit = 2 * len(expenses) + 1024
+        if len(self._display_cache) > limit:
+            self._display_cache.clear()
+        if len(self._sort_keys) > limit:
+            self._sort_keys.clear()
+        if self._sort_spec:
+            self.apply_sort()
         self.endResetModel()
 
+    def set_cache_limit(self, limit: int | None) -> None:
+        """Bound the per-row caches (None = unbounded); drops what is cached now."""
+        self.cache_limit = limit
+        self.drop_caches()
+
+    def drop_caches(self) -> None:
+        self._display_cache.clear()
+        self._sort_keys.clear()
+        self._date_labels.clear()
+
+    def memory_usage(self) -> dict[str, MemoryEstimate]:
+        return {
+            "table_rows": estimate_references(self._expenses),
+            "table_display_cache": estimate_mapping(self._display_cache, cache_entry_size),
+            "table_sort_keys": estimate_mapping(self._sort_keys, cache_entry_size),
+        }
+
+    def date_label(self, value: str) -> str:
+        label = self._date_labels.get(value)
+        if label is None:
+            # Keep storage ISO format in data layer; render user-friendly format here.
+            try:
+                label = datetime.strptime(value, "%Y-%m-%d").strftime("%d %b %Y")
+            except ValueError:
+                label = value
+            self._date_labels[value] = label
+        return label
+
+    def display_values(self, expense: dict[str, Any]) -> tuple[str, str, str, str]:
+        """Formatted text for every column of a record, cached until the record changes."""
+        cached = self._display_cache.get(expense["id"])
+        if cached is not None and cached[0] is expense:
+            return cached[1]
+        values = (
+            self.date_label(expense["date"]),
+            f"${format_amount(expense['amount'])}",
+            expense["category"],
+            expense["description"],
+        )
+        if self.cache_limit is not None and len(self._display_cache) >= self.cache_limit:
+            self._display_cache.clear()
+        self._display_cache[expense["id"]] = (expense, values)
+        return values
+
+    def prefetch_rows(self, first: int, last: int) -> None:
+        """Format rows first..last in one batch, e.g. the window about to be painted."""
+        first = max(first, 0)
+        last = min(last, len(self._expenses) - 1)
+        display_values = self.display_values
+        for row in range(first, last + 1):
+            display_values(self._expenses[row])
+
+    def sort_key(self, expense: dict[str, Any]) -> tuple[int, int, str, str]:
+        """(date ordinal, amount, category, description) computed once per record version."""
+        cached = self._sort_keys.get(expense["id"])
+        if cached is not None and cached[0] is expense:
+            return cached[1]
+        try:
+            ordinal = date.fromisoformat(expense["date"]).toordinal()
+        except ValueError:
+            ordinal = 0
+        key = (
+            ordinal,
+            expense["amount"],
+            expense["category"].casefold(),
+            expense["description"].casefold(),
+        )
+        if self.cache_limit is None:
+            self._sort_keys[expense["id"]] = (expense, key)
+        return key
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        if not 0 <= column < len(self.HEADERS):
+            return
+        self._sort_spec = [(column, order)] + [spec for spec in self._sort_spec if spec[0] != column]
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        tracked = [self._expenses[index.row()] for index in persistent]
+        self.apply_sort()
+        new_rows = {id(expense): row for row, expense in enumerate(self._expenses)}
+        self.changePersistentIndexList(
+            persistent,
+            [self.index(new_rows[id(expense)], index.column()) for expense, index in zip(tracked, persistent)],
+        )
+        self.layoutChanged.emit()
+
+    def apply_sort(self) -> None:
+        # Sorting by the least significant column first relies on sort stability.
+        sort_key = self.sort_key
+        for column, order in reversed(self._sort_spec):
+            self._expenses.sort(
+                key=lambda expense: sort_key(expense)[column],
+                reverse=order == Qt.DescendingOrder,
+            )
+
+    def compare_keys(self, left: tuple, right: tuple) -> int:
+        for column, order in self._sort_spec:
+            if left[column] != right[column]:
+                result = -1 if left[column] < right[column] else 1
+                return -result if order == Qt.DescendingOrder else result
+        return 0
+
+    def insertion_row(self, expense: dict[str, Any]) -> int:
+        """Row where ``expense`` belongs under the current sort (after equal rows)."""
+        if not self._sort_spec:
+            return len(self._expenses)
+        wrap = cmp_to_key(self.compare_keys)
+        sort_key = self.sort_key
+        return bisect_right(
+            self._expenses,
+            wrap(sort_key(expense)),
+            key=lambda candidate: wrap(sort_key(candidate)),
+        )
+
+    # Row-level updates mutate the shared list in place, so callers holding it
+    # (MainWindow.current_view) stay in sync without a model reset.
+    def row_of(self, expense: dict[str, Any]) -> int:
+        for row, candidate in enumerate(self._expenses):
+            if candidate is expense:
+                return row
+        return -1
+
+    def contains(self, expense: dict[str, Any]) -> bool:
+        return self.row_of(expense) >= 0
+
+    def append_expense(self, expense: dict[str, Any]) -> None:
+        """Insert a row at its sorted position (or at the end when unsorted)."""
+        row = self.insertion_row(expense)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._expenses.insert(row, expense)
+        self.endInsertRows()
+
+    def remove_expense(self, expense: dict[str, Any]) -> bool:
+        row = self.row_of(expense)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._expenses[row]
+        self.endRemoveRows()
+        self._sort_keys.pop(expense["id"], None)
+        self._display_cache.pop(expense["id"], None)
+        return True
+
+    def replace_expense(self, old: dict[str, Any], new: dict[str, Any]) -> bool:
+        row = self.row_of(old)
+        if row < 0:
+            return False
+        old_key = self.sort_key(old)
+        self._display_cache.pop(old["id"], None)
+        self._expenses[row] = new
+        if self._sort_spec and self.sort_key(new) != old_key:
+            # Move just this row to its new sorted slot instead of re-sorting.
+            del self._expenses[row]
+            target = self.insertion_row(new)
+            self._expenses.insert(row, new)
+            if target != row:
+                self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), target if target < row else target + 1)
+                del self._expenses[row]
+                self._expenses.insert(target, new)
+                self.endMoveRows()
+                row = target
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+        return True
+
     def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
         if parent.isValid():
             return 0
@@ -42,27 +240,15 @@ class ExpenseTableModel(QAbstractTableModel):
         return str(section + 1)
 
     def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
-        if not index.isValid() or not 0 <= index.row() < len(self._expenses):
-            return None
+        # Qt asks for many roles per cell while scrolling; answer the unused ones first.
+        if role == DISPLAY_ROLE:
+            row = index.row()
+            column = index.column()
+            if not 0 <= row < len(self._expenses) or not 0 <= column < len(self.HEADERS):
+                return None
+            return self.display_values(self._expenses[row])[column]
 
-        expense = self._expenses[index.row()]
-        column = index.column()
-
-        if role == Qt.DisplayRole:
-            if column == 0:
-                # Keep storage ISO format in data layer; render user-friendly format here.
-                try:
-                    return datetime.strptime(expense["date"], "%Y-%m-%d").strftime("%d %b %Y")
-                except ValueError:
-                    return expense["date"]
-            if column == 1:
-                return f"${float(expense['amount']):.2f}"
-            if column == 2:
-                return expense["category"]
-            if column == 3:
-                return expense["description"]
-
-        if role == Qt.TextAlignmentRole and column == 1:
-            return Qt.AlignRight | Qt.AlignVCenter
+        if role == ALIGNMENT_ROLE and index.column() == 1 and index.isValid():
+            return AMOUNT_ALIGNMENT
 
         return None
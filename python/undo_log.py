@@ -0,0 +1,168 @@
+from __future__ import annotations
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+from memory_usage import MemoryEstimate, deep_size, sampled, scaled
+
+Row = dict[str, Any]
+
+
+@dataclass
+class Delta:
+    """One mutation of the ledger as the rows it took out and put in.
+
+    Positions are ledger indexes: before the change for ``removed`` rows, after it
+    for ``added`` ones. Records are immutable, so a delta holds references to them
+    and an edit is simply the (old, new) pair.
+    """
+
+    removed: list[tuple[int, Row]] = field(default_factory=list)
+    added: list[tuple[int, Row]] = field(default_factory=list)
+    updated: list[tuple[Row, Row]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.removed or self.added or self.updated)
+
+    def inverse(self) -> Delta:
+        return Delta(
+            removed=list(self.added),
+            added=list(self.removed),
+            updated=[(new, old) for old, new in self.updated],
+        )
+
+    def size(self) -> int:
+        """Bytes this delta keeps alive: its lists plus the rows no longer in the ledger."""
+        size = sum(sys.getsizeof(part) for part in (self.removed, self.added, self.updated))
+        size += sys.getsizeof(()) * (len(self.removed) + len(self.added) + len(self.updated))
+        gone = [row for _position, row in self.removed] + [old for old, _new in self.updated]
+        return size + scaled(len(gone), sampled(gone), deep_size)
+
+
+@dataclass
+class Operation:
+    """What one undo or redo step applies: the deltas of one action, oldest first."""
+
+    label: str
+    deltas: list[Delta] = field(default_factory=list)
+    size: int = 0
+
+    def inverse(self) -> Operation:
+        return Operation(self.label, [delta.inverse() for delta in reversed(self.deltas)], self.size)
+
+    def net_rows(self) -> dict[Any, tuple[Row | None, Row | None]]:
+        """Per record id, its version before and after the whole operation (None: absent)."""
+        net: dict[Any, tuple[Row | None, Row | None]] = {}
+        for delta in self.deltas:
+            for _position, row in delta.removed:
+                net[row["id"]] = (net[row["id"]][0] if row["id"] in net else row, None)
+            for old, new in delta.updated:
+                net[new["id"]] = (net[new["id"]][0] if new["id"] in net else old, new)
+            for _position, row in delta.added:
+                net[row["id"]] = (net[row["id"]][0] if row["id"] in net else None, row)
+        return net
+
+
+class UndoLog:
+    """Bounded undo and redo stacks of inverse-able deltas.
+
+    Memory grows with the rows an action touched, never with the ledger: deleting
+    a user keeps their rows, an edit keeps the old version, an add keeps nothing
+    but a reference. The oldest operations are dropped once either
+    ``max_operations`` or ``max_bytes`` is exceeded; an operation larger than
+    ``max_bytes`` on its own is not kept at all.
+    """
+
+    def __init__(self, *, max_operations: int = 200, max_bytes: int = 64 * 2**20) -> None:
+        self.max_operations = max_operations
+        self.max_bytes = max_bytes
+        self.undo_stack: deque[Operation] = deque()
+        self.redo_stack: list[Operation] = []
+        self.bytes = 0
+        # Deltas recorded since begin(); nested batches join the outermost one.
+        self._batch: Operation | None = None
+        self._depth = 0
+
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack)
+
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack)
+
+    def undo_label(self) -> str | None:
+        return self.undo_stack[-1].label if self.undo_stack else None
+
+    def redo_label(self) -> str | None:
+        return self.redo_stack[-1].label if self.redo_stack else None
+
+    def begin(self, label: str) -> None:
+        if self._depth == 0:
+            self._batch = Operation(label)
+        self._depth += 1
+
+    def end(self) -> bool:
+        """Close a batch; True when the outermost one closed and was logged."""
+        self._depth -= 1
+        if self._depth:
+            return False
+        batch, self._batch = self._batch, None
+        if not batch.deltas:
+            return False
+        self.push(batch)
+        return True
+
+    def record(self, delta: Delta, label: str) -> None:
+        """Log a change as its own operation, or as part of the open batch."""
+        if not delta:
+            return
+        if self._batch is not None:
+            self._batch.deltas.append(delta)
+            self._batch.size += delta.size()
+        else:
+            self.push(Operation(label, [delta], delta.size()))
+
+    def push(self, operation: Operation) -> None:
+        self.clear_redo()
+        self.push_undo(operation)
+
+    def push_undo(self, operation: Operation) -> None:
+        self.undo_stack.append(operation)
+        self.bytes += operation.size
+        while self.undo_stack and (len(self.undo_stack) > self.max_operations or self.bytes > self.max_bytes):
+            self.bytes -= self.undo_stack.popleft().size
+
+    def push_redo(self, operation: Operation) -> None:
+        self.redo_stack.append(operation)
+        self.bytes += operation.size
+
+    def pop_undo(self) -> Operation | None:
+        if not self.undo_stack:
+            return None
+        operation = self.undo_stack.pop()
+        self.bytes -= operation.size
+        return operation
+
+    def pop_redo(self) -> Operation | None:
+        if not self.redo_stack:
+            return None
+        operation = self.redo_stack.pop()
+        self.bytes -= operation.size
+        return operation
+
+    def clear_redo(self) -> None:
+        self.bytes -= sum(operation.size for operation in self.redo_stack)
+        self.redo_stack.clear()
+
+    def clear(self) -> None:
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.bytes = 0
+
+    def memory_usage(self) -> MemoryEstimate:
+        rows = sum(
+            len(delta.removed) + len(delta.added) + len(delta.updated)
+            for stack in (self.undo_stack, self.redo_stack)
+            for operation in stack
+            for delta in operation.deltas
+        )
+        return MemoryEstimate(rows, self.bytes)